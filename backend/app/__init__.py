@@ -2,7 +2,7 @@
 Core package initialization
 """
 from app.core.config import settings
-from app.core.database import sync_engine, SessionLocal, Base
+from app.core.database import sync_engine, replica_engine, SessionLocal, ReadSessionLocal, Base
 from app.core.security import (
     create_access_token,
     create_refresh_token,
@@ -14,7 +14,9 @@ from app.core.security import (
 __all__ = [
     "settings",
     "sync_engine",
+    "replica_engine",
     "SessionLocal",
+    "ReadSessionLocal",
     "Base",
     "create_access_token",
     "create_refresh_token",
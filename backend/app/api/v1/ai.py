@@ -10,6 +10,7 @@ from app.services.ai.text import TextAnalyzer
 from app.services.ai.voice import VoiceAssistant
 from app.services.ai.image import ImageAnalyzer
 from app.core.database import get_db
+from app.core.rate_limit import BULK, lane
 from sqlalchemy.orm import Session
 
 router = APIRouter()
@@ -43,6 +44,7 @@ class RescuePlanRequest(BaseModel):
 
 
 @router.post("/analyze/text")
+@lane(BULK)
 async def analyze_text(request: TextAnalysisRequest):
     """
     Analyze text using AI
@@ -67,6 +69,7 @@ async def analyze_text(request: TextAnalysisRequest):
 
 
 @router.post("/analyze/voice")
+@lane(BULK)
 async def analyze_voice(request: VoiceAnalysisRequest):
     """
     Analyze voice message using AI
@@ -89,6 +92,7 @@ async def analyze_voice(request: VoiceAnalysisRequest):
 
 
 @router.post("/analyze/image")
+@lane(BULK)
 async def analyze_image(request: ImageAnalysisRequest):
     """
     Analyze emergency image using AI Vision
@@ -111,6 +115,7 @@ async def analyze_image(request: ImageAnalysisRequest):
 
 
 @router.post("/generate/rescue-plan")
+@lane(BULK)
 async def generate_rescue_plan(request: RescuePlanRequest):
     """
     Generate detailed rescue operation plan
@@ -137,6 +142,7 @@ async def generate_rescue_plan(request: RescuePlanRequest):
 
 
 @router.post("/transcribe")
+@lane(BULK)
 async def transcribe_audio(request: VoiceAnalysisRequest):
     """
     Transcribe audio to text only (without analysis)
@@ -159,6 +165,7 @@ async def transcribe_audio(request: VoiceAnalysisRequest):
 
 
 @router.get("/test")
+@lane(BULK)
 async def test_ai_services():
     """
     Test AI services availability
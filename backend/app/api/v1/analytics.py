@@ -1,22 +1,35 @@
 """
 Analytics endpoints
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Response
 from sqlalchemy.orm import Session
 from sqlalchemy import func
-from datetime import datetime, timedelta
+from typing import List, Optional
+from datetime import date, datetime, timedelta
 
-from app.core.database import get_db
+import numpy as np
+
+from app.core.database import get_db, get_read_db
 from app.api.v1.auth import get_current_user
 from app.models.user import User
 from app.models.sos_alert import SOSAlert, EmergencyType, AlertStatus
+from app.models.team import TeamType
+from app.core.config import settings
+from app.core.cache import cached, shared_version
+from app.core.rate_limit import BULK, POLLING, lane
+from app.services.clustering import cluster_engine
+from app.services.coverage import coverage_analyzer
+from app.services.forecasting import alert_forecaster, local_now
+from app.services.heatmap import MAX_ZOOM, heatmap_index
 
 router = APIRouter()
 
 
 @router.get("/dashboard")
+@cached("alerts", max_age=15, per_day=True)
+@lane(POLLING)
 async def get_dashboard_stats(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get dashboard statistics (operators and admins only)"""
@@ -57,9 +70,10 @@ async def get_dashboard_stats(
 
 
 @router.get("/reports/daily")
+@lane(BULK)
 async def get_daily_report(
     days: int = 7,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get daily report for last N days"""
@@ -84,8 +98,9 @@ async def get_daily_report(
 
 
 @router.get("/reports/response-time")
+@lane(BULK)
 async def get_response_time_stats(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get average response time statistics"""
@@ -112,3 +127,157 @@ async def get_response_time_stats(
         "average_response_time_minutes": round(avg_minutes, 2),
         "total_processed": len(alerts_with_assignment)
     }
+
+
+@router.get("/clusters")
+@lane(POLLING)
+async def get_alert_clusters(
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Clusters of recent alerts (possible mass incidents), largest first
+
+    Alerts within CLUSTER_EPS_METERS of each other, created in the last
+    CLUSTER_WINDOW_MINUTES, with at least CLUSTER_MIN_ALERTS in a dense core.
+    """
+    if current_user.role not in ["operator", "coordinator", "admin"]:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    
+    cluster_engine.warm(db)
+    return {
+        "clusters": cluster_engine.clusters(),
+        "eps_meters": cluster_engine.eps,
+        "min_alerts": cluster_engine.min_points,
+        "window_minutes": int(cluster_engine.window.total_seconds() // 60),
+    }
+
+
+@router.get("/heatmap/{z}/{x}/{y}")
+@cached("alerts", max_age=60)
+@lane(POLLING)
+async def get_heatmap_tile(
+    z: int = Path(..., ge=0, le=MAX_ZOOM),
+    x: int = Path(..., ge=0),
+    y: int = Path(..., ge=0),
+    type: Optional[List[str]] = Query(None),
+    status: Optional[List[str]] = Query(None),
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Alert density tile (Web Mercator z/x/y, like the map tiles)
+
+    - **type**, **status**: Filters (repeatable)
+    - **date_from**, **date_to**: Creation date window (inclusive, default - all time)
+
+    Returns a 64 x 64 grid of counts as a sparse `cells` list
+    [gap, count, gap, count, ...]: bin = previous bin + gap (from 0),
+    bin = row * 64 + column.
+    """
+    if current_user.role not in ["operator", "coordinator", "admin"]:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    if x >= 1 << z or y >= 1 << z:
+        raise HTTPException(status_code=400, detail="Tile is outside the zoom level")
+    
+    heatmap_index.ensure_loaded(db, await shared_version("alerts"))
+    body = heatmap_index.tile(z, x, y, type, status, date_from, date_to)
+    return Response(content=body, media_type="application/json")
+
+
+@router.get("/coverage")
+@lane(BULK)
+async def get_response_coverage(
+    latitude: Optional[float] = Query(None, ge=-90, le=90),
+    longitude: Optional[float] = Query(None, ge=-180, le=180),
+    team_type: Optional[TeamType] = None,
+    type: Optional[List[EmergencyType]] = Query(None),
+    target_minutes: float = Query(settings.COVERAGE_TARGET_MINUTES, gt=0, le=180),
+    include_grid: bool = False,
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Response-time coverage of the service area by team bases
+
+    - **latitude**, **longitude**: Hypothetical new base ("what-if")
+    - **team_type**: Only bases of this team type
+    - **type**: Only these alert types count as demand (repeatable)
+    - **target_minutes**: Response-time target for the within-target shares
+    - **include_grid**: Also return the minutes raster (row-major, south to north)
+
+    Minutes are straight-line estimates at DISPATCH_SPEED_KMH. `area`
+    percentiles weight every cell equally, `demand` ones weight cells by
+    their alerts over the last COVERAGE_HISTORY_DAYS. `suggestions` are the
+    cells where a new base would save the most demand-weighted minutes.
+    """
+    if current_user.role not in ["operator", "coordinator", "admin"]:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    if (latitude is None) != (longitude is None):
+        raise HTTPException(status_code=400, detail="Both latitude and longitude are required for what-if")
+    
+    grid = coverage_analyzer.grid(
+        db, team_type.value if team_type else None, [item.value for item in type] if type else None
+    )
+    if not grid.bases:
+        raise HTTPException(status_code=404, detail="No team bases to analyze")
+    
+    result = {
+        "team_set_version": grid.version,
+        "bases": grid.bases,
+        "alerts": int(grid.demand.sum()),
+        "target_minutes": target_minutes,
+        "grid": {"bbox": grid.bbox, "rows": grid.rows, "cols": grid.cols, "cell_meters": grid.cell},
+        "current": grid.summary(grid.minutes, target_minutes),
+        "what_if": None,
+        "suggestions": grid.suggestions(target_minutes),
+    }
+    if latitude is not None:
+        minutes = grid.what_if(latitude, longitude)
+        result["what_if"] = {
+            "latitude": latitude,
+            "longitude": longitude,
+            **grid.summary(minutes, target_minutes),
+        }
+    if include_grid:
+        result["grid"]["minutes"] = np.round(grid.minutes, 1).tolist()
+    return result
+
+
+@router.get("/forecast")
+@lane(BULK)
+async def get_alert_forecast(
+    by: str = Query("type", pattern="^(type|district|type_district|total)$"),
+    type: Optional[List[EmergencyType]] = Query(None),
+    district: Optional[List[str]] = Query(None),
+    hours: int = Query(24, ge=1, le=168),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Expected alert volume for shift staffing
+
+    - **by**: Grouping of the series: type, district, type_district or total
+    - **type**, **district**: Filters (repeatable)
+    - **hours**: Forecast horizon from the current local hour
+
+    Each series has hourly `forecast` entries (expected alerts with a 90%
+    Poisson interval) and a 168-value `profile` of expected alerts per hour
+    of the week, Monday 00:00 local time first. Refitted from the daily
+    rollups at most every FORECAST_REFRESH_MINUTES.
+    """
+    if current_user.role not in ["operator", "coordinator", "admin"]:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    
+    alert_forecaster.ensure_fresh(db)
+    return {
+        "generated_at": local_now().replace(microsecond=0).isoformat(),
+        "utc_offset_hours": settings.FORECAST_UTC_OFFSET_HOURS,
+        "trained_through": alert_forecaster.trained_through,
+        "by": by,
+        "series": alert_forecaster.forecast(
+            by, [item.value for item in type] if type else None, district, hours
+        ),
+    }
@@ -18,6 +18,8 @@ from app.core.security import (
 from app.models.user import User, UserRole
 from app.models.team import RescueTeam
 from app.schemas.user import UserCreate, UserLogin, UserResponse, Token
+from app.core.cache import cached
+from app.core.rate_limit import AUTH, lane
 
 router = APIRouter()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
@@ -74,6 +76,7 @@ async def get_current_user(
 
 
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
+@lane(AUTH)
 async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     """
     Register new user (always as CITIZEN)
@@ -110,6 +113,7 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
 
 
 @router.post("/login", response_model=Token)
+@lane(AUTH)
 async def login(login_data: UserLogin, db: Session = Depends(get_db)):
     """
     Login user with JSON
@@ -144,6 +148,7 @@ async def login(login_data: UserLogin, db: Session = Depends(get_db)):
 
 
 @router.post("/login/form", response_model=Token)
+@lane(AUTH)
 async def login_form(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
     """
     Login user with form data (OAuth2 compatible)
@@ -178,6 +183,7 @@ async def login_form(form_data: OAuth2PasswordRequestForm = Depends(), db: Sessi
 
 
 @router.post("/refresh", response_model=Token)
+@lane(AUTH)
 async def refresh_token_endpoint(request: dict, db: Session = Depends(get_db)):
     """
     Refresh access token
@@ -219,6 +225,7 @@ async def refresh_token_endpoint(request: dict, db: Session = Depends(get_db)):
 
 
 @router.get("/me", response_model=UserResponse)
+@cached("users", "teams")
 async def get_current_user_info(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
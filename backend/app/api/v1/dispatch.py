@@ -0,0 +1,125 @@
+"""
+Dispatch endpoints: team recommendations and batch auto-assignment
+"""
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from collections import defaultdict
+from datetime import datetime
+import asyncio
+import logging
+
+from app.core.database import get_db
+from app.api.v1.auth import get_current_user
+from app.api.v1.sos import enrich_alerts_with_names
+from app.api.v1.websocket import send_alert_to_users
+from app.models.user import User
+from app.models.sos_alert import SOSAlert, AlertStatus, next_change_seq
+from app.schemas.dispatch import AutoAssignRequest, DispatchPlan
+from app.services.dispatch import plan_dispatch
+from app.services.heatmap import heatmap_index
+from app.core.cache import invalidates
+from app.core.metrics import observe_alert_transition
+from app.core.rate_limit import CRITICAL, lane
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+DISPATCH_ROLES = ["operator", "coordinator", "admin"]
+
+
+def require_dispatcher(current_user: User):
+    if current_user.role not in DISPATCH_ROLES:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only operators, coordinators and admins can dispatch teams"
+        )
+
+
+@router.get("/recommendations", response_model=DispatchPlan)
+async def get_recommendations(
+    alert_id: Optional[List[str]] = Query(None),
+    limit: int = Query(3, ge=1, le=20),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Recommended teams for pending alerts
+
+    - **alert_id**: Alerts to plan (repeatable, default - all pending unassigned alerts)
+    - **limit**: Ranked alternatives per alert
+
+    `recommended` is the team of the optimal batch assignment (no team is
+    used twice), `alternatives` are the cheapest teams for the alert alone.
+    """
+    require_dispatcher(current_user)
+    return plan_dispatch(db, alert_id, limit)
+
+
+@router.post("/auto-assign", response_model=DispatchPlan)
+@invalidates("alerts")
+@lane(CRITICAL)
+async def auto_assign(
+    request: AutoAssignRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Assign pending alerts to the recommended teams in one batch
+
+    Alerts taken by someone else since planning are skipped. Team members
+    get the new_alert WebSocket message as with a manual assignment.
+    """
+    require_dispatcher(current_user)
+    plan = plan_dispatch(db, request.alert_ids)
+    if request.dry_run:
+        return plan
+
+    now = datetime.utcnow()
+    # Bulk updates skip the session's change stamping; pending unassigned
+    # alerts were visible to no rescuer, so there is nothing to revoke
+    change_seq = next_change_seq(db)
+    applied = []
+    for assignment in plan["assignments"]:
+        if assignment["recommended"] is None:
+            continue
+        # Conditional update: the alert may have been assigned while planning
+        updated = db.query(SOSAlert).filter(
+            SOSAlert.id == assignment["alert_id"],
+            SOSAlert.status == AlertStatus.PENDING.value,
+            SOSAlert.team_id.is_(None)
+        ).update({
+            SOSAlert.status: AlertStatus.ASSIGNED.value,
+            SOSAlert.team_id: assignment["recommended"]["team_id"],
+            SOSAlert.assigned_at: now,
+            SOSAlert.updated_at: now,
+            SOSAlert.change_seq: change_seq,
+        }, synchronize_session=False)
+        if updated:
+            applied.append(assignment["alert_id"])
+    db.commit()
+    plan["applied"] = applied
+
+    if not applied:
+        return plan
+
+    alerts = db.query(SOSAlert).filter(SOSAlert.id.in_(applied)).all()
+    for alert in alerts:
+        observe_alert_transition(alert, AlertStatus.PENDING.value)
+        heatmap_index.move(
+            float(alert.latitude), float(alert.longitude), alert.created_at, alert.type,
+            AlertStatus.PENDING.value, alert.status
+        )
+    logger.info("Alerts auto-assigned", extra={"count": len(alerts), "solve_ms": plan["solve_ms"]})
+
+    members = defaultdict(list)
+    team_ids = {alert.team_id for alert in alerts}
+    for member_id, team_id in db.query(User.id, User.team_id).filter(User.team_id.in_(team_ids)).all():
+        members[team_id].append(str(member_id))
+    for alert_data in enrich_alerts_with_names(alerts, db):
+        recipients = members.get(str(alert_data["team_id"]))
+        if recipients:
+            asyncio.create_task(send_alert_to_users(recipients, alert_data))
+
+    return plan
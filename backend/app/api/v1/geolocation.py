@@ -1,18 +1,132 @@
 """
 Geolocation endpoints
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from datetime import datetime, timedelta
 from decimal import Decimal
+import math
+
+import numpy as np
 
 from app.core.database import get_db
 from app.api.v1.auth import get_current_user
 from app.models.user import User
 from app.models.team import RescueTeam
+from app.models.hydrant import HydrantStatus
+from app.schemas.team import PositionBatch, PositionFix
+from app.core.cache import cached, invalidates, shared_version
+from app.core.config import settings
+from app.core.rate_limit import BULK, POLLING, lane
+from app.services.dispatch import eta_matrix
+from app.services.geocoder import Geocoder, get_geocoder
+from app.services.hydrants import hydrant_index, import_hydrants, parse_hydrants
+from app.services.positions import position_store, to_utc_naive
+from app.utils.helpers import calculate_distance
 
 router = APIRouter()
 
+# Roles that report and read positions of any team (vehicle tracker gateways, dispatchers)
+POSITION_ADMIN_ROLES = ["operator", "coordinator", "admin"]
+
+
+def record_fixes(fixes: List[PositionFix], user_id: str, team_ids: set) -> dict:
+    """
+    Store GPS fixes of the allowed teams, oldest first
+
+    Args:
+        fixes: Fixes with team_id resolved
+        user_id: Reporting user
+        team_ids: Teams the user may report for
+
+    Returns:
+        dict: {"accepted": int, "ignored": int (out of order), "rejected": int (not allowed)}
+    """
+    result = {"accepted": 0, "ignored": 0, "rejected": 0}
+    for fix in sorted(fixes, key=lambda fix: to_utc_naive(fix.recorded_at)):
+        if fix.team_id not in team_ids:
+            result["rejected"] += 1
+        elif position_store.record(
+            fix.team_id, fix.latitude, fix.longitude, fix.recorded_at,
+            fix.accuracy, fix.speed, fix.heading, reported_by=user_id
+        ):
+            result["accepted"] += 1
+        else:
+            result["ignored"] += 1
+    return result
+
+
+@router.post("/positions")
+@lane(POLLING)
+async def report_positions(
+    batch: PositionBatch,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Report GPS fixes of rescue teams
+
+    Rescuers report for their own team (team_id may be omitted), operators,
+    coordinators and admins for any team. Positions are served from memory
+    right away and written to the database in periodic batches.
+    Rescuers on a WebSocket can send {"type": "location", ...} instead.
+    """
+    if current_user.role in POSITION_ADMIN_ROLES:
+        requested = {fix.team_id for fix in batch.positions if fix.team_id}
+        team_ids = {
+            team_id for (team_id,) in
+            db.query(RescueTeam.id).filter(RescueTeam.id.in_(requested)).all()
+        } if requested else set()
+    elif current_user.role == "rescuer" and current_user.team_id:
+        team_ids = {current_user.team_id}
+        for fix in batch.positions:
+            fix.team_id = fix.team_id or current_user.team_id
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only team members and dispatchers can report positions"
+        )
+    return record_fixes(batch.positions, current_user.id, team_ids)
+
+
+@router.get("/positions")
+@lane(POLLING)
+async def get_positions(
+    current_user: User = Depends(get_current_user)
+):
+    """Latest known fix of every team that reported one to this server"""
+    if current_user.role not in POSITION_ADMIN_ROLES:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized"
+        )
+    return [fix.to_dict() for fix in position_store.latest.values()]
+
+
+@router.get("/teams/{team_id}/track")
+async def get_team_track(
+    team_id: str,
+    minutes: int = Query(60, ge=1, le=24 * 60),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Recent track of a team
+
+    `points` is a list of [unix seconds, latitude, longitude], oldest first,
+    from the fixes received by this server (about 1 m precision).
+    """
+    if current_user.role not in POSITION_ADMIN_ROLES and current_user.team_id != team_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized"
+        )
+    since = datetime.utcnow() - timedelta(minutes=minutes)
+    return {
+        "team_id": team_id,
+        "points": [list(point) for point in position_store.track(team_id, since)],
+    }
+
 
 @router.get("/nearest-teams")
 async def get_nearest_teams(
@@ -28,88 +142,156 @@ async def get_nearest_teams(
     - **latitude**: Location latitude
     - **longitude**: Location longitude
     - **radius_km**: Search radius in kilometers
+    
+    Teams are ordered by ETA (road travel time when the road graph is built);
+    `eta_minutes` is null for teams that cannot reach the location by road.
     """
-    # Simple distance calculation (for MVP, use proper PostGIS in production)
     teams = db.query(RescueTeam).filter(
         RescueTeam.status == "available"
     ).all()
     
-    # TODO: Implement proper distance calculation
     nearby_teams = []
+    positions = []
     for team in teams:
-        if team.current_latitude and team.current_longitude:
-            # Simplified distance check
+        # Live position from memory, the last flushed one otherwise
+        position = position_store.position_of(team)
+        if position is None:
+            continue
+        distance = calculate_distance(latitude, longitude, position[0], position[1])
+        if distance <= radius_km:
+            fix = position_store.get(team.id)
+            positions.append(position)
             nearby_teams.append({
                 "id": str(team.id),
                 "name": team.name,
                 "type": team.type,
-                "latitude": float(team.current_latitude),
-                "longitude": float(team.current_longitude),
-                "distance_km": 0  # TODO: Calculate actual distance
+                "latitude": position[0],
+                "longitude": position[1],
+                "distance_km": round(distance, 2),
+                "position_recorded_at": fix.recorded_at if fix else team.updated_at
             })
     
+    if nearby_teams:
+        eta = eta_matrix(
+            np.array([latitude]), np.array([longitude]), np.array(positions, dtype=float),
+            np.array([[team["distance_km"] for team in nearby_teams]])
+        )[0]
+        for team, minutes in zip(nearby_teams, eta.tolist()):
+            team["eta_minutes"] = round(minutes, 1) if math.isfinite(minutes) else None
+    
+    nearby_teams.sort(key=lambda team: (team["eta_minutes"] is None, team["eta_minutes"], team["distance_km"]))
     return nearby_teams
 
 
 @router.get("/hydrants")
+@cached("hydrants", max_age=300)
 async def get_nearby_hydrants(
-    latitude: float,
-    longitude: float,
-    radius_km: float = 5.0,
+    latitude: float = Query(..., ge=-90, le=90),
+    longitude: float = Query(..., ge=-180, le=180),
+    radius_km: float = Query(5.0, gt=0, le=50),
+    limit: int = Query(50, ge=1, le=1000),
+    status: Optional[List[HydrantStatus]] = Query(None),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
-    Get nearby fire hydrants (mock data for MVP)
+    Nearest hydrants and water sources, nearest first
     
-    In production, integrate with city infrastructure database
-    """
-    # Mock hydrants data for Tver
-    mock_hydrants = [
-        {
-            "id": "h1",
-            "latitude": 56.8587,
-            "longitude": 35.9176,
-            "type": "underground",
-            "status": "operational"
-        },
-        {
-            "id": "h2",
-            "latitude": 56.8597,
-            "longitude": 35.9186,
-            "type": "surface",
-            "status": "operational"
-        }
-    ]
+    - **latitude**: Location latitude
+    - **longitude**: Location longitude
+    - **radius_km**: Search radius in kilometers
+    - **limit**: Max hydrants returned (k nearest)
+    - **status**: Only these statuses (repeatable, e.g. status=operational)
+    """
+    hydrant_index.ensure_fresh(db, await shared_version("hydrants"))
+    found = hydrant_index.query(
+        latitude, longitude, radius_km * 1000, limit,
+        [item.value for item in status] if status else None
+    )
+    return [hydrant.to_dict(distance) for distance, hydrant in found]
+
+
+@router.post("/hydrants/import")
+@invalidates("hydrants")
+@lane(BULK)
+async def import_hydrant_registry(
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Bulk import of hydrants from CSV or GeoJSON (coordinators/admins)
     
-    return mock_hydrants
+    Rows are matched to existing hydrants by `external_id` (`id` in the
+    dataset), so re-importing an updated dataset only writes the changes.
+    """
+    if current_user.role not in ["coordinator", "admin"]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized"
+        )
+    try:
+        records, skipped = parse_hydrants(await file.read(), file.filename or "")
+    except (UnicodeDecodeError, ValueError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid hydrant dataset: {e}"
+        )
+    result = import_hydrants(db, records)
+    hydrant_index.refresh(db)
+    return {**result, "skipped": skipped}
+
+
+def require_geocoder() -> Geocoder:
+    geocoder = get_geocoder()
+    if geocoder is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Geocoder index is not built"
+        )
+    return geocoder
 
 
 @router.post("/geocode")
 async def geocode_address(
     address: str,
-    db: Session = Depends(get_db),
+    limit: int = Query(5, ge=1, le=20),
     current_user: User = Depends(get_current_user)
 ):
     """
     Convert address to coordinates
     
-    - **address**: Address string
+    - **address**: Address string (typos and abbreviations are tolerated)
+    - **limit**: Number of candidates
+    
+    Answered from the local address index, without external services.
     """
-    # TODO: Integrate with geocoding service (Yandex Maps, Google Maps, etc.)
+    geocoder = require_geocoder()
+    candidates = [
+        candidate for candidate in geocoder.geocode(address, limit)
+        if candidate["confidence"] >= settings.GEOCODER_MIN_CONFIDENCE
+    ]
+    if not candidates:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Address not found"
+        )
+    best = candidates[0]
     return {
         "address": address,
-        "latitude": 56.8587,
-        "longitude": 35.9176,
-        "provider": "mock"
+        "matched_address": best["address"],
+        "latitude": best["latitude"],
+        "longitude": best["longitude"],
+        "confidence": best["confidence"],
+        "candidates": candidates,
+        "provider": "offline"
     }
 
 
 @router.post("/reverse-geocode")
 async def reverse_geocode(
-    latitude: float,
-    longitude: float,
-    db: Session = Depends(get_db),
+    latitude: float = Query(..., ge=-90, le=90),
+    longitude: float = Query(..., ge=-180, le=180),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -117,11 +299,19 @@ async def reverse_geocode(
     
     - **latitude**: Location latitude
     - **longitude**: Location longitude
+    
+    Nearest address point of the local index, within GEOCODER_REVERSE_MAX_METERS.
     """
-    # TODO: Integrate with geocoding service
+    nearest = require_geocoder().nearest(latitude, longitude)
+    if nearest is None or nearest["distance_m"] > settings.GEOCODER_REVERSE_MAX_METERS:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No address nearby"
+        )
     return {
         "latitude": latitude,
         "longitude": longitude,
-        "address": "Тверь, Россия",
-        "provider": "mock"
+        "address": nearest["address"],
+        "distance_m": nearest["distance_m"],
+        "provider": "offline"
     }
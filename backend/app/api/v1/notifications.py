@@ -7,6 +7,7 @@ from typing import List
 from uuid import UUID
 
 from app.core.database import get_db
+from app.core.rate_limit import POLLING, lane
 from app.api.v1.auth import get_current_user
 from app.models.user import User
 from app.models.notification import Notification
@@ -16,6 +17,7 @@ router = APIRouter()
 
 
 @router.get("/", response_model=List[NotificationResponse])
+@lane(POLLING)
 async def get_notifications(
     unread_only: bool = False,
     skip: int = 0,
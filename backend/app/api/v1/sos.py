@@ -1,77 +1,211 @@
 """
 SOS Alert endpoints
 """
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Header, Response
+from sqlalchemy import and_, func, or_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from uuid import UUID
 from datetime import datetime
 import asyncio
+import logging
 
-from app.core.database import get_db
+from app.core.database import get_db, get_read_db
 from app.api.v1.auth import get_current_user
 from app.models.user import User
-from app.models.sos_alert import SOSAlert, AlertStatus
+from app.models.sos_alert import (
+    ALERTS_COUNTER, AlertStatus, SOSAlert, SOSAlertRevocation, SOSAlertTombstone, SyncCounter
+)
 from app.models.team import RescueTeam
 from app.schemas.sos import (
     SOSAlertCreate,
     SOSAlertUpdate,
     SOSAlertResponse,
+    SOSAlertChanges,
     VoiceAnalysisRequest,
     ImageAnalysisRequest
 )
 from app.services.ai.voice import VoiceAssistant
 from app.services.ai.image import ImageAnalyzer
-from app.services.sos_service import create_sos_alert, update_sos_status
+from app.services.sos_service import create_sos_alert, update_sos_status, find_near_duplicate, merge_duplicate
 from app.services.notification_service import send_notification
-from app.api.v1.websocket import send_alert_to_user, send_alert_update_to_user
+from app.services.clustering import cluster_engine
+from app.services.heatmap import heatmap_index
+from app.api.v1.websocket import send_alert_to_users, send_alert_update_to_user, send_cluster_detected
+from app.utils.helpers import make_etag, etag_matches
+from app.core.cache import invalidates
+from app.core.idempotency import (
+    IDEMPOTENCY_HEADER,
+    MAX_KEY_LENGTH,
+    REPLAYED_HEADER,
+    idempotency_store,
+    request_fingerprint,
+)
+from app.core.metrics import SOS_ALERTS_CREATED, observe_alert_transition
+from app.core.rate_limit import BULK, CRITICAL, POLLING, lane
+from app.core.responses import FastJSONResponse
+from app.core.tracing import tracer
+from app.utils.logger import bind_alert_id
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 
+def enrich_alerts_with_names(alerts: List[SOSAlert], db: Session) -> List[dict]:
+    """
+    Добавляет имена спасателей и названия бригад к списку алертов
+    
+    Names are batch-loaded with one IN query per table instead of
+    two queries per alert.
+    """
+    rescuer_ids = {str(alert.assigned_to) for alert in alerts if alert.assigned_to}
+    team_ids = {str(alert.team_id) for alert in alerts if alert.team_id}
+    
+    rescuer_names = {}
+    if rescuer_ids:
+        rescuer_names = {
+            user_id: full_name or email
+            for user_id, full_name, email in db.query(User.id, User.full_name, User.email)
+            .filter(User.id.in_(rescuer_ids))
+        }
+    
+    team_names = {}
+    if team_ids:
+        team_names = dict(
+            db.query(RescueTeam.id, RescueTeam.name).filter(RescueTeam.id.in_(team_ids))
+        )
+    
+    return [
+        {
+            "id": alert.id,
+            "user_id": alert.user_id,
+            "type": alert.type,
+            "status": alert.status,
+            "priority": alert.priority,
+            "latitude": alert.latitude,
+            "longitude": alert.longitude,
+            "address": alert.address,
+            "title": alert.title,
+            "description": alert.description,
+            "media_urls": alert.media_urls,
+            "ai_analysis": alert.ai_analysis,
+            "assigned_to": alert.assigned_to,
+            "team_id": alert.team_id,
+            "created_at": alert.created_at,
+            "updated_at": alert.updated_at,
+            "assigned_at": alert.assigned_at,
+            "completed_at": alert.completed_at,
+            "assigned_to_name": rescuer_names.get(str(alert.assigned_to)) if alert.assigned_to else None,
+            "team_name": team_names.get(str(alert.team_id)) if alert.team_id else None
+        }
+        for alert in alerts
+    ]
+
+
 def enrich_alert_with_names(alert: SOSAlert, db: Session) -> dict:
     """Добавляет имена спасателя и бригады к объекту алерта"""
-    alert_dict = {
-        "id": alert.id,
-        "user_id": alert.user_id,
-        "type": alert.type,
-        "status": alert.status,
-        "priority": alert.priority,
-        "latitude": alert.latitude,
-        "longitude": alert.longitude,
-        "address": alert.address,
-        "title": alert.title,
-        "description": alert.description,
-        "media_urls": alert.media_urls,
-        "ai_analysis": alert.ai_analysis,
-        "assigned_to": alert.assigned_to,
-        "team_id": alert.team_id,
-        "created_at": alert.created_at,
-        "updated_at": alert.updated_at,
-        "assigned_at": alert.assigned_at,
-        "completed_at": alert.completed_at,
-        "assigned_to_name": None,
-        "team_name": None
-    }
+    return enrich_alerts_with_names([alert], db)[0]
+
+
+def apply_visibility_filters(query, current_user: User, model=SOSAlert):
+    """
+    Ограничивает выборку алертов в зависимости от роли пользователя
+    
+    - Citizens see their own alerts
+    - Rescuers see assigned alerts
+    - Operators/Admins see all alerts
     
-    # Загружаем имя спасателя если назначен
-    if alert.assigned_to:
-        rescuer = db.query(User).filter(User.id == str(alert.assigned_to)).first()
-        if rescuer:
-            alert_dict["assigned_to_name"] = rescuer.full_name or rescuer.email
+    `model` is SOSAlert or SOSAlertTombstone (deleted alerts are filtered
+    by the values they had when they were deleted).
+    """
+    if current_user.role == "citizen":
+        query = query.filter(model.user_id == current_user.id)
+    elif current_user.role == "rescuer":
+        # Rescuer sees:
+        # 1. Alerts assigned to them personally
+        # 2. Alerts assigned to their team (if they're in a team) - ANY status
+        # 3. Alerts in ASSIGNED status without specific rescuer (general pool)
+        filters = []
+        
+        # If rescuer is in a team, show ALL alerts assigned to that team
+        if current_user.team_id:
+            filters.append(model.team_id == current_user.team_id)
+        
+        # Show alerts assigned to them personally (not via team)
+        filters.append(
+            (model.assigned_to == current_user.id) & 
+            (model.team_id == None)
+        )
+        
+        # Show unassigned alerts in ASSIGNED status (general pool)
+        filters.append(
+            (model.status == AlertStatus.ASSIGNED.value) & 
+            (model.assigned_to == None) & 
+            (model.team_id == None)
+        )
+        
+        # Combine filters with OR
+        query = query.filter(or_(*filters))
     
-    # Загружаем название бригады если назначена
-    if alert.team_id:
-        team = db.query(RescueTeam).filter(RescueTeam.id == str(alert.team_id)).first()
-        if team:
-            alert_dict["team_name"] = team.name
+    return query
+
+
+class SyncCursor:
+    """Parsed delta sync cursor: a change position, or a plain timestamp from older clients"""
+    __slots__ = ("change_seq", "last_id", "timestamp")
+
+    def __init__(self, change_seq: Optional[int] = None, last_id: str = "", timestamp: Optional[datetime] = None):
+        self.change_seq = change_seq
+        self.last_id = last_id
+        self.timestamp = timestamp
+
+
+def parse_sync_cursor(cursor: Optional[str]) -> SyncCursor:
+    """
+    Parse delta sync cursor
     
-    return alert_dict
+    Accepts either a cursor returned by /changes ("<change seq>|<alert id>")
+    or a plain ISO timestamp (older clients, changes at or after it).
+    """
+    if not cursor:
+        return SyncCursor()
+    position, _, last_id = cursor.partition("|")
+    if position.isdigit():
+        return SyncCursor(int(position), last_id)
+    try:
+        return SyncCursor(timestamp=datetime.fromisoformat(position))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid sync cursor"
+        )
+
+
+def format_sync_cursor(change_seq: int, last_id: str = "") -> str:
+    """Build delta sync cursor"""
+    return f"{change_seq}|{last_id}"
+
+
+def filter_since(query, cursor: SyncCursor, seq_column, id_column, time_column):
+    """Rows after a sync cursor: (change_seq, id) > cursor, or time >= a plain timestamp"""
+    if cursor.change_seq is not None:
+        return query.filter(or_(
+            seq_column > cursor.change_seq,
+            and_(seq_column == cursor.change_seq, id_column > cursor.last_id)
+        ))
+    if cursor.timestamp is not None:
+        return query.filter(time_column >= cursor.timestamp)
+    return query
 
 
 @router.post("/", response_model=SOSAlertResponse, status_code=status.HTTP_201_CREATED)
+@invalidates("alerts")
+@lane(CRITICAL)
 async def create_alert(
     alert_data: SOSAlertCreate,
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -82,10 +216,55 @@ async def create_alert(
     - **latitude**: Location latitude
     - **longitude**: Location longitude
     - **description**: Description of emergency
+    
+    Retries carrying the same `Idempotency-Key` header get the original
+    response back (with `Idempotent-Replayed: true`) instead of a new alert.
+    A request of the same user and type close to an alert that is still
+    open is merged into it (200 with `X-Duplicate-Of`).
     """
+    alert_type_value = alert_data.type.value if hasattr(alert_data.type, 'value') else str(alert_data.type)
+    
+    store_key = fingerprint = None
+    if idempotency_key is not None:
+        if not idempotency_key or len(idempotency_key) > MAX_KEY_LENGTH:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"{IDEMPOTENCY_HEADER} must be 1-{MAX_KEY_LENGTH} characters long"
+            )
+        store_key = f"sos:{current_user.id}:{idempotency_key}"
+        fingerprint = request_fingerprint(alert_data.model_dump_json())
+        record = await idempotency_store.get(store_key)
+        if record is not None:
+            ensure_same_request(record["fingerprint"], fingerprint)
+            return replay_response(record)
+        existing = db.query(SOSAlert).filter(
+            SOSAlert.user_id == current_user.id,
+            SOSAlert.idempotency_key == idempotency_key
+        ).first()
+        if existing is not None:
+            ensure_same_request(existing.idempotency_fingerprint, fingerprint)
+            return await remember_response(store_key, fingerprint, existing, db, status.HTTP_201_CREATED, replay=True)
+    
+    duplicate = find_near_duplicate(
+        db, current_user.id, alert_type_value, alert_data.latitude, alert_data.longitude
+    )
+    if duplicate is not None:
+        merge_duplicate(duplicate, alert_data)
+        db.commit()
+        db.refresh(duplicate)
+        bind_alert_id(duplicate.id)
+        logger.info("SOS alert merged into a near duplicate", extra={"type": alert_type_value})
+        return await remember_response(store_key, fingerprint, duplicate, db, status.HTTP_200_OK)
+    
+    # Loaded before the insert: warming afterwards would load the new alert
+    # too, and add() below would skip it without announcing its cluster
+    cluster_engine.warm(db)
+    
     new_alert = SOSAlert(
         user_id=current_user.id,
-        type=alert_data.type.value if hasattr(alert_data.type, 'value') else str(alert_data.type),
+        idempotency_key=idempotency_key,
+        idempotency_fingerprint=fingerprint,
+        type=alert_type_value,
         latitude=alert_data.latitude,
         longitude=alert_data.longitude,
         title=alert_data.title,
@@ -95,11 +274,27 @@ async def create_alert(
     )
     
     db.add(new_alert)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        # A concurrent retry with the same key won the insert
+        db.rollback()
+        if idempotency_key is None:
+            raise
+        existing = db.query(SOSAlert).filter(
+            SOSAlert.user_id == current_user.id,
+            SOSAlert.idempotency_key == idempotency_key
+        ).first()
+        if existing is None:
+            raise
+        ensure_same_request(existing.idempotency_fingerprint, fingerprint)
+        return await remember_response(store_key, fingerprint, existing, db, status.HTTP_201_CREATED, replay=True)
     db.refresh(new_alert)
     
     # TODO: Send notifications to operators
-    alert_type_value = alert_data.type.value if hasattr(alert_data.type, 'value') else str(alert_data.type)
+    SOS_ALERTS_CREATED.labels(alert_type_value).inc()
+    bind_alert_id(new_alert.id)
+    logger.info("SOS alert created", extra={"type": alert_type_value})
     await send_notification(
         db=db,
         user_id=current_user.id,
@@ -108,58 +303,90 @@ async def create_alert(
         alert_id=new_alert.id
     )
     
-    return enrich_alert_with_names(new_alert, db)
+    heatmap_index.add(
+        float(new_alert.latitude), float(new_alert.longitude), new_alert.created_at, new_alert.type, new_alert.status
+    )
+    
+    # Mass incident detection: operators are told once per new cluster
+    for cluster in cluster_engine.add(
+        new_alert.id, float(new_alert.latitude), float(new_alert.longitude),
+        new_alert.created_at, new_alert.type, new_alert.priority
+    ):
+        logger.warning("Cluster of SOS alerts detected", extra={"alerts": cluster["alert_count"]})
+        asyncio.create_task(send_cluster_detected(cluster))
+    
+    if store_key is None:
+        return enrich_alert_with_names(new_alert, db)
+    return await remember_response(store_key, fingerprint, new_alert, db, status.HTTP_201_CREATED)
+
+
+def ensure_same_request(stored: Optional[str], fingerprint: str):
+    """
+    Reject an Idempotency-Key reused for a different payload (422)
+
+    Alerts created before fingerprints were stored have none and are
+    replayed as before.
+    """
+    if stored is not None and stored != fingerprint:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"{IDEMPOTENCY_HEADER} was already used for a different request"
+        )
+
+
+def replay_response(record: dict) -> FastJSONResponse:
+    """Response of an idempotency record"""
+    response = FastJSONResponse(content=record["body"], status_code=record["status_code"])
+    response.headers.update(record["headers"])
+    response.headers[REPLAYED_HEADER] = "true"
+    return response
+
+
+async def remember_response(
+    store_key: Optional[str],
+    fingerprint: Optional[str],
+    alert: SOSAlert,
+    db: Session,
+    status_code: int,
+    replay: bool = False
+) -> FastJSONResponse:
+    """
+    Build the create_alert response for `alert` and keep it for replays
+    
+    Args:
+        store_key: Idempotency store key (None - request without Idempotency-Key)
+        fingerprint: Request payload hash
+        alert: Created, merged or previously created alert
+        db: Database session
+        status_code: 201 for a created alert, 200 for a merged near duplicate
+        replay: Whether the alert was created by an earlier request with the same key
+    """
+    body = SOSAlertResponse.model_validate(enrich_alert_with_names(alert, db)).model_dump(mode="json")
+    headers = {"X-Duplicate-Of": alert.id} if status_code == status.HTTP_200_OK else {}
+    record = {"fingerprint": fingerprint, "status_code": status_code, "body": body, "headers": headers}
+    if store_key is not None:
+        await idempotency_store.set(store_key, record)
+    if replay:
+        return replay_response(record)
+    return FastJSONResponse(content=body, status_code=status_code, headers=headers)
 
 
 @router.get("/", response_model=List[SOSAlertResponse])
+@lane(POLLING)
 async def get_alerts(
     status: Optional[str] = None,
     type: Optional[str] = None,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Get list of SOS alerts
     
-    Filters based on user role:
-    - Citizens see their own alerts
-    - Rescuers see assigned alerts
-    - Operators/Admins see all alerts
+    Filters based on user role (see apply_visibility_filters)
     """
-    query = db.query(SOSAlert)
-    
-    # Role-based filtering
-    if current_user.role == "citizen":
-        query = query.filter(SOSAlert.user_id == current_user.id)
-    elif current_user.role == "rescuer":
-        # Rescuer sees:
-        # 1. Alerts assigned to them personally
-        # 2. Alerts assigned to their team (if they're in a team) - ANY status
-        # 3. Alerts in ASSIGNED status without specific rescuer (general pool)
-        filters = []
-        
-        # If rescuer is in a team, show ALL alerts assigned to that team
-        if current_user.team_id:
-            filters.append(SOSAlert.team_id == current_user.team_id)
-        
-        # Show alerts assigned to them personally (not via team)
-        filters.append(
-            (SOSAlert.assigned_to == current_user.id) & 
-            (SOSAlert.team_id == None)
-        )
-        
-        # Show unassigned alerts in ASSIGNED status (general pool)
-        filters.append(
-            (SOSAlert.status == AlertStatus.ASSIGNED.value) & 
-            (SOSAlert.assigned_to == None) & 
-            (SOSAlert.team_id == None)
-        )
-        
-        # Combine filters with OR
-        from sqlalchemy import or_
-        query = query.filter(or_(*filters))
+    query = apply_visibility_filters(db.query(SOSAlert), current_user)
     
     # Apply filters
     if status:
@@ -169,9 +396,115 @@ async def get_alerts(
     
     alerts = query.order_by(SOSAlert.created_at.desc()).offset(skip).limit(limit).all()
     
-    # Обогащаем алерты именами спасателей и бригад
-    enriched_alerts = [enrich_alert_with_names(alert, db) for alert in alerts]
-    return enriched_alerts
+    # Обогащаем алерты именами спасателей и бригад; rows come straight from
+    # the DB, so the response_model validation pass is skipped
+    return FastJSONResponse(enrich_alerts_with_names(alerts, db))
+
+
+@router.get("/changes", response_model=SOSAlertChanges)
+@lane(POLLING)
+async def get_alert_changes(
+    since: Optional[str] = None,
+    limit: int = 500,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Delta sync: alerts created, modified or deleted since a cursor
+    
+    - **since**: Cursor from the previous response (or an ISO timestamp).
+      Omit it for the initial full sync.
+    - **limit**: Maximum number of alerts per page (check `has_more`)
+    
+    `deleted` lists alerts removed since the cursor, `revoked` alerts the
+    user can no longer see (reassigned elsewhere); clients drop both. The
+    cursor is a position in the commit-ordered change sequence (see
+    app.models.sos_alert), so no change is skipped however close in time.
+    
+    Responds with 304 Not Modified when the ETag sent in If-None-Match
+    still matches, without loading any alert rows.
+    """
+    limit = max(1, min(limit, 1000))
+    cursor = parse_sync_cursor(since)
+    
+    # Every alert write bumps the counter, so it decides alone whether
+    # anything changed since the ETag was issued
+    counter = db.query(SyncCounter.value).filter(SyncCounter.name == ALERTS_COUNTER).scalar() or 0
+    etag = make_etag(current_user.id, current_user.role, current_user.team_id, since, limit, counter)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    
+    changed = filter_since(
+        apply_visibility_filters(db.query(SOSAlert), current_user),
+        cursor, SOSAlert.change_seq, SOSAlert.id, SOSAlert.updated_at
+    )
+    tombstones = filter_since(
+        apply_visibility_filters(db.query(SOSAlertTombstone), current_user, SOSAlertTombstone),
+        cursor, SOSAlertTombstone.change_seq, SOSAlertTombstone.alert_id, SOSAlertTombstone.deleted_at
+    )
+    # Only rescuers lose alerts they could see (reassigned to another team or rescuer)
+    revocations = None
+    if current_user.role == "rescuer":
+        revocations = filter_since(
+            apply_visibility_filters(db.query(SOSAlertRevocation), current_user, SOSAlertRevocation),
+            cursor, SOSAlertRevocation.change_seq, SOSAlertRevocation.alert_id, SOSAlertRevocation.revoked_at
+        )
+    
+    alerts = changed.order_by(SOSAlert.change_seq.asc(), SOSAlert.id.asc()).limit(limit + 1).all()
+    has_more = len(alerts) > limit
+    alerts = alerts[:limit]
+    
+    def positions(query, seq_column, id_column) -> List[Tuple[int, str]]:
+        """(change seq, alert id) of the rows of this page"""
+        if has_more:
+            # Next page continues right after the last alert of this one
+            last = alerts[-1]
+            query = query.filter(or_(
+                seq_column < last.change_seq,
+                and_(seq_column == last.change_seq, id_column <= last.id)
+            ))
+        return [
+            (change_seq or 0, alert_id) for change_seq, alert_id in
+            query.with_entities(seq_column, id_column).order_by(seq_column.asc(), id_column.asc()).all()
+        ]
+    
+    deleted = positions(tombstones, SOSAlertTombstone.change_seq, SOSAlertTombstone.alert_id)
+    revoked, revoked_ids = [], set()
+    if revocations is not None:
+        revoked = positions(revocations, SOSAlertRevocation.change_seq, SOSAlertRevocation.alert_id)
+        revoked_ids = {alert_id for _, alert_id in revoked}
+        if revoked_ids:
+            # Still visible some other way (or given back): not revoked
+            still_visible = {
+                alert_id for (alert_id,) in apply_visibility_filters(
+                    db.query(SOSAlert.id).filter(SOSAlert.id.in_(revoked_ids)), current_user
+                )
+            }
+            revoked_ids -= still_visible
+            revoked_ids -= {alert_id for _, alert_id in deleted}
+    
+    # The cursor is the newest (change seq, id) sent. Without more pages
+    # everything up to the counter value read above has been seen.
+    if has_more:
+        next_cursor = format_sync_cursor(alerts[-1].change_seq or 0, alerts[-1].id)
+    else:
+        newest = [(alert.change_seq or 0, alert.id) for alert in alerts[-1:]] + deleted[-1:] + revoked[-1:]
+        newest.append((counter, ""))
+        if cursor.change_seq is not None:
+            newest.append((cursor.change_seq, cursor.last_id))
+        next_cursor = format_sync_cursor(*max(newest))
+    
+    return FastJSONResponse(
+        {
+            "alerts": enrich_alerts_with_names(alerts, db),
+            "deleted": [alert_id for _, alert_id in deleted],
+            "revoked": sorted(revoked_ids),
+            "cursor": next_cursor,
+            "has_more": has_more
+        },
+        headers={"ETag": etag}
+    )
 
 
 @router.get("/{alert_id}", response_model=SOSAlertResponse)
@@ -200,6 +533,8 @@ async def get_alert(
 
 
 @router.patch("/{alert_id}", response_model=SOSAlertResponse)
+@invalidates("alerts")
+@lane(CRITICAL)
 async def update_alert(
     alert_id: str,
     alert_update: SOSAlertUpdate,
@@ -225,6 +560,9 @@ async def update_alert(
             detail="Alert not found"
         )
     
+    bind_alert_id(alert.id)
+    previous_status = alert.status
+    
     # Rescuer can accept ASSIGNED alerts and work with their own alerts
     if current_user.role == "rescuer":
         # Check if user is a team leader
@@ -288,44 +626,50 @@ async def update_alert(
         if alert_update.priority is not None:
             alert.priority = alert_update.priority
         if alert_update.assigned_to:
-            alert.assigned_to = alert_update.assigned_to
+            alert.assigned_to = str(alert_update.assigned_to)
         if alert_update.team_id:
-            alert.team_id = alert_update.team_id
+            alert.team_id = str(alert_update.team_id)
         if alert_update.description:
             alert.description = alert_update.description
     
     alert.updated_at = datetime.utcnow()
     
-    db.commit()
-    db.refresh(alert)
+    with tracer.start_as_current_span("sos.update_alert.commit"):
+        db.commit()
+        db.refresh(alert)
+    observe_alert_transition(alert, previous_status)
+    heatmap_index.move(
+        float(alert.latitude), float(alert.longitude), alert.created_at, alert.type, previous_status, alert.status
+    )
+    
+    with tracer.start_as_current_span("sos.enrich_alert"):
+        alert_data = enrich_alert_with_names(alert, db)
     
     # Send WebSocket notifications to team members when alert is assigned
     if alert.status == AlertStatus.ASSIGNED.value and alert.team_id:
-        print(f"🚨 Sending WebSocket notification to team {alert.team_id}")
+        logger.info("Sending alert to team", extra={"team_id": alert.team_id})
         # Get all team members
-        team_members = db.query(User).filter(User.team_id == alert.team_id).all()
-        print(f"📋 Found {len(team_members)} team members")
+        member_ids = [
+            str(member_id)
+            for (member_id,) in db.query(User.id).filter(User.team_id == alert.team_id).all()
+        ]
+        logger.debug("Team members to notify", extra={"team_id": alert.team_id, "recipients": len(member_ids)})
         
-        # Prepare alert data
-        alert_data = enrich_alert_with_names(alert, db)
-        
-        # Send notification to each team member asynchronously
-        for member in team_members:
-            print(f"📤 Sending notification to user {member.id} ({member.email})")
-            asyncio.create_task(send_alert_to_user(str(member.id), alert_data))
+        # Message is encoded once and fanned out to all members asynchronously
+        asyncio.create_task(send_alert_to_users(member_ids, alert_data))
     
     # Send update notification to assigned rescuer
     elif alert.assigned_to:
-        print(f"📤 Sending WebSocket update to user {alert.assigned_to}")
-        alert_data = enrich_alert_with_names(alert, db)
+        logger.info("Sending alert update to assignee", extra={"user_id": str(alert.assigned_to)})
         asyncio.create_task(send_alert_update_to_user(str(alert.assigned_to), alert_data))
     else:
-        print(f"ℹ️ No WebSocket notification sent. Status: {alert.status}, team_id: {alert.team_id}, assigned_to: {alert.assigned_to}")
+        logger.debug("No WebSocket notification sent", extra={"status": alert.status})
     
-    return enrich_alert_with_names(alert, db)
+    return alert_data
 
 
 @router.delete("/{alert_id}")
+@invalidates("alerts")
 async def delete_alert(
     alert_id: UUID,
     db: Session = Depends(get_db),
@@ -342,7 +686,7 @@ async def delete_alert(
             detail="Not authorized to delete alerts"
         )
     
-    alert = db.query(SOSAlert).filter(SOSAlert.id == alert_id).first()
+    alert = db.query(SOSAlert).filter(SOSAlert.id == str(alert_id)).first()
     if not alert:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -350,12 +694,22 @@ async def delete_alert(
         )
     
     db.delete(alert)
+    # Leave a tombstone so delta sync clients drop the alert too
+    db.merge(SOSAlertTombstone(
+        alert_id=alert.id, deleted_at=datetime.utcnow(), user_id=alert.user_id,
+        status=alert.status, assigned_to=alert.assigned_to, team_id=alert.team_id
+    ))
     db.commit()
+    cluster_engine.remove(alert.id)
+    heatmap_index.add(
+        float(alert.latitude), float(alert.longitude), alert.created_at, alert.type, alert.status, -1
+    )
     
     return {"message": "Alert deleted successfully"}
 
 
 @router.post("/analyze/voice")
+@lane(BULK)
 async def analyze_voice(
     request: VoiceAnalysisRequest,
     db: Session = Depends(get_db),
@@ -383,6 +737,7 @@ async def analyze_voice(
 
 
 @router.post("/analyze/image")
+@lane(BULK)
 async def analyze_image(
     request: ImageAnalysisRequest,
     db: Session = Depends(get_db),
@@ -410,8 +765,9 @@ async def analyze_image(
 
 
 @router.get("/stats/summary")
+@lane(BULK)
 async def get_stats_summary(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get summary statistics of SOS alerts"""
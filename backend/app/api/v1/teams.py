@@ -6,16 +6,32 @@ from sqlalchemy.orm import Session
 from typing import List
 from uuid import UUID
 
-from app.core.database import get_db
+from app.core.database import get_db, get_read_db
 from app.api.v1.auth import get_current_user
 from app.models.user import User
 from app.models.team import RescueTeam
-from app.schemas.team import RescueTeamCreate, RescueTeamUpdate, RescueTeamResponse
+from app.schemas.team import (
+    RescueTeamCreate,
+    RescueTeamUpdate,
+    RescueTeamResponse,
+    TeamRosterImport
+)
+from app.core.cache import cached, invalidates
+from app.core.rate_limit import POLLING, lane
+from app.core.responses import FastJSONResponse
+from app.services.positions import position_store
+from app.services.team_service import (
+    query_teams_with_leaders,
+    project_team_rows,
+    replace_team_rosters,
+    serialize_team
+)
 
 router = APIRouter()
 
 
 @router.post("/", response_model=RescueTeamResponse, status_code=status.HTTP_201_CREATED)
+@invalidates("teams", "users")
 async def create_team(
     team_data: RescueTeamCreate,
     db: Session = Depends(get_db),
@@ -62,157 +78,148 @@ async def create_team(
     
     # Update team members
     if team_data.member_ids:
-        members_list = []
-        for member_id in team_data.member_ids:
-            member = db.query(User).filter(User.id == member_id).first()
-            if member and member.role == "rescuer":
-                member.team_id = new_team.id
-                member.is_team_leader = (member_id == team_data.leader_id)
-                members_list.append({
-                    "user_id": member_id,
-                    "name": member.full_name or member.email,
-                    "specialization": member.specialization if member.specialization else None
-                })
-        new_team.members = members_list
+        replace_team_rosters(db, [(new_team, team_data.member_ids, team_data.leader_id)])
     
     db.commit()
     db.refresh(new_team)
     
-    # Enrich response with leader name
-    response_dict = {
-        "id": new_team.id,
-        "name": new_team.name,
-        "type": new_team.type,
-        "status": new_team.status,
-        "current_latitude": new_team.current_latitude,
-        "current_longitude": new_team.current_longitude,
-        "members": new_team.members,
-        "equipment": new_team.equipment,
-        "base_latitude": new_team.base_latitude,
-        "base_longitude": new_team.base_longitude,
-        "base_address": new_team.base_address,
-        "capacity": new_team.capacity,
-        "specialization": new_team.specialization,
-        "leader_id": new_team.leader_id,
-        "leader_name": None,
-        "member_count": len(new_team.members) if new_team.members else 0,
-        "contact_phone": new_team.contact_phone,
-        "contact_email": new_team.contact_email,
-        "created_at": new_team.created_at,
-        "updated_at": new_team.updated_at
+    return serialize_team(db, new_team)
+
+
+@router.post("/roster/import")
+@invalidates("teams", "users")
+async def import_team_rosters(
+    roster_import: TeamRosterImport,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Replace the rosters of many teams in one transaction (coordinator/admin only)
+    
+    - **teams**: List of {team_id, member_ids, leader_id}
+    
+    A user may appear in only one roster. Leaders are added to their team's
+    members if missing. Members of the listed teams that are not in the new
+    rosters are detached.
+    """
+    if current_user.role not in ["coordinator", "admin"]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized"
+        )
+    
+    entries = roster_import.teams
+    team_ids = [entry.team_id for entry in entries]
+    if len(set(team_ids)) != len(team_ids):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Each team may appear only once"
+        )
+    
+    seen = set()
+    for entry in entries:
+        if entry.leader_id and entry.leader_id not in entry.member_ids:
+            entry.member_ids.append(entry.leader_id)
+        duplicates = seen.intersection(entry.member_ids)
+        if duplicates:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Users assigned to several teams: {sorted(duplicates)}"
+            )
+        seen.update(entry.member_ids)
+    
+    teams = {
+        team.id: team
+        for team in db.query(RescueTeam).filter(RescueTeam.id.in_(team_ids))
     }
+    missing = [team_id for team_id in team_ids if team_id not in teams]
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Teams not found: {missing}"
+        )
     
-    if new_team.leader_id:
-        leader = db.query(User).filter(User.id == new_team.leader_id).first()
-        if leader:
-            response_dict["leader_name"] = leader.full_name or leader.email
+    # Without an explicit leader the current one stays if still a member
+    leaders = {}
+    for entry in entries:
+        current_leader = teams[entry.team_id].leader_id
+        if entry.leader_id:
+            leaders[entry.team_id] = entry.leader_id
+        elif current_leader in entry.member_ids:
+            leaders[entry.team_id] = current_leader
+        else:
+            leaders[entry.team_id] = None
     
-    return response_dict
+    skipped = replace_team_rosters(
+        db,
+        [(teams[entry.team_id], entry.member_ids, leaders[entry.team_id]) for entry in entries]
+    )
+    
+    invalid_leaders = [leader_id for leader_id in leaders.values() if leader_id in skipped]
+    if invalid_leaders:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid leaders: {invalid_leaders}"
+        )
+    
+    for team_id, leader_id in leaders.items():
+        teams[team_id].leader_id = leader_id
+    
+    db.commit()
+    
+    return {
+        "teams_updated": len(entries),
+        "members_assigned": len(seen) - len(skipped),
+        "skipped_member_ids": skipped
+    }
 
 
 @router.get("/", response_model=List[RescueTeamResponse])
+@cached("teams", "users", max_age=30)
+@lane(POLLING)
 async def get_teams(
     status: str = None,
     type: str = None,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get list of rescue teams"""
-    query = db.query(RescueTeam)
+    # Leader names come from the same query (outer join), not one query per team
+    query = query_teams_with_leaders(db)
     
     if status:
         query = query.filter(RescueTeam.status == status)
     if type:
         query = query.filter(RescueTeam.type == type)
     
-    teams = query.offset(skip).limit(limit).all()
-    
-    # Enrich with leader names
-    enriched_teams = []
-    for team in teams:
-        team_dict = {
-            "id": team.id,
-            "name": team.name,
-            "type": team.type,
-            "status": team.status,
-            "current_latitude": team.current_latitude,
-            "current_longitude": team.current_longitude,
-            "members": team.members,
-            "equipment": team.equipment,
-            "base_latitude": team.base_latitude,
-            "base_longitude": team.base_longitude,
-            "base_address": team.base_address,
-            "capacity": team.capacity,
-            "specialization": team.specialization,
-            "leader_id": team.leader_id,
-            "leader_name": None,
-            "member_count": len(team.members) if team.members else 0,
-            "contact_phone": team.contact_phone,
-            "contact_email": team.contact_email,
-            "created_at": team.created_at,
-            "updated_at": team.updated_at
-        }
-        
-        if team.leader_id:
-            leader = db.query(User).filter(User.id == team.leader_id).first()
-            if leader:
-                team_dict["leader_name"] = leader.full_name or leader.email
-        
-        enriched_teams.append(team_dict)
-    
-    return enriched_teams
+    rows = query.offset(skip).limit(limit).all()
+    return FastJSONResponse(project_team_rows(rows))
 
 
 @router.get("/{team_id}", response_model=RescueTeamResponse)
+@cached("teams", "users", max_age=30)
 async def get_team(
     team_id: str,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get team by ID"""
-    team = db.query(RescueTeam).filter(RescueTeam.id == str(team_id)).first()
+    row = query_teams_with_leaders(db).filter(RescueTeam.id == str(team_id)).first()
     
-    if not team:
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Team not found"
         )
     
-    # Enrich with leader name
-    team_dict = {
-        "id": team.id,
-        "name": team.name,
-        "type": team.type,
-        "status": team.status,
-        "current_latitude": team.current_latitude,
-        "current_longitude": team.current_longitude,
-        "members": team.members,
-        "equipment": team.equipment,
-        "base_latitude": team.base_latitude,
-        "base_longitude": team.base_longitude,
-        "base_address": team.base_address,
-        "capacity": team.capacity,
-        "specialization": team.specialization,
-        "leader_id": team.leader_id,
-        "leader_name": None,
-        "member_count": len(team.members) if team.members else 0,
-        "contact_phone": team.contact_phone,
-        "contact_email": team.contact_email,
-        "created_at": team.created_at,
-        "updated_at": team.updated_at
-    }
-    
-    if team.leader_id:
-        leader = db.query(User).filter(User.id == team.leader_id).first()
-        if leader:
-            team_dict["leader_name"] = leader.full_name or leader.email
-    
-    return team_dict
+    return project_team_rows([row])[0]
 
 
 @router.patch("/{team_id}", response_model=RescueTeamResponse)
+@invalidates("teams", "users")
 async def update_team(
     team_id: str,
     team_update: RescueTeamUpdate,
@@ -265,64 +272,25 @@ async def update_team(
     
     # Update members (coordinator/admin only)
     if team_update.member_ids is not None and current_user.role in ["coordinator", "admin"]:
-        # Remove old members from team
-        old_members = db.query(User).filter(User.team_id == team.id).all()
-        for member in old_members:
-            member.team_id = None
-            member.is_team_leader = False
-        
-        # Add new members
-        members_list = []
-        for member_id in team_update.member_ids:
-            member = db.query(User).filter(User.id == member_id).first()
-            if member and member.role == "rescuer":
-                member.team_id = team.id
-                member.is_team_leader = (member_id == team.leader_id)
-                members_list.append({
-                    "user_id": member_id,
-                    "name": member.full_name or member.email,
-                    "specialization": member.specialization if member.specialization else None
-                })
-        team.members = members_list
+        # Old members are detached and new ones attached in bulk
+        replace_team_rosters(db, [(team, team_update.member_ids, team.leader_id)])
     elif team_update.members:
         team.members = team_update.members
     
     db.commit()
     db.refresh(team)
+    if team_update.current_latitude is not None or team_update.current_longitude is not None:
+        if team.current_latitude is not None and team.current_longitude is not None:
+            position_store.record(
+                team.id, float(team.current_latitude), float(team.current_longitude),
+                reported_by=current_user.id, persisted=True
+            )
     
-    # Enrich response
-    response_dict = {
-        "id": team.id,
-        "name": team.name,
-        "type": team.type,
-        "status": team.status,
-        "current_latitude": team.current_latitude,
-        "current_longitude": team.current_longitude,
-        "members": team.members,
-        "equipment": team.equipment,
-        "base_latitude": team.base_latitude,
-        "base_longitude": team.base_longitude,
-        "base_address": team.base_address,
-        "capacity": team.capacity,
-        "specialization": team.specialization,
-        "leader_id": team.leader_id,
-        "leader_name": None,
-        "member_count": len(team.members) if team.members else 0,
-        "contact_phone": team.contact_phone,
-        "contact_email": team.contact_email,
-        "created_at": team.created_at,
-        "updated_at": team.updated_at
-    }
-    
-    if team.leader_id:
-        leader = db.query(User).filter(User.id == team.leader_id).first()
-        if leader:
-            response_dict["leader_name"] = leader.full_name or leader.email
-    
-    return response_dict
+    return serialize_team(db, team)
 
 
 @router.delete("/{team_id}")
+@invalidates("teams", "users")
 async def delete_team(
     team_id: str,
     db: Session = Depends(get_db),
@@ -342,7 +310,13 @@ async def delete_team(
             detail="Team not found"
         )
     
+    # Members no longer belong to any team
+    db.query(User).filter(User.team_id == team.id).update(
+        {User.team_id: None, User.is_team_leader: False},
+        synchronize_session=False
+    )
     db.delete(team)
     db.commit()
+    position_store.forget(team.id)
     
     return {"message": "Team deleted successfully"}
@@ -6,19 +6,22 @@ from sqlalchemy.orm import Session
 from typing import List
 from uuid import UUID
 
-from app.core.database import get_db
+from app.core.database import get_db, get_read_db
 from app.api.v1.auth import get_current_user
 from app.models.user import User
 from app.schemas.user import UserResponse, UserUpdate
+from app.core.cache import invalidates
+from app.core.rate_limit import POLLING, lane
 
 router = APIRouter()
 
 
 @router.get("/", response_model=List[UserResponse])
+@lane(POLLING)
 async def get_users(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -61,6 +64,7 @@ async def get_user(
 
 
 @router.patch("/{user_id}", response_model=UserResponse)
+@invalidates("users")
 async def update_user(
     user_id: str,
     user_update: UserUpdate,
@@ -111,6 +115,7 @@ async def update_user(
 
 
 @router.delete("/{user_id}")
+@invalidates("users")
 async def delete_user(
     user_id: UUID,
     db: Session = Depends(get_db),
@@ -2,11 +2,20 @@
 WebSocket endpoint for real-time notifications
 """
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Query, status
-from typing import Optional
+from pydantic import ValidationError
+from typing import Iterable, Optional
 import json
 import asyncio
 import logging
 
+from app.api.v1.geolocation import record_fixes
+from app.core.database import SessionLocal
+from app.core.responses import dumps
+from app.core.security import decode_token
+from app.models.user import User
+from app.schemas.team import PositionFix
+from app.core.tracing import tracer
+from app.services.position_stream import TOPIC as POSITIONS_TOPIC, parse_bbox, position_stream
 from app.services.websocket_service import manager
 
 logger = logging.getLogger(__name__)
@@ -39,14 +48,21 @@ async def websocket_endpoint(
         # For now, we'll accept the connection and log it
         logger.info(f"WebSocket connection attempt for user {user_id}")
         
+        # Role-targeted broadcasts only reach users with a valid token of their own
+        payload = decode_token(token)
+        role = None
+        if payload and payload.get("type") == "access" and payload.get("sub") == user_id:
+            role = payload.get("role")
+        
     except Exception as e:
         logger.error(f"WebSocket authentication error for user {user_id}: {e}")
         await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
         return
     
     # Accept connection
-    await manager.connect(websocket, user_id)
+    await manager.connect(websocket, user_id, role)
     logger.info(f"WebSocket connected for user {user_id}")
+    location_team_id = None  # Team of the rescuer, resolved on the first location message
     
     try:
         # Keep connection alive and handle incoming messages
@@ -74,7 +90,24 @@ async def websocket_endpoint(
                         # Handle subscription to specific topics
                         topics = message.get("topics", [])
                         logger.info(f"User {user_id} subscribed to topics: {topics}")
-                        # TODO: Implement topic-based subscriptions
+                        if POSITIONS_TOPIC in topics:
+                            if role in OPERATOR_ROLES:
+                                await position_stream.subscribe(websocket, parse_bbox(message.get("bbox")))
+                            else:
+                                logger.warning(f"User {user_id} is not allowed to subscribe to {POSITIONS_TOPIC}")
+                        
+                    elif message_type == "unsubscribe":
+                        for topic in message.get("topics", []):
+                            manager.unsubscribe(websocket, topic)
+                        
+                    elif message_type == "location":
+                        # GPS fix of the rescuer's team
+                        if location_team_id is None and role == "rescuer":
+                            location_team_id = get_user_team_id(user_id)
+                        if location_team_id:
+                            record_location(user_id, location_team_id, message)
+                        else:
+                            logger.warning(f"Location from user {user_id} without a team ignored")
                         
                     else:
                         logger.warning(f"Unknown message type from user {user_id}: {message_type}")
@@ -95,6 +128,34 @@ async def websocket_endpoint(
         logger.info(f"WebSocket cleaned up for user {user_id}")
 
 
+def get_user_team_id(user_id: str) -> Optional[str]:
+    """Team of a user (WebSocket handlers have no request-scoped session)"""
+    db = SessionLocal()
+    try:
+        return db.query(User.team_id).filter(User.id == user_id).scalar()
+    finally:
+        db.close()
+
+
+def record_location(user_id: str, team_id: str, message: dict):
+    """
+    Store a location message: {"type": "location", "latitude", "longitude",
+    "recorded_at"?, "accuracy"?, "speed"?, "heading"?}
+    """
+    try:
+        fix = PositionFix(**{key: value for key, value in message.items() if key != "type"})
+    except ValidationError as e:
+        logger.warning(f"Invalid location from user {user_id}: {e.errors()}")
+        return
+    fix.team_id = fix.team_id or team_id
+    record_fixes([fix], user_id, {team_id})
+
+
+def encode_message(message_type: str, data: dict) -> str:
+    """Encode a WebSocket message once so it can be sent to any number of sockets"""
+    return dumps({"type": message_type, "data": data}).decode()
+
+
 async def send_alert_to_user(user_id: str, alert_data: dict):
     """
     Send alert notification to specific user via WebSocket
@@ -103,16 +164,29 @@ async def send_alert_to_user(user_id: str, alert_data: dict):
         user_id: User ID to send to
         alert_data: Alert data to send
     """
-    try:
-        message = {
-            "type": "new_alert",
-            "data": alert_data
-        }
-        logger.info(f"🚨 Attempting to send new_alert to user {user_id}: alert_id={alert_data.get('id')}")
-        await manager.send_personal_message(json.dumps(message), user_id)
-        logger.info(f"✅ Successfully sent new_alert to user {user_id}")
-    except Exception as e:
-        logger.error(f"❌ Error sending alert to user {user_id}: {e}", exc_info=True)
+    await send_alert_to_users([user_id], alert_data)
+
+
+async def send_alert_to_users(user_ids: Iterable[str], alert_data: dict):
+    """
+    Send alert notification to several users via WebSocket
+    
+    Args:
+        user_ids: User IDs to send to
+        alert_data: Alert data to send
+    """
+    user_ids = list(user_ids)
+    with tracer.start_as_current_span("ws.send_alert", attributes={
+        "alert.id": str(alert_data.get("id")),
+        "ws.recipients": len(user_ids),
+    }):
+        try:
+            message = encode_message("new_alert", alert_data)
+            logger.info(f"🚨 Attempting to send new_alert to {len(user_ids)} users: alert_id={alert_data.get('id')}")
+            await manager.send_to_users(message, user_ids)
+            logger.info(f"✅ Successfully sent new_alert to {len(user_ids)} users")
+        except Exception as e:
+            logger.error(f"❌ Error sending alert to users {user_ids}: {e}", exc_info=True)
 
 
 async def send_alert_update_to_user(user_id: str, alert_data: dict):
@@ -123,15 +197,15 @@ async def send_alert_update_to_user(user_id: str, alert_data: dict):
         user_id: User ID to send to
         alert_data: Updated alert data
     """
-    try:
-        message = {
-            "type": "alert_updated",
-            "data": alert_data
-        }
-        await manager.send_personal_message(json.dumps(message), user_id)
-        logger.info(f"Sent alert_updated to user {user_id}: alert_id={alert_data.get('id')}")
-    except Exception as e:
-        logger.error(f"Error sending alert update to user {user_id}: {e}")
+    with tracer.start_as_current_span("ws.send_alert_update", attributes={
+        "alert.id": str(alert_data.get("id")),
+    }):
+        try:
+            message = encode_message("alert_updated", alert_data)
+            await manager.send_personal_message(message, user_id)
+            logger.info(f"Sent alert_updated to user {user_id}: alert_id={alert_data.get('id')}")
+        except Exception as e:
+            logger.error(f"Error sending alert update to user {user_id}: {e}")
 
 
 async def broadcast_alert(alert_data: dict, exclude_user: Optional[str] = None):
@@ -143,11 +217,30 @@ async def broadcast_alert(alert_data: dict, exclude_user: Optional[str] = None):
         exclude_user: Optional user ID to exclude from broadcast
     """
     try:
-        message = {
-            "type": "new_alert",
-            "data": alert_data
-        }
-        await manager.broadcast(json.dumps(message), exclude_user)
+        message = encode_message("new_alert", alert_data)
+        await manager.broadcast(message, exclude_user)
         logger.info(f"Broadcasted new_alert: alert_id={alert_data.get('id')}")
     except Exception as e:
         logger.error(f"Error broadcasting alert: {e}")
+
+
+OPERATOR_ROLES = ("operator", "coordinator", "admin")
+
+
+async def send_cluster_detected(cluster: dict):
+    """
+    Notify connected operators of a newly detected cluster of alerts (mass incident)
+    
+    Args:
+        cluster: Cluster summary from the clustering engine
+    """
+    with tracer.start_as_current_span("ws.send_cluster_detected", attributes={
+        "cluster.id": str(cluster.get("id")),
+        "cluster.alerts": cluster.get("alert_count", 0),
+    }):
+        try:
+            message = encode_message("cluster_detected", cluster)
+            await manager.broadcast_to_role(message, *OPERATOR_ROLES)
+            logger.info(f"Sent cluster_detected: cluster_id={cluster.get('id')}, alerts={cluster.get('alert_count')}")
+        except Exception as e:
+            logger.error(f"Error sending cluster_detected: {e}")
@@ -0,0 +1,150 @@
+"""
+HTTP response caching: resource version counters and per-route cache policies
+"""
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+import math
+import time
+import uuid
+
+from app.core.config import settings
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """Conditional caching policy attached to a GET endpoint"""
+    resources: Tuple[str, ...]
+    max_age: int = 0
+    private: bool = True
+    per_day: bool = False
+
+    @property
+    def cache_control(self) -> str:
+        scope = "private" if self.private else "public"
+        if self.max_age <= 0:
+            return f"{scope}, no-cache"
+        return f"{scope}, max-age={self.max_age}"
+
+
+class MemoryVersionStore:
+    """
+    In-process version counters
+
+    Only valid for a single worker process: other workers never see the bumps.
+    Use the Redis store when running several uvicorn workers.
+    """
+
+    shared = False
+
+    def __init__(self):
+        # Versions restart from zero on every boot, the epoch keeps old ETags from matching
+        self.epoch = uuid.uuid4().hex[:8]
+        self._versions: Dict[str, int] = {}
+        self._bumped_at: Dict[str, float] = {}
+
+    async def get_many(self, resources: Tuple[str, ...]) -> List[str]:
+        return [f"{self.epoch}.{self._versions.get(name, 0)}" for name in resources]
+
+    async def bump(self, *resources: str):
+        now = time.monotonic()
+        for name in resources:
+            self._versions[name] = self._versions.get(name, 0) + 1
+            self._bumped_at[name] = now
+
+    async def bumped_within(self, resources: Tuple[str, ...], seconds: float) -> bool:
+        cutoff = time.monotonic() - seconds
+        return any(self._bumped_at.get(name, -math.inf) > cutoff for name in resources)
+
+
+class RedisVersionStore:
+    """Version counters shared by all workers through Redis"""
+
+    shared = True
+
+    key_prefix = "http-cache:version:"
+    bumped_prefix = "http-cache:bumped:"
+
+    def __init__(self, url: str):
+        from redis import asyncio as redis_asyncio
+        self._redis = redis_asyncio.from_url(url)
+
+    async def get_many(self, resources: Tuple[str, ...]) -> List[str]:
+        values = await self._redis.mget([self.key_prefix + name for name in resources])
+        return [value.decode() if value else "0" for value in values]
+
+    async def bump(self, *resources: str):
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for name in resources:
+                pipe.incr(self.key_prefix + name)
+                if settings.DATABASE_REPLICA_URLS:
+                    pipe.set(self.bumped_prefix + name, 1, ex=math.ceil(settings.DB_REPLICA_MAX_LAG_SECONDS) or 1)
+            await pipe.execute()
+
+    async def bumped_within(self, resources: Tuple[str, ...], seconds: float) -> bool:
+        # The marker keys expire after DB_REPLICA_MAX_LAG_SECONDS
+        return await self._redis.exists(*[self.bumped_prefix + name for name in resources]) > 0
+
+
+def _create_version_store():
+    if settings.CACHE_BACKEND == "redis":
+        return RedisVersionStore(settings.REDIS_URL)
+    return MemoryVersionStore()
+
+
+resource_versions = _create_version_store()
+
+
+async def shared_version(resource: str) -> Optional[str]:
+    """
+    Version of a resource as seen by every worker
+
+    In-process indexes compare it with the version they were last synced at:
+    a newer one means another worker wrote, and the index has to catch up
+    before the endpoint answers under the ETag of that version.
+
+    Returns:
+        Optional[str]: The version, None with the in-process store (a single
+        worker, whose indexes already applied its own writes)
+    """
+    if not resource_versions.shared:
+        return None
+    return (await resource_versions.get_many((resource,)))[0]
+
+
+async def invalidate(*resources: str):
+    """Bump resource versions so cached responses depending on them revalidate"""
+    await resource_versions.bump(*resources)
+
+
+def cached(*resources: str, max_age: int = 0, private: bool = True, per_day: bool = False) -> Callable:
+    """
+    Mark a GET endpoint as conditionally cacheable
+
+    The response gets a strong ETag derived from the versions of `resources`,
+    the query string and the authenticated user. A matching If-None-Match is
+    answered with 304 by http_cache_middleware before the endpoint (and its
+    DB dependencies) run.
+
+    Args:
+        resources: Resource names the response depends on
+        max_age: Cache-Control max-age in seconds (0 - always revalidate)
+        private: Whether shared caches must not store the response
+        per_day: The response also depends on the current (UTC) date, e.g.
+            "today" counters that change at midnight without a write
+    """
+    def decorator(endpoint: Callable) -> Callable:
+        endpoint.__cache_policy__ = CachePolicy(tuple(resources), max_age, private, per_day)
+        return endpoint
+    return decorator
+
+
+def invalidates(*resources: str) -> Callable:
+    """
+    Mark a write endpoint as invalidating resources
+
+    http_cache_middleware bumps the versions after a successful (2xx/3xx) response.
+    """
+    def decorator(endpoint: Callable) -> Callable:
+        endpoint.__invalidates__ = tuple(resources)
+        return endpoint
+    return decorator
@@ -1,35 +1,307 @@
 """
 Database configuration and session management
 """
-from sqlalchemy import create_engine
+from fastapi import Request
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+from typing import Dict, List, Optional
+import itertools
+import logging
+import math
+import threading
+import time
+
 from app.core.config import settings
+from app.core.query_stats import instrument_engine
+from app.core.tracing import instrument_engine_tracing
+
+logger = logging.getLogger(__name__)
+
+
+class PoolStats:
+    """Checkout counters of one connection pool"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record_checkout(self, wait_seconds: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_seconds_total += wait_seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, wait_seconds)
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long callers wait for a connection"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
 
-# Database URL from settings
-database_url = settings.DATABASE_URL
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except PoolTimeoutError:
+            self.stats.record_checkout(time.perf_counter() - start, timed_out=True)
+            raise
+        self.stats.record_checkout(time.perf_counter() - start)
+        return connection
 
-# MySQL connection args
-connect_args = {}
-if database_url.startswith("mysql"):
-    connect_args = {
-        "charset": "utf8mb4",
-        "use_unicode": True
+
+def _is_memory_sqlite(url: str) -> bool:
+    return url.startswith("sqlite") and (url in ("sqlite://", "sqlite:///") or ":memory:" in url)
+
+
+def create_db_engine(url: str) -> Engine:
+    """
+    Create engine with pool sizing and statement timeout from settings
+
+    Args:
+        url: Database URL
+
+    Returns:
+        Engine: SQLAlchemy engine
+    """
+    # MySQL connection args
+    connect_args = {}
+    if url.startswith("mysql"):
+        connect_args = {
+            "charset": "utf8mb4",
+            "use_unicode": True
+        }
+    elif url.startswith("sqlite"):
+        connect_args = {"check_same_thread": False}
+    elif url.startswith("postgresql") and settings.DB_STATEMENT_TIMEOUT_MS > 0:
+        connect_args = {"options": f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"}
+
+    engine_options = {
+        "echo": settings.DB_ECHO,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,  # Enable connection health checks
+        "pool_recycle": settings.DB_POOL_RECYCLE,
     }
-elif database_url.startswith("sqlite"):
-    connect_args = {"check_same_thread": False}
-
-# Create engine
-sync_engine = create_engine(
-    database_url,
-    connect_args=connect_args,
-    echo=settings.DEBUG,
-    pool_pre_ping=True,  # Enable connection health checks
-    pool_recycle=3600,  # Recycle connections after 1 hour
-)
-
-# Session factory
+    if not _is_memory_sqlite(url):
+        engine_options.update(
+            poolclass=InstrumentedQueuePool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+        )
+
+    engine = create_engine(url, connect_args=connect_args, **engine_options)
+
+    if url.startswith("mysql") and settings.DB_STATEMENT_TIMEOUT_MS > 0:
+        @event.listens_for(engine, "connect")
+        def set_statement_timeout(dbapi_connection, connection_record):
+            # Applies to read-only SELECT statements
+            cursor = dbapi_connection.cursor()
+            cursor.execute(f"SET SESSION MAX_EXECUTION_TIME={int(settings.DB_STATEMENT_TIMEOUT_MS)}")
+            cursor.close()
+
+    instrument_engine(engine)
+    if settings.TRACING_ENABLED:
+        instrument_engine_tracing(engine)
+    return engine
+
+
+def get_pool_metrics(engine: Engine) -> dict:
+    """
+    Connection pool utilisation and checkout wait statistics
+
+    Args:
+        engine: Engine to inspect
+
+    Returns:
+        dict: Pool metrics (empty for pools without instrumentation)
+    """
+    pool = engine.pool
+    stats = getattr(pool, "stats", None)
+    if stats is None:
+        return {}
+    checkouts = stats.checkouts or 1
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": pool.overflow(),
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "checkouts": stats.checkouts,
+        "timeouts": stats.timeouts,
+        "wait_seconds_total": round(stats.wait_seconds_total, 6),
+        "wait_seconds_avg": round(stats.wait_seconds_total / checkouts, 6),
+        "wait_seconds_max": round(stats.wait_seconds_max, 6),
+    }
+
+
+def measure_replication_lag(engine: Engine) -> Optional[float]:
+    """
+    Replication lag of a replica in seconds
+
+    Returns:
+        Optional[float]: Lag in seconds, 0 for a database that is not a replica,
+        None if replication is broken
+    """
+    with engine.connect() as connection:
+        dialect = engine.dialect.name
+        if dialect == "mysql":
+            try:
+                row = connection.execute(text("SHOW REPLICA STATUS")).mappings().first()
+            except Exception:
+                row = connection.execute(text("SHOW SLAVE STATUS")).mappings().first()
+            if row is None:
+                return 0.0
+            lag = row.get("Seconds_Behind_Source", row.get("Seconds_Behind_Master"))
+            return None if lag is None else float(lag)
+        if dialect == "postgresql":
+            lag = connection.execute(text(
+                "SELECT CASE WHEN pg_is_in_recovery() "
+                "THEN COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) "
+                "ELSE 0 END"
+            )).scalar()
+            return float(lag)
+        connection.execute(text("SELECT 1"))
+        return 0.0
+
+
+class Replica:
+    """Replica engine with a periodically refreshed lag probe"""
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.lag_seconds: Optional[float] = 0.0
+        self.checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def is_fresh(self) -> bool:
+        """Whether the replica lags less than DB_REPLICA_MAX_LAG_SECONDS"""
+        now = time.monotonic()
+        # One request refreshes the probe, the others use the last value
+        if now - self.checked_at > settings.DB_REPLICA_CHECK_INTERVAL and self._lock.acquire(blocking=False):
+            try:
+                self.lag_seconds = measure_replication_lag(self.engine)
+            except Exception as e:
+                logger.warning(f"Replica {self.engine.url.host} lag probe failed: {e}")
+                self.lag_seconds = None
+            finally:
+                self.checked_at = now
+                self._lock.release()
+        return self.lag_seconds is not None and self.lag_seconds <= settings.DB_REPLICA_MAX_LAG_SECONDS
+
+
+class ReplicaRouter:
+    """
+    Chooses the engine for read-only sessions
+
+    Reads are spread round-robin over replicas that lag less than
+    DB_REPLICA_MAX_LAG_SECONDS and fall back to the primary when none is fresh.
+    """
+
+    def __init__(self, primary: Engine, replicas: List[Engine]):
+        self.primary = primary
+        self.replicas = [Replica(engine) for engine in replicas]
+        self._round_robin = itertools.count()
+
+    def choose(self, primary: bool = False) -> Engine:
+        """
+        Engine for a read-only session
+
+        Args:
+            primary: Read from the primary (the user has just written)
+        """
+        if not self.replicas or primary:
+            return self.primary
+        fresh = [replica for replica in self.replicas if replica.is_fresh()]
+        if not fresh:
+            return self.primary
+        return fresh[next(self._round_robin) % len(fresh)].engine
+
+
+class MemoryWriterStore:
+    """
+    In-process map of users who wrote within DB_READ_YOUR_WRITES_SECONDS
+
+    Only valid for a single worker process: a write handled by another worker
+    does not pin the user's reads here. Use the Redis store when running
+    several uvicorn workers.
+    """
+
+    def __init__(self):
+        self._written_at: Dict[str, float] = {}
+
+    async def mark(self, user_id: str):
+        now = time.monotonic()
+        if len(self._written_at) > 10000:
+            cutoff = now - settings.DB_READ_YOUR_WRITES_SECONDS
+            self._written_at = {
+                user: written_at for user, written_at in self._written_at.items() if written_at > cutoff
+            }
+        self._written_at[user_id] = now
+
+    async def recently_wrote(self, user_id: str) -> bool:
+        written_at = self._written_at.get(user_id)
+        return written_at is not None and time.monotonic() - written_at < settings.DB_READ_YOUR_WRITES_SECONDS
+
+
+class RedisWriterStore:
+    """Recent writers shared by all workers through Redis (keys expire with the window)"""
+
+    key_prefix = "read-your-writes:"
+
+    def __init__(self, url: str):
+        from redis import asyncio as redis_asyncio
+        self._redis = redis_asyncio.from_url(url)
+
+    async def mark(self, user_id: str):
+        try:
+            await self._redis.set(
+                self.key_prefix + user_id, 1, ex=math.ceil(settings.DB_READ_YOUR_WRITES_SECONDS) or 1
+            )
+        except Exception as e:
+            logger.warning("Read-your-writes store unavailable: %s", e)
+
+    async def recently_wrote(self, user_id: str) -> bool:
+        try:
+            return await self._redis.exists(self.key_prefix + user_id) > 0
+        except Exception as e:
+            # The primary always has the user's writes
+            logger.warning("Read-your-writes store unavailable: %s", e)
+            return True
+
+
+def _create_writer_store():
+    if settings.CACHE_BACKEND == "redis":
+        return RedisWriterStore(settings.REDIS_URL)
+    return MemoryWriterStore()
+
+
+# Primary (read-write) engine
+sync_engine = create_db_engine(settings.DATABASE_URL)
+
+# Read-only replica engines for analytics and list endpoints
+replica_engines = [create_db_engine(url) for url in settings.DATABASE_REPLICA_URLS]
+replica_engine = replica_engines[0] if replica_engines else sync_engine
+read_router = ReplicaRouter(sync_engine, replica_engines)
+recent_writers = _create_writer_store()
+
+# Session factories
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=sync_engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
 
 # Base class for models
 Base = declarative_base()
@@ -38,7 +310,7 @@ Base = declarative_base()
 def get_db():
     """
     Dependency для получения DB сессии
-    
+
     Yields:
         Session: Database session
     """
@@ -47,3 +319,21 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def get_read_db(request: Request):
+    """
+    Dependency для получения read-only DB сессии (реплика)
+
+    Use only for endpoints that never write. The session is bound to a fresh
+    replica, or to the primary for users who just wrote (flagged by
+    read_your_writes_middleware).
+
+    Yields:
+        Session: Database session
+    """
+    db = ReadSessionLocal(bind=read_router.choose(getattr(request.state, "read_primary", False)))
+    try:
+        yield db
+    finally:
+        db.close()
@@ -0,0 +1,90 @@
+"""
+Idempotency-Key store: responses of completed requests, replayed for retries
+"""
+from collections import OrderedDict
+from typing import Optional
+import hashlib
+import logging
+import time
+
+import orjson
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 64
+
+
+def request_fingerprint(*parts: str) -> str:
+    """Hash of the request payload, to reject a key reused for a different request"""
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+
+class MemoryIdempotencyStore:
+    """
+    In-process TTL map
+
+    Only valid for a single worker process. The unique DB column still
+    catches replays that reach another worker.
+    """
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        # The TTL is constant, so insertion order is also expiry order
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[dict]:
+        self._expire()
+        entry = self._entries.get(key)
+        return entry[1] if entry else None
+
+    async def set(self, key: str, record: dict):
+        self._expire()
+        self._entries.pop(key, None)
+        self._entries[key] = (time.monotonic() + self.ttl, record)
+
+    def _expire(self):
+        now = time.monotonic()
+        while self._entries:
+            key, (expires_at, _) = next(iter(self._entries.items()))
+            if expires_at > now:
+                break
+            del self._entries[key]
+
+
+class RedisIdempotencyStore:
+    """TTL map shared by all workers through Redis"""
+
+    key_prefix = "idempotency:"
+
+    def __init__(self, url: str, ttl: int):
+        from redis import asyncio as redis_asyncio
+        self._redis = redis_asyncio.from_url(url)
+        self.ttl = ttl
+
+    async def get(self, key: str) -> Optional[dict]:
+        try:
+            value = await self._redis.get(self.key_prefix + key)
+        except Exception as e:
+            # The DB column is the fallback, never fail an SOS because of Redis
+            logger.warning("Idempotency store unavailable: %s", e)
+            return None
+        return orjson.loads(value) if value else None
+
+    async def set(self, key: str, record: dict):
+        try:
+            await self._redis.set(self.key_prefix + key, orjson.dumps(record), ex=self.ttl)
+        except Exception as e:
+            logger.warning("Idempotency store unavailable: %s", e)
+
+
+def _create_idempotency_store():
+    if settings.IDEMPOTENCY_BACKEND == "redis":
+        return RedisIdempotencyStore(settings.REDIS_URL, settings.IDEMPOTENCY_TTL_SECONDS)
+    return MemoryIdempotencyStore(settings.IDEMPOTENCY_TTL_SECONDS)
+
+
+idempotency_store = _create_idempotency_store()
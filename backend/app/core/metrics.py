@@ -0,0 +1,162 @@
+"""
+Prometheus metrics
+
+Multi-process mode: when uvicorn runs several workers, set
+PROMETHEUS_MULTIPROC_DIR to an empty writable directory (wiped on every
+deploy) before the workers start. Each worker then writes its samples there
+and /metrics aggregates all of them.
+"""
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Optional, Tuple
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from opentelemetry.trace import SpanKind
+
+from app.core.tracing import record_exception, tracer
+
+# HTTP
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+HTTP_REQUESTS = Counter(
+    "http_requests_total",
+    "HTTP requests by route template and status code",
+    ["method", "route", "status"],
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests being handled",
+    ["method", "route"],
+    multiprocess_mode="livesum",
+)
+
+# Database
+DB_QUERIES_PER_REQUEST = Histogram(
+    "http_request_db_queries",
+    "SQL statements executed per HTTP request",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 250),
+)
+DB_TIME_PER_REQUEST = Histogram(
+    "http_request_db_seconds",
+    "Time spent in SQL statements per HTTP request",
+    ["route"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+
+# WebSocket
+WS_CONNECTIONS = Gauge(
+    "websocket_connections",
+    "Open WebSocket connections",
+    multiprocess_mode="livesum",
+)
+WS_PENDING_SENDS = Gauge(
+    "websocket_pending_sends",
+    "WebSocket messages waiting on a slow client",
+    multiprocess_mode="livesum",
+)
+
+# AI
+AI_REQUEST_DURATION = Histogram(
+    "ai_request_duration_seconds",
+    "Latency of AI API calls",
+    ["model", "operation"],
+    buckets=(0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60),
+)
+AI_REQUEST_ERRORS = Counter(
+    "ai_request_errors_total",
+    "Failed AI API calls",
+    ["model", "operation", "error"],
+)
+
+# SOS lifecycle
+SOS_ALERTS_CREATED = Counter(
+    "sos_alerts_created_total",
+    "Created SOS alerts",
+    ["type"],
+)
+SOS_ALERT_TRANSITIONS = Counter(
+    "sos_alert_transitions_total",
+    "SOS alert status changes",
+    ["from_status", "to_status"],
+)
+SOS_ALERT_STAGE_DURATION = Histogram(
+    "sos_alert_stage_seconds",
+    "Time an SOS alert spent in a lifecycle stage",
+    ["stage"],
+    buckets=(10, 30, 60, 120, 300, 600, 900, 1800, 3600, 7200, 21600, 86400),
+)
+
+
+@contextmanager
+def observe_ai_call(model: str, operation: str):
+    """Time an AI API call, count its failures and wrap it in a trace span"""
+    start = time.perf_counter()
+    with tracer.start_as_current_span(
+        f"ai.{operation}",
+        kind=SpanKind.CLIENT,
+        attributes={"ai.model": model},
+        record_exception=False,
+        set_status_on_exception=False,
+    ) as span:
+        try:
+            yield
+        except Exception as e:
+            AI_REQUEST_ERRORS.labels(model, operation, type(e).__name__).inc()
+            record_exception(span, e)
+            raise
+        finally:
+            AI_REQUEST_DURATION.labels(model, operation).observe(time.perf_counter() - start)
+
+
+def observe_alert_transition(alert, previous_status: Optional[str]):
+    """
+    Record an SOS alert status change
+
+    Stage durations: pending_to_assigned (created_at → assigned_at) and
+    assigned_to_completed (assigned_at → completed_at).
+    """
+    if previous_status == alert.status:
+        return
+    SOS_ALERT_TRANSITIONS.labels(previous_status or "none", alert.status).inc()
+
+    if alert.status in ("assigned", "in_progress") and previous_status == "pending" and alert.assigned_at:
+        _observe_stage("pending_to_assigned", alert.created_at, alert.assigned_at)
+    elif alert.status == "completed" and alert.completed_at:
+        _observe_stage("assigned_to_completed", alert.assigned_at or alert.created_at, alert.completed_at)
+
+
+def _observe_stage(stage: str, started_at: Optional[datetime], finished_at: datetime):
+    if started_at is not None:
+        SOS_ALERT_STAGE_DURATION.labels(stage).observe(max((finished_at - started_at).total_seconds(), 0))
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """
+    Exposition of all metrics
+
+    Returns:
+        Tuple[bytes, str]: Body and content type
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
@@ -0,0 +1,104 @@
+"""
+Per-request SQL statement counters collected through SQLAlchemy engine events
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Iterator, Optional
+import logging
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class QueryStats:
+    """SQL statements executed while handling one request"""
+
+    __slots__ = ("count", "seconds", "route")
+
+    def __init__(self, route: Optional[str] = None):
+        self.count = 0
+        self.seconds = 0.0
+        self.route = route
+
+
+# The same QueryStats object is shared by the middleware, the endpoint task
+# and threadpool workers (they all copy the request's context)
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+# Statement counters of open query_budget blocks (any thread, any request)
+_budgets = []
+_budgets_lock = threading.Lock()
+
+
+def begin_query_stats(route: Optional[str] = None) -> Token:
+    """Start collecting statement counters for the current context"""
+    return _current_stats.set(QueryStats(route))
+
+
+def end_query_stats(token: Token):
+    _current_stats.reset(token)
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    return _current_stats.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.count += 1
+        stats.seconds += elapsed
+
+    if settings.DB_SLOW_QUERY_MS > 0 and elapsed * 1000 >= settings.DB_SLOW_QUERY_MS:
+        route = stats.route if stats is not None else None
+        logger.warning(f"Slow query {elapsed * 1000:.1f} ms [{route or 'no request'}]: {statement[:1000]}")
+
+    if _budgets:
+        with _budgets_lock:
+            for budget in _budgets:
+                budget.count += 1
+                budget.seconds += elapsed
+
+
+def instrument_engine(engine: Engine):
+    """Attach the statement counting hooks to an engine"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+@contextmanager
+def query_budget(max_queries: int) -> Iterator[QueryStats]:
+    """
+    Fail if the block executes more than max_queries SQL statements
+
+    Counts statements on all instrumented engines and threads, so it also
+    covers requests made through TestClient. Meant for tests:
+
+        with query_budget(3):
+            client.get("/api/v1/teams/", headers=headers)
+
+    Raises:
+        AssertionError: If the budget is exceeded
+    """
+    budget = QueryStats()
+    with _budgets_lock:
+        _budgets.append(budget)
+    try:
+        yield budget
+    finally:
+        with _budgets_lock:
+            _budgets.remove(budget)
+    assert budget.count <= max_queries, (
+        f"Expected at most {max_queries} SQL statements, executed {budget.count}"
+    )
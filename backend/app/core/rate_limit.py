@@ -0,0 +1,229 @@
+"""
+Rate limiting and load shedding: per-user token buckets and an adaptive concurrency limit
+
+Every route belongs to a priority lane (see `lane`). Buckets are keyed by
+user and lane, the shedder rejects low-priority lanes first when the event
+loop starts queueing work. The critical lane (creating SOS alerts, alert
+status updates, health checks) is never limited nor shed. The auth lane
+(register, login, token refresh) is never shed either - a client that cannot
+log in cannot send an SOS - and only has a generous per-IP limit against
+password guessing.
+"""
+from typing import Callable, Dict, List, Tuple
+import asyncio
+import logging
+import math
+import time
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Priority lanes, from never shed to shed first
+CRITICAL = "critical"
+AUTH = "auth"
+INTERACTIVE = "interactive"
+POLLING = "polling"
+BULK = "bulk"
+
+LANES = (CRITICAL, AUTH, INTERACTIVE, POLLING, BULK)
+
+
+def lane(name: str) -> Callable:
+    """
+    Assign an endpoint to a priority lane
+
+    Endpoints without a lane are INTERACTIVE.
+
+    Args:
+        name: CRITICAL, AUTH, INTERACTIVE, POLLING or BULK
+    """
+    if name not in LANES:
+        raise ValueError(f"Unknown lane: {name}")
+
+    def decorator(endpoint: Callable) -> Callable:
+        endpoint.__lane__ = name
+        return endpoint
+    return decorator
+
+
+def lane_rate(name: str) -> float:
+    """Bucket refill rate of a lane in tokens per second (0 - unlimited)"""
+    per_minute = {
+        AUTH: settings.RATE_LIMIT_AUTH_PER_MINUTE,
+        INTERACTIVE: settings.RATE_LIMIT_PER_MINUTE,
+        POLLING: settings.RATE_LIMIT_POLLING_PER_MINUTE,
+        BULK: settings.RATE_LIMIT_BULK_PER_MINUTE,
+    }.get(name, 0)
+    return per_minute / 60
+
+
+class MemoryBucketStore:
+    """
+    In-process token buckets
+
+    Only valid for a single worker process: every worker keeps its own
+    buckets. Use the Redis store when running several uvicorn workers.
+    """
+
+    prune_threshold = 10000
+
+    def __init__(self):
+        self._buckets: Dict[str, List[float]] = {}
+
+    async def take(self, key: str, rate: float, capacity: float) -> Tuple[bool, float, float]:
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.prune_threshold:
+                self._prune(now, rate, capacity)
+            bucket = self._buckets[key] = [capacity, now]
+
+        tokens = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        bucket[0], bucket[1] = tokens, now
+        retry_after = 0.0 if allowed else (1 - tokens) / rate
+        return allowed, tokens, retry_after
+
+    def _prune(self, now: float, rate: float, capacity: float):
+        # Buckets idle long enough to be full again carry no state
+        idle = capacity / rate
+        self._buckets = {
+            key: bucket for key, bucket in self._buckets.items() if now - bucket[1] < idle
+        }
+
+
+class RedisBucketStore:
+    """Token buckets shared by all workers through Redis"""
+
+    key_prefix = "rate-limit:"
+
+    # Refill and take one token atomically: returns {allowed, tokens}
+    script = """
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', ARGV[3])
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, tostring(tokens)}
+"""
+
+    def __init__(self, url: str):
+        from redis import asyncio as redis_asyncio
+        self._redis = redis_asyncio.from_url(url)
+        self._take = self._redis.register_script(self.script)
+
+    async def take(self, key: str, rate: float, capacity: float) -> Tuple[bool, float, float]:
+        try:
+            allowed, tokens = await self._take(
+                keys=[self.key_prefix + key], args=[rate, capacity, time.time()]
+            )
+        except Exception as e:
+            # Fail open: an unavailable Redis must not block emergency traffic
+            logger.warning("Rate limit store unavailable: %s", e)
+            return True, capacity, 0.0
+        tokens = float(tokens)
+        retry_after = 0.0 if allowed else (1 - tokens) / rate
+        return bool(allowed), tokens, retry_after
+
+
+def _create_bucket_store():
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        return RedisBucketStore(settings.REDIS_URL)
+    return MemoryBucketStore()
+
+
+class AdaptiveShedder:
+    """
+    Concurrency limit that adapts to queueing latency (AIMD)
+
+    Queueing latency is the time a callback waits in the event loop ready
+    queue, sampled once per request. While its moving average exceeds the
+    target the limit drops below the current number of requests in flight,
+    otherwise it grows back by one per `limit` completed requests.
+
+    A lane is admitted while the requests in flight stay under its share of
+    the limit, so BULK is shed first, then POLLING, then INTERACTIVE.
+    CRITICAL and AUTH requests are always admitted (and counted).
+    """
+
+    never_shed = (CRITICAL, AUTH)
+    lane_share = {INTERACTIVE: 1.0, POLLING: 0.75, BULK: 0.5}
+    decrease_factor = 0.9
+    decrease_interval = 0.1  # Seconds between two decreases
+    stale_after = 1.0  # Seconds without samples after which the average is reset
+    smoothing = 0.2
+
+    def __init__(self, target_delay: float, min_limit: int, max_limit: int):
+        self.target_delay = target_delay
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = float(max_limit)
+        self.in_flight = 0
+        self.queue_delay = 0.0
+        self._sampled_at = 0.0
+        self._decreased_at = 0.0
+
+    def try_acquire(self, name: str) -> bool:
+        """Admit a request of lane `name`, call `release` when it finishes"""
+        now = time.monotonic()
+        if now - self._sampled_at > self.stale_after:
+            self.queue_delay = 0.0
+        if name not in self.never_shed and self.in_flight >= self.limit * self.lane_share.get(name, 1.0):
+            return False
+        self.in_flight += 1
+        loop = asyncio.get_running_loop()
+        loop.call_soon(self._sample, loop.time())
+        return True
+
+    def release(self):
+        self.in_flight -= 1
+        if self.queue_delay <= self.target_delay and self.limit < self.max_limit:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def _sample(self, scheduled_at: float):
+        delay = asyncio.get_running_loop().time() - scheduled_at
+        now = time.monotonic()
+        self.queue_delay += self.smoothing * (delay - self.queue_delay)
+        self._sampled_at = now
+        if self.queue_delay > self.target_delay and now - self._decreased_at >= self.decrease_interval:
+            self.limit = max(self.min_limit, min(self.limit, self.in_flight) * self.decrease_factor)
+            self._decreased_at = now
+            logger.info(
+                "Queueing delay %.0f ms, concurrency limit lowered to %d (in flight: %d)",
+                self.queue_delay * 1000, self.limit, self.in_flight,
+            )
+
+
+buckets = _create_bucket_store()
+shedder = AdaptiveShedder(
+    target_delay=settings.LOAD_SHEDDING_QUEUE_DELAY_MS / 1000,
+    min_limit=settings.LOAD_SHEDDING_MIN_CONCURRENCY,
+    max_limit=settings.LOAD_SHEDDING_MAX_CONCURRENCY,
+)
+
+
+async def take_token(key: str, name: str) -> Tuple[bool, float, float]:
+    """
+    Take a token from the bucket of `key` in lane `name`
+
+    Buckets hold up to one minute of the lane's allowance.
+
+    Returns:
+        Tuple[bool, float, float]: (allowed, tokens left, seconds until a token is available)
+    """
+    rate = lane_rate(name)
+    if rate <= 0:
+        return True, math.inf, 0.0
+    return await buckets.take(f"{name}:{key}", rate, rate * 60)
@@ -0,0 +1,34 @@
+"""
+Fast JSON serialization (orjson) for API responses and WebSocket messages
+"""
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from fastapi.responses import ORJSONResponse
+
+
+def _default(obj: Any) -> Any:
+    """Serialize types orjson does not handle natively"""
+    if isinstance(obj, Decimal):
+        # Same representation as Pydantic response models (string, full precision)
+        return str(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """Encode content to JSON bytes"""
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class FastJSONResponse(ORJSONResponse):
+    """
+    Default response class of the app
+
+    Endpoints returning trusted, already shaped data (e.g. dicts built from
+    ORM rows) can return FastJSONResponse(content) directly: FastAPI then
+    skips response_model validation and the content is encoded in one pass.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
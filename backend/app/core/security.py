@@ -101,6 +101,29 @@ def decode_token(token: str) -> Optional[Dict[str, Any]]:
         return None
 
 
+def get_token_subject(authorization: Optional[str]) -> Optional[str]:
+    """
+    Extract user ID from an "Authorization: Bearer <token>" header
+    
+    Verifies the token signature and expiry only, without a DB lookup.
+    
+    Args:
+        authorization: Authorization header value
+        
+    Returns:
+        Optional[str]: User ID or None if the header has no valid access token
+    """
+    if not authorization:
+        return None
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    payload = decode_token(token)
+    if payload is None or payload.get("type") != "access":
+        return None
+    return payload.get("sub")
+
+
 def encrypt_data(data: str, key: bytes) -> str:
     """
     Encrypt sensitive data
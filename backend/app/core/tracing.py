@@ -0,0 +1,128 @@
+"""
+Distributed tracing (OpenTelemetry)
+
+Disabled by default (TRACING_ENABLED). Without a configured provider the
+OpenTelemetry API hands out no-op spans, so instrumented code paths cost
+next to nothing. Spans follow the asyncio context: tasks created with
+asyncio.create_task during a request become children of its span.
+
+Exporters:
+    otlp - OTLP/HTTP to a collector (TRACING_OTLP_ENDPOINT)
+    file - one JSON span per line in TRACING_FILE, for offline analysis
+"""
+from pathlib import Path
+from typing import Optional, Sequence
+import threading
+
+from opentelemetry import trace
+from opentelemetry.trace import SpanKind, Status, StatusCode
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+tracer = trace.get_tracer("rescue-system")
+
+_configured = False
+
+
+def _json_file_exporter_class():
+    from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+
+    class JSONFileSpanExporter(SpanExporter):
+        """Append finished spans to a JSON-lines file"""
+
+        def __init__(self, path: str):
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(path, "a", encoding="utf-8")
+            self._lock = threading.Lock()
+
+        def export(self, spans: Sequence) -> "SpanExportResult":
+            lines = "".join(span.to_json(indent=None) + "\n" for span in spans)
+            with self._lock:
+                self._file.write(lines)
+                self._file.flush()
+            return SpanExportResult.SUCCESS
+
+        def shutdown(self):
+            with self._lock:
+                self._file.close()
+
+    return JSONFileSpanExporter
+
+
+def setup_tracing():
+    """Install the tracer provider and exporter (no-op unless TRACING_ENABLED)"""
+    global _configured
+    if _configured or not settings.TRACING_ENABLED:
+        return
+    _configured = True
+
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+    if settings.TRACING_EXPORTER == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        exporter = OTLPSpanExporter(endpoint=settings.TRACING_OTLP_ENDPOINT)
+    else:
+        exporter = _json_file_exporter_class()(settings.TRACING_FILE)
+
+    provider = TracerProvider(
+        resource=Resource.create({
+            "service.name": settings.APP_NAME,
+            "service.version": settings.APP_VERSION,
+            "deployment.environment": settings.ENVIRONMENT,
+        }),
+        sampler=ParentBased(TraceIdRatioBased(settings.TRACING_SAMPLE_RATIO)),
+    )
+    # Spans are exported from a background thread in batches
+    provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+
+
+def record_exception(span, exc: BaseException):
+    span.record_exception(exc)
+    span.set_status(Status(StatusCode.ERROR, str(exc)))
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "SQL"
+    span = tracer.start_span(
+        f"SQL {operation}",
+        kind=SpanKind.CLIENT,
+        attributes={
+            "db.system": conn.engine.dialect.name,
+            "db.statement": statement[:2000],
+        },
+    )
+    conn.info.setdefault("trace_spans", []).append(span)
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    spans = conn.info.get("trace_spans")
+    if spans:
+        spans.pop().end()
+
+
+def _handle_error(exception_context):
+    conn = exception_context.connection
+    spans = conn.info.get("trace_spans") if conn is not None else None
+    if spans:
+        span = spans.pop()
+        record_exception(span, exception_context.original_exception)
+        span.end()
+
+
+def instrument_engine_tracing(engine: Engine):
+    """Create a span per SQL statement executed on the engine"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+def current_trace_id() -> Optional[str]:
+    """Hex trace ID of the current span, if any"""
+    span_context = trace.get_current_span().get_span_context()
+    return format(span_context.trace_id, "032x") if span_context.is_valid else None
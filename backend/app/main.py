@@ -1,18 +1,39 @@
 """
 Main FastAPI application
 """
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
+import logging
 import time
 import os
 
 from app.core.config import settings
-from app.core.database import sync_engine, Base
-from app.api.v1 import auth, sos, users, geolocation, teams, notifications, analytics, websocket, ai
+from app.core.responses import FastJSONResponse
+from app.core.database import sync_engine, read_router, Base, SessionLocal, get_pool_metrics
+from app.api.v1 import auth, sos, users, geolocation, teams, notifications, analytics, websocket, ai, dispatch
 from app.middleware.error_handler import error_handler_middleware
+from app.middleware.http_cache import http_cache_middleware
+from app.middleware.read_your_writes import read_your_writes_middleware
+from app.middleware.rate_limit import rate_limit_middleware
+from app.middleware.metrics import metrics_middleware
+from app.middleware.query_stats import query_stats_middleware
+from app.middleware.request_context import request_context_middleware
+from app.middleware.route import route_middleware
+from app.middleware.tracing import tracing_middleware
+from app.core.metrics import render_metrics
+from app.core.rate_limit import CRITICAL, lane
+from app.core.tracing import setup_tracing
+from app.services.clustering import cluster_engine
+from app.services.positions import position_store
+from app.utils.logger import setup_logging
+
+setup_logging()
+setup_tracing()
+
+logger = logging.getLogger(__name__)
 
 # Create tables - DISABLED: Tables are created via create_mysql_database.py
 # Base.metadata.create_all(bind=sync_engine)
@@ -24,10 +45,21 @@ app = FastAPI(
     description="Интеллектуальная система поддержки спасательных операций",
     docs_url="/docs",
     redoc_url="/redoc",
+    default_response_class=FastJSONResponse,
 )
 
 # Middleware
 app.middleware("http")(error_handler_middleware)
+app.middleware("http")(http_cache_middleware)
+app.middleware("http")(read_your_writes_middleware)
+app.middleware("http")(rate_limit_middleware)  # Inner to metrics_middleware, so rejections are counted
+if settings.METRICS_ENABLED:
+    app.middleware("http")(metrics_middleware)
+app.middleware("http")(query_stats_middleware)  # Outer to metrics_middleware, which reads its counters
+app.middleware("http")(request_context_middleware)
+if settings.TRACING_ENABLED:
+    app.middleware("http")(tracing_middleware)
+app.middleware("http")(route_middleware)  # Outermost: the middlewares above read request.state.route
 
 app.add_middleware(
     CORSMiddleware,
@@ -50,6 +82,25 @@ async def add_process_time_header(request: Request, call_next):
     return response
 
 
+@app.on_event("startup")
+def warm_clusters():
+    """Load the current cluster window before the first SOS arrives"""
+    db = SessionLocal()
+    try:
+        cluster_engine.warm(db)
+    except Exception as e:
+        # Retried lazily by the first SOS request
+        logger.error(f"Error warming the cluster engine: {e}")
+    finally:
+        db.close()
+
+
+@app.on_event("shutdown")
+async def flush_positions():
+    """Write buffered team positions before the worker exits"""
+    await position_store.close()
+
+
 # Mount static files
 if os.path.exists("uploads"):
     app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
@@ -65,6 +116,7 @@ app.include_router(notifications.router, prefix="/api/v1/notifications", tags=["
 app.include_router(analytics.router, prefix="/api/v1/analytics", tags=["Analytics"])
 app.include_router(websocket.router, prefix="/api/v1", tags=["WebSocket"])
 app.include_router(ai.router, prefix="/api/v1/ai", tags=["AI Analysis"])
+app.include_router(dispatch.router, prefix="/api/v1/dispatch", tags=["Dispatch"])
 
 
 @app.get("/")
@@ -79,6 +131,7 @@ async def root():
 
 
 @app.get("/health")
+@lane(CRITICAL)
 async def health_check():
     """Health check endpoint"""
     return {
@@ -89,12 +142,14 @@ async def health_check():
 
 
 @app.get("/api/v1/ping")
+@lane(CRITICAL)
 async def ping():
     """Ping endpoint"""
     return {"ping": "pong"}
 
 
 @app.get("/api/v1/health")
+@lane(CRITICAL)
 async def health_check():
     """Health check endpoint"""
     return {
@@ -104,6 +159,32 @@ async def health_check():
     }
 
 
+@app.get("/api/v1/health/db")
+@lane(CRITICAL)
+async def database_health():
+    """Connection pool metrics of the primary and replica engines, replica lag"""
+    return {
+        "primary": get_pool_metrics(sync_engine),
+        "replicas": [
+            {
+                "host": replica.engine.url.host or replica.engine.url.database,
+                "lag_seconds": replica.lag_seconds,
+                "pool": get_pool_metrics(replica.engine),
+            }
+            for replica in read_router.replicas
+        ]
+    }
+
+
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    @lane(CRITICAL)
+    async def metrics():
+        """Prometheus metrics"""
+        body, content_type = render_metrics()
+        return Response(content=body, media_type=content_type)
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
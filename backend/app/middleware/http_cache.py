@@ -0,0 +1,63 @@
+"""
+HTTP conditional request middleware
+"""
+from datetime import datetime
+from fastapi import Request, Response, status
+
+from app.core.cache import resource_versions
+from app.core.config import settings
+from app.core.security import get_token_subject
+from app.middleware.route import current_route
+from app.utils.helpers import make_etag, etag_matches
+
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+
+async def http_cache_middleware(request: Request, call_next):
+    """
+    ETag / If-None-Match handling for endpoints marked with @cached
+    and version invalidation for endpoints marked with @invalidates
+    """
+    route = current_route(request)
+    endpoint = getattr(route, "endpoint", None)
+    policy = getattr(endpoint, "__cache_policy__", None)
+
+    if policy is not None and request.method == "GET":
+        subject = get_token_subject(request.headers.get("authorization"))
+        if subject is None:
+            # Let the endpoint reject the request as usual
+            return await call_next(request)
+
+        if settings.DATABASE_REPLICA_URLS and await resource_versions.bumped_within(
+            policy.resources, settings.DB_REPLICA_MAX_LAG_SECONDS
+        ):
+            # A replica may not have the write yet: an ETag for the new version
+            # on stale data would be revalidated as 304 until the next write
+            response = await call_next(request)
+            response.headers["Cache-Control"] = "private, no-store"
+            return response
+
+        versions = await resource_versions.get_many(policy.resources)
+        if policy.per_day:
+            versions.append(datetime.utcnow().date().isoformat())
+        etag = make_etag(route.path, request.url.query, subject, *versions)
+        headers = {
+            "ETag": etag,
+            "Cache-Control": policy.cache_control,
+            "Vary": "Authorization",
+        }
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        response = await call_next(request)
+        if response.status_code == status.HTTP_200_OK:
+            response.headers.update(headers)
+        return response
+
+    response = await call_next(request)
+
+    resources = getattr(endpoint, "__invalidates__", None)
+    if resources and request.method in WRITE_METHODS and response.status_code < 400:
+        await resource_versions.bump(*resources)
+
+    return response
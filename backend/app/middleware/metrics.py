@@ -0,0 +1,48 @@
+"""
+Prometheus request metrics middleware
+"""
+from fastapi import Request
+import time
+
+from app.core.metrics import (
+    DB_QUERIES_PER_REQUEST,
+    DB_TIME_PER_REQUEST,
+    HTTP_REQUEST_DURATION,
+    HTTP_REQUESTS,
+    HTTP_REQUESTS_IN_PROGRESS,
+)
+from app.core.query_stats import current_query_stats
+from app.middleware.route import current_route
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+async def metrics_middleware(request: Request, call_next):
+    """
+    Latency, in-flight and SQL statement metrics per route template
+
+    Routes are labelled by their template (/api/v1/sos/{alert_id}), never by
+    the raw URL, to keep label cardinality bounded.
+    """
+    route = current_route(request)
+    route_path = getattr(route, "path", UNMATCHED_ROUTE)
+    if route_path == "/metrics":
+        return await call_next(request)
+
+    method = request.method
+    in_progress = HTTP_REQUESTS_IN_PROGRESS.labels(method, route_path)
+    in_progress.inc()
+    stats = current_query_stats()  # Started by query_stats_middleware
+    status_code = 500
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        HTTP_REQUEST_DURATION.labels(method, route_path).observe(time.perf_counter() - start)
+        HTTP_REQUESTS.labels(method, route_path, str(status_code)).inc()
+        if stats is not None:
+            DB_QUERIES_PER_REQUEST.labels(route_path).observe(stats.count)
+            DB_TIME_PER_REQUEST.labels(route_path).observe(stats.seconds)
+        in_progress.dec()
@@ -0,0 +1,29 @@
+"""
+Per-request SQL statement counting middleware
+"""
+from fastapi import Request
+
+from app.core.config import settings
+from app.core.query_stats import begin_query_stats, current_query_stats, end_query_stats
+from app.middleware.route import current_route
+
+
+async def query_stats_middleware(request: Request, call_next):
+    """
+    Count SQL statements and DB time of the request
+
+    The totals are returned as X-DB-Queries / X-DB-Time (seconds) headers in
+    debug mode; slow statements are logged with the request's route.
+    """
+    route = current_route(request)
+    token = begin_query_stats(f"{request.method} {getattr(route, 'path', request.url.path)}")
+    stats = current_query_stats()
+    try:
+        response = await call_next(request)
+    finally:
+        end_query_stats(token)
+
+    if settings.DEBUG:
+        response.headers["X-DB-Queries"] = str(stats.count)
+        response.headers["X-DB-Time"] = f"{stats.seconds:.6f}"
+    return response
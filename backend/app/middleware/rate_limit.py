@@ -0,0 +1,58 @@
+"""
+Rate limiting and load shedding middleware
+"""
+from fastapi import Request, status
+from fastapi.responses import JSONResponse
+import math
+
+from app.core.config import settings
+from app.core.rate_limit import CRITICAL, INTERACTIVE, lane_rate, shedder, take_token
+from app.core.security import get_token_subject
+from app.middleware.route import current_route
+
+
+def _client_key(request: Request) -> str:
+    subject = get_token_subject(request.headers.get("authorization"))
+    if subject:
+        return f"user:{subject}"
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+async def rate_limit_middleware(request: Request, call_next):
+    """
+    Token bucket per user and lane (429), adaptive load shedding (503)
+
+    The lane comes from the endpoint's @lane marker. CRITICAL endpoints are
+    neither limited nor shed, AUTH endpoints are limited but not shed; under
+    overload BULK requests are rejected first, then POLLING, then
+    INTERACTIVE. Both rejections carry Retry-After.
+    """
+    route = current_route(request)
+    name = getattr(getattr(route, "endpoint", None), "__lane__", INTERACTIVE)
+
+    if settings.RATE_LIMIT_ENABLED and name != CRITICAL:
+        allowed, tokens, retry_after = await take_token(_client_key(request), name)
+        if not allowed:
+            return JSONResponse(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                content={"detail": "Слишком много запросов, повторите позже"},
+                headers={
+                    "Retry-After": str(math.ceil(retry_after)),
+                    "X-RateLimit-Limit": str(round(lane_rate(name) * 60)),
+                    "X-RateLimit-Remaining": "0",
+                },
+            )
+
+    if not settings.LOAD_SHEDDING_ENABLED:
+        return await call_next(request)
+
+    if not shedder.try_acquire(name):
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"detail": "Сервер перегружен, повторите позже"},
+            headers={"Retry-After": str(settings.LOAD_SHEDDING_RETRY_AFTER_SECONDS)},
+        )
+    try:
+        return await call_next(request)
+    finally:
+        shedder.release()
@@ -0,0 +1,35 @@
+"""
+Read-your-writes middleware for replica routing
+"""
+from fastapi import Request
+
+from app.core.config import settings
+from app.core.database import recent_writers
+from app.core.security import get_token_subject
+
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+
+async def read_your_writes_middleware(request: Request, call_next):
+    """
+    Pin reads of a user who has just written to the primary database
+
+    Replicas may lag behind, so after a successful write the user's
+    read-only sessions use the primary for DB_READ_YOUR_WRITES_SECONDS.
+    The writers are kept in the CACHE_BACKEND store, so the pin holds
+    whichever worker serves the next read.
+    """
+    if not settings.DATABASE_REPLICA_URLS:
+        return await call_next(request)
+
+    subject = get_token_subject(request.headers.get("authorization"))
+    if subject and request.method not in WRITE_METHODS:
+        # Read by get_read_db
+        request.state.read_primary = await recent_writers.recently_wrote(subject)
+
+    response = await call_next(request)
+
+    if subject and request.method in WRITE_METHODS and response.status_code < 400:
+        await recent_writers.mark(subject)
+
+    return response
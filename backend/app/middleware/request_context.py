@@ -0,0 +1,27 @@
+"""
+Request correlation ID middleware
+"""
+from fastapi import Request
+import uuid
+
+from app.utils.logger import request_id_var
+
+REQUEST_ID_HEADER = "X-Request-ID"
+
+
+async def request_context_middleware(request: Request, call_next):
+    """
+    Assign a correlation ID to the request
+
+    An incoming X-Request-ID (from a proxy or the client) is reused,
+    otherwise a new one is generated. It is attached to every log record
+    of the request and returned in the response headers.
+    """
+    request_id = request.headers.get(REQUEST_ID_HEADER) or uuid.uuid4().hex
+    token = request_id_var.set(request_id[:64])
+    try:
+        response = await call_next(request)
+    finally:
+        request_id_var.reset(token)
+    response.headers[REQUEST_ID_HEADER] = request_id[:64]
+    return response
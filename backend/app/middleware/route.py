@@ -0,0 +1,30 @@
+"""
+Route resolution middleware
+"""
+from fastapi import Request
+from starlette.routing import Match
+
+
+def match_route(request: Request):
+    """Find the route that will handle the request (before routing happens)"""
+    for route in request.app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return route
+    return None
+
+
+def current_route(request: Request):
+    """Route of the request resolved by route_middleware (None if no route matches)"""
+    return request.state.route
+
+
+async def route_middleware(request: Request, call_next):
+    """
+    Resolve the request's route once for the middlewares it wraps
+
+    match_route scans every route of the app; the cache, rate limit, metrics,
+    query stats and tracing middlewares read the result from request.state.
+    """
+    request.state.route = match_route(request)
+    return await call_next(request)
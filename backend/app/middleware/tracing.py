@@ -0,0 +1,42 @@
+"""
+HTTP server span middleware
+"""
+from fastapi import Request
+from opentelemetry import propagate
+from opentelemetry.trace import SpanKind, Status, StatusCode
+
+from app.core.tracing import record_exception, tracer
+from app.middleware.route import current_route
+
+
+async def tracing_middleware(request: Request, call_next):
+    """
+    Root span of the request
+
+    Continues an incoming W3C traceparent and is the parent of the SQL,
+    WebSocket and AI spans created while handling the request (including
+    tasks it schedules).
+    """
+    route = current_route(request)
+    route_path = getattr(route, "path", request.url.path)
+    with tracer.start_as_current_span(
+        f"{request.method} {route_path}",
+        context=propagate.extract(request.headers),
+        kind=SpanKind.SERVER,
+        attributes={
+            "http.method": request.method,
+            "http.route": route_path,
+            "http.target": request.url.path,
+        },
+        record_exception=False,
+        set_status_on_exception=False,
+    ) as span:
+        try:
+            response = await call_next(request)
+        except Exception as e:
+            record_exception(span, e)
+            raise
+        span.set_attribute("http.status_code", response.status_code)
+        if response.status_code >= 500:
+            span.set_status(Status(StatusCode.ERROR))
+        return response
@@ -1,7 +1,9 @@
 """Models package"""
 from app.models.user import User
-from app.models.sos_alert import SOSAlert
+from app.models.sos_alert import SOSAlert, SOSAlertTombstone, SOSAlertRevocation, SyncCounter
 from app.models.team import RescueTeam
 from app.models.notification import Notification
+from app.models.hydrant import Hydrant
+from app.models.alert_rollup import AlertRollup
 
-__all__ = ['User', 'SOSAlert', 'RescueTeam', 'Notification']
+__all__ = ['User', 'SOSAlert', 'SOSAlertTombstone', 'SOSAlertRevocation', 'SyncCounter', 'RescueTeam', 'Notification', 'Hydrant', 'AlertRollup']
@@ -0,0 +1,20 @@
+"""
+Alert rollup model (hourly alert counts per local day, type and district)
+"""
+from sqlalchemy import Column, Date, Integer, String
+
+from app.core.database import Base
+
+
+class AlertRollup(Base):
+    """Alert count of one local hour, emergency type and district"""
+    __tablename__ = "alert_rollups"
+    
+    day = Column(Date, primary_key=True)  # Local date (FORECAST_UTC_OFFSET_HOURS)
+    hour = Column(Integer, primary_key=True, autoincrement=False)  # Local hour 0-23
+    type = Column(String(20), primary_key=True)
+    district = Column(String(100), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f"<AlertRollup {self.day} {self.hour:02d}h {self.type}/{self.district}: {self.count}>"
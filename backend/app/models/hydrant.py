@@ -0,0 +1,46 @@
+"""
+Hydrant model (hydrants and other firefighting water sources)
+"""
+from sqlalchemy import Column, String, Float, DateTime, DECIMAL
+from datetime import datetime
+import uuid
+import enum
+
+from app.core.database import Base
+
+
+class HydrantType(str, enum.Enum):
+    """Water source type"""
+    UNDERGROUND = "underground"
+    SURFACE = "surface"
+    WATER_TOWER = "water_tower"
+    RESERVOIR = "reservoir"
+    NATURAL = "natural"  # River, lake, pond
+
+
+class HydrantStatus(str, enum.Enum):
+    """Water source status"""
+    OPERATIONAL = "operational"
+    OUT_OF_SERVICE = "out_of_service"
+    UNKNOWN = "unknown"
+
+
+class Hydrant(Base):
+    """Hydrant model"""
+    __tablename__ = "hydrants"
+    
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    external_id = Column(String(64), unique=True, nullable=True)  # ID in the source dataset, key of re-imports
+    type = Column(String(20), default="underground")  # Simplified: use String instead of Enum
+    status = Column(String(20), default="operational", index=True)  # Simplified: use String instead of Enum
+    
+    latitude = Column(DECIMAL(10, 8), nullable=False)
+    longitude = Column(DECIMAL(11, 8), nullable=False)
+    address = Column(String(500))
+    flow_rate = Column(Float)  # l/s
+    
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    
+    def __repr__(self):
+        return f"<Hydrant {self.external_id or self.id} - {self.type} ({self.status})>"
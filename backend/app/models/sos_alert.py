@@ -1,9 +1,21 @@
 """
 SOS Alert model
+
+Every write of an alert, tombstone or revocation is stamped with the next
+value of the "alerts" change counter (change_seq), taken when the session
+flushes. Incrementing the counter row locks it until the transaction
+commits, so sequence numbers become visible in commit order: a delta sync
+client that has seen change N can never later find a committed change
+below N. Timestamps (whole seconds on MySQL DATETIME, and assigned before
+commit) cannot guarantee that.
 """
-from sqlalchemy import Column, String, Integer, Text, DateTime, Enum as SQLEnum, ForeignKey, DECIMAL, JSON
-from sqlalchemy.orm import relationship
+from sqlalchemy import (
+    Column, String, Integer, BigInteger, Text, DateTime, Enum as SQLEnum, ForeignKey, DECIMAL, JSON, Index,
+    DDL, event, inspect, select, update
+)
+from sqlalchemy.orm import Session, relationship
 from datetime import datetime
+from typing import Optional
 import uuid
 import enum
 
@@ -43,9 +55,15 @@ class AlertPriority(int, enum.Enum):
 class SOSAlert(Base):
     """SOS Alert model"""
     __tablename__ = "sos_alerts"
+    __table_args__ = (
+        Index("ix_sos_alerts_user_id_idempotency_key", "user_id", "idempotency_key", unique=True),
+        Index("ix_sos_alerts_change_seq_id", "change_seq", "id"),
+    )
     
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     user_id = Column(String(36), ForeignKey("users.id"), nullable=False)
+    idempotency_key = Column(String(64))  # Client Idempotency-Key of the creating request
+    idempotency_fingerprint = Column(String(64))  # Payload hash of that request
     type = Column(String(20), default="other", nullable=False)  # Simplified: use String instead of Enum
     status = Column(String(20), default="pending", nullable=False)  # Simplified: use String instead of Enum
     priority = Column(Integer, default=AlertPriority.MEDIUM.value)
@@ -67,7 +85,8 @@ class SOSAlert(Base):
     
     # Timestamps
     created_at = Column(DateTime, default=datetime.utcnow, index=True)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    change_seq = Column(BigInteger)  # Delta sync position of the latest write
     assigned_at = Column(DateTime)
     completed_at = Column(DateTime)
     
@@ -78,3 +97,111 @@ class SOSAlert(Base):
     
     def __repr__(self):
         return f"<SOSAlert {self.id} - {self.type} ({self.status})>"
+
+
+class SOSAlertTombstone(Base):
+    """Marker left behind by a deleted SOS alert (used by delta sync clients)"""
+    __tablename__ = "sos_alert_tombstones"
+    
+    alert_id = Column(String(36), primary_key=True)
+    deleted_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    change_seq = Column(BigInteger, index=True)
+    
+    # Copied from the alert, so tombstones get the same role filter as alerts
+    user_id = Column(String(36))
+    status = Column(String(20))
+    assigned_to = Column(String(36))
+    team_id = Column(String(36))
+    
+    def __repr__(self):
+        return f"<SOSAlertTombstone {self.alert_id} ({self.deleted_at})>"
+
+
+class SOSAlertRevocation(Base):
+    """
+    Alert leaving the view of users who could see it (used by delta sync clients)
+
+    Written when the status, rescuer or team of an alert changes, with the
+    values before the change, so the users who saw the alert under them
+    can drop it.
+    """
+    __tablename__ = "sos_alert_revocations"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    alert_id = Column(String(36), nullable=False)
+    revoked_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    change_seq = Column(BigInteger, index=True)
+    
+    # Previous values of the alert
+    user_id = Column(String(36))
+    status = Column(String(20))
+    assigned_to = Column(String(36))
+    team_id = Column(String(36))
+    
+    def __repr__(self):
+        return f"<SOSAlertRevocation {self.alert_id} ({self.revoked_at})>"
+
+
+class SyncCounter(Base):
+    """Monotonic change counters for delta sync"""
+    __tablename__ = "sync_counters"
+    
+    name = Column(String(32), primary_key=True)
+    value = Column(BigInteger, nullable=False, default=0)
+
+
+ALERTS_COUNTER = "alerts"
+VISIBILITY_FIELDS = ("status", "assigned_to", "team_id")
+
+event.listen(
+    SyncCounter.__table__, "after_create",
+    DDL(f"INSERT INTO sync_counters (name, value) VALUES ('{ALERTS_COUNTER}', 0)")
+)
+
+
+def next_change_seq(session: Session) -> int:
+    """
+    Take the next alert change sequence number
+
+    The counter row stays locked until the session's transaction ends.
+    """
+    counter = SyncCounter.__table__
+    result = session.execute(
+        update(counter).where(counter.c.name == ALERTS_COUNTER).values(value=counter.c.value + 1)
+    )
+    if result.rowcount == 0:
+        session.execute(counter.insert().values(name=ALERTS_COUNTER, value=1))
+    return session.execute(select(counter.c.value).where(counter.c.name == ALERTS_COUNTER)).scalar_one()
+
+
+def _revocation_of(alert: SOSAlert) -> Optional[SOSAlertRevocation]:
+    """Revocation with the previous visibility fields of a modified alert, None if they did not change"""
+    attrs = inspect(alert).attrs
+    previous = {}
+    for field in VISIBILITY_FIELDS:
+        history = attrs[field].history
+        previous[field] = history.deleted[0] if history.deleted else getattr(alert, field)
+    if all(previous[field] == getattr(alert, field) for field in VISIBILITY_FIELDS):
+        return None
+    # Only rescuers lose alerts, and only ones they could see through a team, an assignment or the pool
+    if previous["team_id"] is None and previous["assigned_to"] is None \
+            and previous["status"] != AlertStatus.ASSIGNED.value:
+        return None
+    return SOSAlertRevocation(alert_id=alert.id, user_id=alert.user_id, **previous)
+
+
+@event.listens_for(Session, "before_flush")
+def _stamp_alert_changes(session: Session, flush_context, instances):
+    """Give every alert change of this flush the next change_seq"""
+    changed = [obj for obj in session.new if isinstance(obj, (SOSAlert, SOSAlertTombstone, SOSAlertRevocation))]
+    for obj in session.dirty:
+        if isinstance(obj, SOSAlert) and session.is_modified(obj):
+            changed.append(obj)
+            revocation = _revocation_of(obj)
+            if revocation is not None:
+                session.add(revocation)
+                changed.append(revocation)
+    if changed:
+        change_seq = next_change_seq(session)
+        for obj in changed:
+            obj.change_seq = change_seq
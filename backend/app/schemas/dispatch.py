@@ -0,0 +1,40 @@
+"""
+Dispatch schemas
+"""
+from pydantic import BaseModel, Field
+from typing import Optional, List
+
+
+class AutoAssignRequest(BaseModel):
+    """Batch auto-assignment of pending alerts"""
+    alert_ids: Optional[List[str]] = None  # Default - all pending unassigned alerts
+    dry_run: bool = False  # Only return the plan
+
+
+class DispatchOption(BaseModel):
+    """One team for an alert"""
+    team_id: str
+    team_name: str
+    team_type: str
+    distance_km: float
+    eta_minutes: float
+    type_match: float
+    active_alerts: int
+    cost: float
+
+
+class DispatchAssignment(BaseModel):
+    """Optimal team of an alert and ranked alternatives"""
+    alert_id: str
+    type: str
+    priority: Optional[int]
+    recommended: Optional[DispatchOption]  # None - stays pending in this batch
+    alternatives: List[DispatchOption]
+
+
+class DispatchPlan(BaseModel):
+    """Batch dispatch plan"""
+    assignments: List[DispatchAssignment]
+    unassigned: List[str]
+    solve_ms: float
+    applied: List[str] = Field(default_factory=list)  # Alerts assigned by auto-assign
@@ -56,6 +56,15 @@ class SOSAlertResponse(SOSAlertBase):
         from_attributes = True
 
 
+class SOSAlertChanges(BaseModel):
+    """Delta sync response: alerts changed, deleted and revoked since a cursor"""
+    alerts: List[SOSAlertResponse]
+    deleted: List[str]  # IDs of alerts deleted since the cursor
+    revoked: List[str] = []  # IDs of alerts no longer visible to the user (reassigned)
+    cursor: str  # Pass back as ?since= on the next poll
+    has_more: bool = False
+
+
 class VoiceAnalysisRequest(BaseModel):
     """Voice analysis request schema"""
     audio_base64: str
@@ -1,7 +1,7 @@
 """
 Rescue Team schemas
 """
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List
 from datetime import datetime
 from uuid import UUID
@@ -41,6 +41,34 @@ class RescueTeamUpdate(BaseModel):
     leader_id: Optional[str] = None  # Update team leader
 
 
+class TeamRosterEntry(BaseModel):
+    """Roster of one team in a bulk import"""
+    team_id: str
+    member_ids: List[str] = []  # Rescuer user IDs
+    leader_id: Optional[str] = None
+
+
+class TeamRosterImport(BaseModel):
+    """Bulk team roster import"""
+    teams: List[TeamRosterEntry]
+
+
+class PositionFix(BaseModel):
+    """One GPS fix of a team"""
+    team_id: Optional[str] = None  # Default - the rescuer's own team
+    latitude: float = Field(..., ge=-90, le=90)
+    longitude: float = Field(..., ge=-180, le=180)
+    recorded_at: Optional[datetime] = None  # Device time, default - time of receipt
+    accuracy: Optional[float] = Field(None, ge=0)  # Meters
+    speed: Optional[float] = Field(None, ge=0)  # m/s
+    heading: Optional[float] = Field(None, ge=0, lt=360)  # Degrees
+
+
+class PositionBatch(BaseModel):
+    """Batch of GPS fixes (buffered on the device or from a vehicle tracker gateway)"""
+    positions: List[PositionFix] = Field(..., min_length=1, max_length=1000)
+
+
 class RescueTeamResponse(RescueTeamBase):
     """Rescue team response schema"""
     id: UUID
@@ -6,6 +6,7 @@ from typing import Dict, Any
 from openai import OpenAI
 
 from app.core.config import settings
+from app.core.metrics import observe_ai_call
 
 
 class ImageAnalyzer:
@@ -105,29 +106,30 @@ class ImageAnalyzer:
   "time_sensitivity": "критично/срочно/умеренно/не критично"
 }"""
             
-            response = self.client.chat.completions.create(
-                model="gpt-4o",  # Latest model with vision
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "text",
-                                "text": prompt
-                            },
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/jpeg;base64,{image_base64}",
-                                    "detail": "high"  # High detail for better analysis
+            with observe_ai_call("gpt-4o", "analyze_emergency_image"):
+                response = self.client.chat.completions.create(
+                    model="gpt-4o",  # Latest model with vision
+                    messages=[
+                        {
+                            "role": "user",
+                            "content": [
+                                {
+                                    "type": "text",
+                                    "text": prompt
+                                },
+                                {
+                                    "type": "image_url",
+                                    "image_url": {
+                                        "url": f"data:image/jpeg;base64,{image_base64}",
+                                        "detail": "high"  # High detail for better analysis
+                                    }
                                 }
-                            }
-                        ]
-                    }
-                ],
-                max_tokens=1500,
-                temperature=0.3
-            )
+                            ]
+                        }
+                    ],
+                    max_tokens=1500,
+                    temperature=0.3
+                )
             
             import json
             try:
@@ -185,27 +187,28 @@ class ImageAnalyzer:
             dict: People count and locations
         """
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-4-vision-preview",
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "text",
-                                "text": "Посчитай сколько людей на изображении. Ответь в формате JSON: {\"count\": число, \"confidence\": 0.0-1.0, \"details\": \"описание\"}"
-                            },
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/jpeg;base64,{image_base64}"
+            with observe_ai_call("gpt-4-vision-preview", "detect_people_count"):
+                response = self.client.chat.completions.create(
+                    model="gpt-4-vision-preview",
+                    messages=[
+                        {
+                            "role": "user",
+                            "content": [
+                                {
+                                    "type": "text",
+                                    "text": "Посчитай сколько людей на изображении. Ответь в формате JSON: {\"count\": число, \"confidence\": 0.0-1.0, \"details\": \"описание\"}"
+                                },
+                                {
+                                    "type": "image_url",
+                                    "image_url": {
+                                        "url": f"data:image/jpeg;base64,{image_base64}"
+                                    }
                                 }
-                            }
-                        ]
-                    }
-                ],
-                max_tokens=300
-            )
+                            ]
+                        }
+                    ],
+                    max_tokens=300
+                )
             
             import json
             try:
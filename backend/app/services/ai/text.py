@@ -2,9 +2,13 @@
 Text Analysis Service
 """
 from typing import Dict, Any
+import logging
 from openai import OpenAI
 
 from app.core.config import settings
+from app.core.metrics import observe_ai_call
+
+logger = logging.getLogger(__name__)
 
 
 class TextAnalyzer:
@@ -60,35 +64,36 @@ class TextAnalyzer:
   "risk_assessment": "оценка_рисков"
 }"""
             
-            print(f"🤖 AI Request - Text: {text[:100]}...")
-            
-            response = self.client.chat.completions.create(
-                model="deepseek-chat",  # DeepSeek model
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": f"Описание ЧС: {text}"}
-                ],
-                temperature=0.2,
-                response_format={"type": "json_object"}
-            )
+            with observe_ai_call("deepseek-chat", "classify_emergency"):
+                response = self.client.chat.completions.create(
+                    model="deepseek-chat",  # DeepSeek model
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": f"Описание ЧС: {text}"}
+                    ],
+                    temperature=0.2,
+                    response_format={"type": "json_object"}
+                )
             
             import json
             raw_content = response.choices[0].message.content
-            print(f"🎯 AI Raw Response: {raw_content}")
+            logger.debug("AI classification response", extra={"raw": raw_content[:500]})
             
             result = json.loads(raw_content)
-            print(f"📊 AI Parsed Result: {result}")
             
             # Add metadata
             result["analyzed_at"] = "now"
             result["model_used"] = "gpt-4o"
             
-            print(f"✅ AI Final Result - Confidence: {result.get('confidence', 'N/A')}")
+            logger.info("AI classification done", extra={
+                "emergency_type": result.get("type"),
+                "confidence": result.get("confidence")
+            })
             
             return result
             
         except Exception as e:
-            print(f"❌ AI Classification Error: {str(e)}")
+            logger.error(f"AI classification failed: {e}")
             return {
                 "type": "general",
                 "priority": 3,
@@ -160,15 +165,16 @@ class TextAnalyzer:
   "risks": ["риск 1", "риск 2"]
 }}"""
             
-            response = self.client.chat.completions.create(
-                model="deepseek-chat",
-                messages=[
-                    {"role": "system", "content": "Ты - опытный координатор спасательных операций. Создавай детальные, реалистичные планы."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3,
-                response_format={"type": "json_object"}
-            )
+            with observe_ai_call("deepseek-chat", "generate_rescue_plan"):
+                response = self.client.chat.completions.create(
+                    model="deepseek-chat",
+                    messages=[
+                        {"role": "system", "content": "Ты - опытный координатор спасательных операций. Создавай детальные, реалистичные планы."},
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=0.3,
+                    response_format={"type": "json_object"}
+                )
             
             import json
             plan = json.loads(response.choices[0].message.content)
@@ -178,7 +184,7 @@ class TextAnalyzer:
             return plan
             
         except Exception as e:
-            print(f"❌ Plan Generation Error: {str(e)}")
+            logger.error(f"AI rescue plan generation failed: {e}")
             return {
                 "operation_name": "Стандартная спасательная операция",
                 "phases": [
@@ -234,15 +240,16 @@ class TextAnalyzer:
   "urgency_level": 1-5
 }}"""
             
-            response = self.client.chat.completions.create(
-                model="deepseek-chat",
-                messages=[
-                    {"role": "system", "content": "Ты - аналитик спасательных операций"},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.2,
-                response_format={"type": "json_object"}
-            )
+            with observe_ai_call("deepseek-chat", "analyze_situation_report"):
+                response = self.client.chat.completions.create(
+                    model="deepseek-chat",
+                    messages=[
+                        {"role": "system", "content": "Ты - аналитик спасательных операций"},
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=0.2,
+                    response_format={"type": "json_object"}
+                )
             
             import json
             return json.loads(response.choices[0].message.content)
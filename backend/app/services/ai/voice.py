@@ -4,9 +4,13 @@ Voice Assistant Service - OpenAI Whisper integration
 import base64
 import io
 from typing import Dict, Any
+import logging
 from openai import OpenAI
 
 from app.core.config import settings
+from app.core.metrics import observe_ai_call
+
+logger = logging.getLogger(__name__)
 
 
 class VoiceAssistant:
@@ -36,11 +40,12 @@ class VoiceAssistant:
             audio_file.name = "audio.mp3"
             
             # Transcribe using Whisper
-            transcript = self.client.audio.transcriptions.create(
-                model="whisper-1",
-                file=audio_file,
-                language=language
-            )
+            with observe_ai_call("whisper-1", "transcribe_audio"):
+                transcript = self.client.audio.transcriptions.create(
+                    model="whisper-1",
+                    file=audio_file,
+                    language=language
+                )
             
             return transcript.text
         except Exception as e:
@@ -119,15 +124,16 @@ class VoiceAssistant:
   "time_sensitive": true/false
 }"""
             
-            response = self.client.chat.completions.create(
-                model="deepseek-chat",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": f"Транскрипция вызова: {text}"}
-                ],
-                temperature=0.2,
-                response_format={"type": "json_object"}
-            )
+            with observe_ai_call("deepseek-chat", "analyze_emergency_text"):
+                response = self.client.chat.completions.create(
+                    model="deepseek-chat",
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": f"Транскрипция вызова: {text}"}
+                    ],
+                    temperature=0.2,
+                    response_format={"type": "json_object"}
+                )
             
             import json
             result = json.loads(response.choices[0].message.content)
@@ -136,7 +142,7 @@ class VoiceAssistant:
             return result
             
         except Exception as e:
-            print(f"❌ Voice Analysis Error: {str(e)}")
+            logger.error(f"AI voice analysis failed: {e}")
             # Enhanced fallback response
             return {
                 "emergency_type": "general",
@@ -168,11 +174,12 @@ class VoiceAssistant:
             bytes: Audio data
         """
         try:
-            response = self.client.audio.speech.create(
-                model="tts-1",
-                voice="alloy",
-                input=text
-            )
+            with observe_ai_call("tts-1", "generate_voice_response"):
+                response = self.client.audio.speech.create(
+                    model="tts-1",
+                    voice="alloy",
+                    input=text
+                )
             
             return response.content
         except Exception as e:
@@ -198,15 +205,16 @@ class VoiceAssistant:
         prompt = prompts.get(emergency_type, prompts["general"])
         
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "Ты - эксперт по чрезвычайным ситуациям. Давай четкие, краткие инструкции."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=500,
-                temperature=0.3
-            )
+            with observe_ai_call("gpt-4", "get_emergency_guidance"):
+                response = self.client.chat.completions.create(
+                    model="gpt-4",
+                    messages=[
+                        {"role": "system", "content": "Ты - эксперт по чрезвычайным ситуациям. Давай четкие, краткие инструкции."},
+                        {"role": "user", "content": prompt}
+                    ],
+                    max_tokens=500,
+                    temperature=0.3
+                )
             
             return response.choices[0].message.content
         except Exception as e:
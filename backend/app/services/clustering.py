@@ -0,0 +1,297 @@
+"""
+Clustering Service - Incremental spatio-temporal DBSCAN of incoming SOS alerts
+
+Alerts of the last CLUSTER_WINDOW_MINUTES are kept in memory on a grid of
+CLUSTER_EPS_METERS cells, so the eps-neighbourhood of a point is found in
+the 3x3 surrounding cells. A point with at least CLUSTER_MIN_ALERTS points
+(itself included) within eps is a core point. Core points within eps of
+each other share a cluster, non-core points join the cluster of one core
+neighbour (DBSCAN border points), the rest is noise. A cluster is thus a
+component with at least one core point; it is announced once, when it
+appears, and stays announced while it grows, merges or splits.
+
+Clusters are union-find components with member sets merged small-into-large,
+so an insert costs O(log n) amortized plus its neighbourhood scan. When
+clustered alerts leave the window (or are deleted) only their clusters are
+rebuilt, since deletions can split a cluster.
+
+The engine lives in process memory: with several workers each one clusters
+the alerts it received, warmed from the database on first use.
+"""
+from collections import deque
+from datetime import datetime, timedelta
+from sqlalchemy.orm import Session
+from typing import Deque, Dict, Iterable, List, Optional, Set, Tuple
+import math
+
+from app.core.config import settings
+from app.models.sos_alert import SOSAlert
+
+METERS_PER_DEGREE = 111320.0
+
+
+class ClusterPoint:
+    """One alert in the window"""
+    __slots__ = ("id", "latitude", "longitude", "x", "y", "cell", "created_at", "type", "priority",
+                 "neighbors", "core", "attached")
+
+    def __init__(self, alert_id: str, latitude: float, longitude: float, x: float, y: float,
+                 cell: Tuple[int, int], created_at: datetime, alert_type: str, priority: Optional[int]):
+        self.id = alert_id
+        self.latitude = latitude
+        self.longitude = longitude
+        self.x = x
+        self.y = y
+        self.cell = cell
+        self.created_at = created_at
+        self.type = alert_type
+        self.priority = priority
+        self.neighbors = 1  # Points within eps, itself included
+        self.core = False
+        self.attached = False  # Border point attached to a cluster
+
+
+class ClusterEngine:
+    """Incremental DBSCAN over a sliding time window"""
+
+    def __init__(self, eps_meters: float, min_points: int, window: timedelta):
+        self.eps = eps_meters
+        self.min_points = min_points
+        self.window = window
+        # Local equirectangular projection around the service area
+        self._lon_scale = METERS_PER_DEGREE * math.cos(math.radians(settings.DEFAULT_LATITUDE))
+        self.points: Dict[str, ClusterPoint] = {}
+        self._grid: Dict[Tuple[int, int], Set[str]] = {}
+        self._expiry: Deque[Tuple[datetime, str]] = deque()
+        self._parent: Dict[str, str] = {}
+        self._members: Dict[str, Set[str]] = {}  # Root -> component members
+        self._announced: Set[str] = set()  # Roots of clusters already pushed to operators
+        self.warmed = False
+
+    # Union-find
+
+    def _find(self, point_id: str) -> str:
+        root = point_id
+        while self._parent[root] != root:
+            root = self._parent[root]
+        while self._parent[point_id] != root:
+            self._parent[point_id], point_id = root, self._parent[point_id]
+        return root
+
+    def _union(self, a: str, b: str) -> str:
+        root_a, root_b = self._find(a), self._find(b)
+        if root_a == root_b:
+            return root_a
+        if len(self._members[root_a]) < len(self._members[root_b]):
+            root_a, root_b = root_b, root_a
+        self._parent[root_b] = root_a
+        self._members[root_a] |= self._members.pop(root_b)
+        if root_b in self._announced:
+            self._announced.discard(root_b)
+            self._announced.add(root_a)
+        return root_a
+
+    # Grid
+
+    def _neighbors(self, point: ClusterPoint) -> List[ClusterPoint]:
+        cx, cy = point.cell
+        eps2 = self.eps * self.eps
+        found = []
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for other_id in self._grid.get((cx + dx, cy + dy), ()):
+                    if other_id == point.id:
+                        continue
+                    other = self.points[other_id]
+                    if (other.x - point.x) ** 2 + (other.y - point.y) ** 2 <= eps2:
+                        found.append(other)
+        return found
+
+    def _is_cluster(self, root: str) -> bool:
+        # Only core points link components, so a component is a cluster iff it has one
+        return any(self.points[member_id].core for member_id in self._members[root])
+
+    def _link_core(self, core: ClusterPoint, neighbors: Iterable[ClusterPoint]):
+        """Union a core point with its core neighbours and attach free border points"""
+        for other in neighbors:
+            if other.core:
+                self._union(core.id, other.id)
+            elif not other.attached:
+                other.attached = True
+                self._union(core.id, other.id)
+
+    # Public API
+
+    def add(self, alert_id: str, latitude: float, longitude: float, created_at: datetime,
+            alert_type: str, priority: Optional[int] = None, now: Optional[datetime] = None) -> List[dict]:
+        """
+        Insert an alert
+
+        Returns:
+            List[dict]: Summaries of the clusters detected by this insert (got
+            their first core point). Usually none or one; a border point can
+            make two separate neighbours core at once.
+        """
+        now = now or datetime.utcnow()
+        self.expire(now)
+        if alert_id in self.points or created_at < now - self.window:
+            return []
+
+        x, y = longitude * self._lon_scale, latitude * METERS_PER_DEGREE
+        cell = (math.floor(x / self.eps), math.floor(y / self.eps))
+        point = ClusterPoint(alert_id, latitude, longitude, x, y, cell, created_at, alert_type, priority)
+        self.points[alert_id] = point
+        self._grid.setdefault(cell, set()).add(alert_id)
+        self._expiry.append((created_at, alert_id))
+        self._parent[alert_id] = alert_id
+        self._members[alert_id] = {alert_id}
+
+        neighbors = self._neighbors(point)
+        point.neighbors += len(neighbors)
+        new_cores = [point] if point.neighbors >= self.min_points else []
+        for other in neighbors:
+            other.neighbors += 1
+            if other.neighbors == self.min_points:
+                new_cores.append(other)
+
+        for core in new_cores:
+            core.core = True
+            core.attached = False
+            self._link_core(core, neighbors if core is point else self._neighbors(core))
+        if not point.core and not point.attached:
+            core_neighbor = next((other for other in neighbors if other.core), None)
+            if core_neighbor is not None:
+                point.attached = True
+                self._union(core_neighbor.id, point.id)
+
+        detected = []
+        for root in {self._find(core.id) for core in new_cores}:
+            if root not in self._announced:
+                self._announced.add(root)
+                detected.append(self.summarize(root))
+        return detected
+
+    def remove(self, alert_id: str):
+        """Drop a deleted alert"""
+        if alert_id in self.points:
+            self._remove_points([alert_id])
+
+    def expire(self, now: Optional[datetime] = None):
+        """Drop alerts older than the window"""
+        cutoff = (now or datetime.utcnow()) - self.window
+        expired = []
+        while self._expiry and self._expiry[0][0] < cutoff:
+            _, alert_id = self._expiry.popleft()
+            if alert_id in self.points:
+                expired.append(alert_id)
+        if expired:
+            self._remove_points(expired)
+
+    def _remove_points(self, alert_ids: List[str]):
+        affected: Set[str] = set()
+        announced_members: Set[str] = set()
+        for alert_id in alert_ids:
+            point = self.points[alert_id]
+            root = self._find(alert_id)
+            if len(self._members[root]) > 1:
+                affected.add(root)
+            for other in self._neighbors(point):
+                other.neighbors -= 1
+                if other.core:
+                    affected.add(self._find(other.id))
+            self._grid[point.cell].discard(alert_id)
+            if not self._grid[point.cell]:
+                del self._grid[point.cell]
+            del self.points[alert_id]
+
+        removed = set(alert_ids)
+        members: Set[str] = set()
+        for root in affected | {self._find(alert_id) for alert_id in alert_ids}:
+            component = self._members.pop(root, set())
+            if root in self._announced:
+                self._announced.discard(root)
+                announced_members |= component
+            members |= component
+        for alert_id in removed:
+            self._parent.pop(alert_id, None)
+        self._recluster(members - removed, announced_members)
+
+    def _recluster(self, member_ids: Set[str], announced_members: Set[str]):
+        """Rebuild the components of `member_ids` from scratch"""
+        for member_id in member_ids:
+            point = self.points[member_id]
+            point.core = point.neighbors >= self.min_points
+            point.attached = False
+            self._parent[member_id] = member_id
+            self._members[member_id] = {member_id}
+        cores = [self.points[member_id] for member_id in member_ids if self.points[member_id].core]
+        for core in cores:
+            self._link_core(core, [other for other in self._neighbors(core) if other.core])
+        for member_id in member_ids:
+            point = self.points[member_id]
+            if not point.core and not point.attached:
+                core_neighbor = next((other for other in self._neighbors(point) if other.core), None)
+                if core_neighbor is not None:
+                    point.attached = True
+                    self._union(core_neighbor.id, member_id)
+        # Clusters that were already announced stay announced after a split
+        for member_id in member_ids & announced_members:
+            root = self._find(member_id)
+            if root not in self._announced and self._is_cluster(root):
+                self._announced.add(root)
+
+    def summarize(self, root: str) -> dict:
+        """Centroid, extent and composition of a cluster"""
+        points = [self.points[member_id] for member_id in self._members[root]]
+        first = min(points, key=lambda point: (point.created_at, point.id))
+        latitude = sum(point.latitude for point in points) / len(points)
+        longitude = sum(point.longitude for point in points) / len(points)
+        cx, cy = longitude * self._lon_scale, latitude * METERS_PER_DEGREE
+        types: Dict[str, int] = {}
+        for point in points:
+            types[point.type] = types.get(point.type, 0) + 1
+        priorities = [point.priority for point in points if point.priority is not None]
+        return {
+            "id": first.id,  # Earliest alert of the cluster, stable while it grows
+            "latitude": round(latitude, 6),
+            "longitude": round(longitude, 6),
+            "radius_m": round(max(math.hypot(point.x - cx, point.y - cy) for point in points), 1),
+            "alert_count": len(points),
+            "types": types,
+            "top_priority": min(priorities) if priorities else None,
+            "first_alert_at": first.created_at,
+            "last_alert_at": max(point.created_at for point in points),
+            "alert_ids": sorted(point.id for point in points),
+        }
+
+    def clusters(self, now: Optional[datetime] = None) -> List[dict]:
+        """All current clusters, largest first"""
+        self.expire(now)
+        summaries = [self.summarize(root) for root in self._members if self._is_cluster(root)]
+        return sorted(summaries, key=lambda summary: summary["alert_count"], reverse=True)
+
+    def warm(self, db: Session, now: Optional[datetime] = None):
+        """
+        Load the alerts of the current window from the database (once)
+
+        Runs at startup. Request handlers call it again before inserting an
+        alert (no-op once warmed): alerts loaded here count as announced, so
+        it must not run after the alert that is added next is committed.
+        """
+        if self.warmed:
+            return
+        now = now or datetime.utcnow()
+        rows = db.query(
+            SOSAlert.id, SOSAlert.latitude, SOSAlert.longitude, SOSAlert.created_at, SOSAlert.type, SOSAlert.priority
+        ).filter(SOSAlert.created_at >= now - self.window).order_by(SOSAlert.created_at.asc()).all()
+        self.warmed = True
+        for alert_id, latitude, longitude, created_at, alert_type, priority in rows:
+            # Clusters detected here were announced by an earlier process, add() marks them
+            self.add(alert_id, float(latitude), float(longitude), created_at, alert_type, priority, now=now)
+
+
+cluster_engine = ClusterEngine(
+    eps_meters=settings.CLUSTER_EPS_METERS,
+    min_points=settings.CLUSTER_MIN_ALERTS,
+    window=timedelta(minutes=settings.CLUSTER_WINDOW_MINUTES),
+)
@@ -0,0 +1,246 @@
+"""
+Coverage Service - Response-time raster of the service area around team bases
+
+The service area (a COVERAGE_AREA_KM square around the default map centre)
+is cut into COVERAGE_CELL_METERS cells of a local equirectangular
+projection. Every cell gets the estimated minutes from the nearest team base
+(one cells x bases distance matrix, evaluated in chunks) and the number of
+alerts created in it during the last COVERAGE_HISTORY_DAYS.
+
+Percentiles are reported two ways: over the area (every cell counts once)
+and over demand (cells weighted by their alerts, i.e. what past callers
+would have waited). A hypothetical base only needs one more distance row:
+the new nearest time is min(current, new base).
+
+Grids are cached per team-set version (a hash of the team bases) and day,
+so a moved, added or deleted base gives a fresh grid and nothing else does.
+"""
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from sqlalchemy.orm import Session
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import hashlib
+import math
+
+import numpy as np
+
+from app.core.config import settings
+from app.models.sos_alert import SOSAlert
+from app.models.team import RescueTeam
+from app.services.dispatch import ROAD_FACTOR
+
+METERS_PER_DEGREE = 111320.0
+PERCENTILES = (50, 90, 95)
+CHUNK_ELEMENTS = 1 << 20  # Distance matrix elements evaluated at once
+CANDIDATE_SITES = 256  # Cells evaluated as new base sites
+SUGGESTIONS = 3
+SUGGESTION_SPACING_METERS = 2000.0  # Suggested sites are at least this far apart
+CACHE_SIZE = 16
+
+
+def team_set_version(bases: Sequence[Tuple[str, float, float]]) -> str:
+    """Hash of (team id, base latitude, base longitude) of every base"""
+    parts = "|".join(f"{team_id}:{latitude:.6f}:{longitude:.6f}" for team_id, latitude, longitude in sorted(bases))
+    return hashlib.sha1(parts.encode("utf-8")).hexdigest()[:12]
+
+
+def weighted_percentiles(values: np.ndarray, weights: np.ndarray, percentiles: Iterable[int]) -> dict:
+    """{"p50": ..., "max": ...} of values weighted by weights (empty dict without weight)"""
+    keep = weights > 0
+    values, weights = values[keep], weights[keep]
+    if not len(values):
+        return {}
+    order = np.argsort(values)
+    values, cumulative = values[order], np.cumsum(weights[order])
+    result = {}
+    for percentile in percentiles:
+        i = int(np.searchsorted(cumulative, cumulative[-1] * percentile / 100))
+        result[f"p{percentile}"] = round(float(values[min(i, len(values) - 1)]), 1)
+    result["max"] = round(float(values[-1]), 1)
+    return result
+
+
+class CoverageGrid:
+    """Nearest-base minutes and alert counts of every cell"""
+
+    def __init__(self, bases: Sequence[Tuple[str, float, float]], alerts: np.ndarray, version: str):
+        self.version = version
+        self.cell = settings.COVERAGE_CELL_METERS
+        self.bases = len(bases)
+        self._lon_scale = METERS_PER_DEGREE * math.cos(math.radians(settings.DEFAULT_LATITUDE))
+
+        half = settings.COVERAGE_AREA_KM * 1000 / 2
+        cx, cy = self._project(np.array([settings.DEFAULT_LATITUDE]), np.array([settings.DEFAULT_LONGITUDE]))
+        self.cols = self.rows = max(1, math.ceil(2 * half / self.cell))
+        self.x0, self.y0 = float(cx[0]) - half, float(cy[0]) - half
+        xs = self.x0 + (np.arange(self.cols) + 0.5) * self.cell
+        ys = self.y0 + (np.arange(self.rows) + 0.5) * self.cell
+        grid_x, grid_y = np.meshgrid(xs, ys)  # Row 0 is the southern edge
+        self.x, self.y = grid_x.ravel(), grid_y.ravel()
+
+        if bases:
+            bx, by = self._project(
+                np.array([base[1] for base in bases]), np.array([base[2] for base in bases])
+            )
+            self.minutes = self._nearest_minutes(bx, by)
+        else:
+            self.minutes = np.full(self.x.shape, np.inf)
+        self.demand = self._bin(alerts)
+        self._suggestions: Dict[float, List[dict]] = {}  # By target minutes
+
+    def _project(self, latitudes: np.ndarray, longitudes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        return longitudes * self._lon_scale, latitudes * METERS_PER_DEGREE
+
+    def _to_minutes(self, meters: np.ndarray) -> np.ndarray:
+        return meters / 1000 * ROAD_FACTOR / settings.DISPATCH_SPEED_KMH * 60
+
+    def _nearest_minutes(self, bx: np.ndarray, by: np.ndarray) -> np.ndarray:
+        """Minutes from the nearest of the given points to every cell"""
+        nearest = np.empty(len(self.x))
+        step = max(1, CHUNK_ELEMENTS // len(bx))
+        for start in range(0, len(self.x), step):
+            dx = self.x[start:start + step, None] - bx[None, :]
+            dy = self.y[start:start + step, None] - by[None, :]
+            nearest[start:start + step] = np.sqrt(dx * dx + dy * dy).min(axis=1)
+        return self._to_minutes(nearest)
+
+    def _bin(self, alerts: np.ndarray) -> np.ndarray:
+        counts = np.zeros(self.rows * self.cols, dtype=np.int64)
+        if len(alerts):
+            x, y = self._project(alerts[:, 0], alerts[:, 1])
+            col = np.floor((x - self.x0) / self.cell).astype(np.int64)
+            row = np.floor((y - self.y0) / self.cell).astype(np.int64)
+            inside = (col >= 0) & (col < self.cols) & (row >= 0) & (row < self.rows)
+            counts += np.bincount(row[inside] * self.cols + col[inside], minlength=len(counts))
+        return counts
+
+    def _cell_center(self, cell: int) -> Tuple[float, float]:
+        return float(self.y[cell]) / METERS_PER_DEGREE, float(self.x[cell]) / self._lon_scale
+
+    @property
+    def bbox(self) -> List[float]:
+        """[west, south, east, north] of the grid"""
+        south, west = self.y0 / METERS_PER_DEGREE, self.x0 / self._lon_scale
+        north = (self.y0 + self.rows * self.cell) / METERS_PER_DEGREE
+        east = (self.x0 + self.cols * self.cell) / self._lon_scale
+        return [round(west, 6), round(south, 6), round(east, 6), round(north, 6)]
+
+    def summary(self, minutes: np.ndarray, target_minutes: float) -> dict:
+        """Area and demand percentiles of a minutes raster"""
+        area = np.ones(len(minutes))
+        demand = self.demand.astype(float)
+        alerts = demand.sum()
+        within = minutes <= target_minutes
+        return {
+            "area": weighted_percentiles(minutes, area, PERCENTILES),
+            "demand": weighted_percentiles(minutes, demand, PERCENTILES),
+            "area_within_target": round(float(within.mean()), 4),
+            "alerts_within_target": round(float(demand[within].sum() / alerts), 4) if alerts else None,
+        }
+
+    def what_if(self, latitude: float, longitude: float) -> np.ndarray:
+        """Minutes raster with an extra base"""
+        bx, by = self._project(np.array([latitude]), np.array([longitude]))
+        return np.minimum(self.minutes, self._nearest_minutes(bx, by))
+
+    def suggestions(self, target_minutes: float) -> List[dict]:
+        """
+        Best cells for a new base by demand-weighted minutes saved
+
+        Candidates are the cells with the most alert-minutes (alerts x current
+        minutes); each is scored against every cell with alerts. Suggested
+        sites are SUGGESTION_SPACING_METERS apart. Needs at least one base.
+        """
+        if target_minutes in self._suggestions:
+            return self._suggestions[target_minutes]
+        demand_cells = np.flatnonzero(self.demand)
+        weights = self.demand[demand_cells].astype(float)
+        current = self.minutes[demand_cells]
+        candidates = demand_cells[np.argsort(-weights * current, kind="stable")[:CANDIDATE_SITES]]
+
+        saved = np.empty(len(candidates))
+        newly_within = np.empty(len(candidates))
+        step = max(1, CHUNK_ELEMENTS // max(1, len(demand_cells)))
+        for start in range(0, len(candidates), step):
+            chunk = candidates[start:start + step]
+            # chunk x demand cells
+            dx = self.x[chunk, None] - self.x[None, demand_cells]
+            dy = self.y[chunk, None] - self.y[None, demand_cells]
+            improved = np.minimum(current[None, :], self._to_minutes(np.sqrt(dx * dx + dy * dy)))
+            saved[start:start + step] = (current[None, :] - improved) @ weights / weights.sum()
+            newly_within[start:start + step] = ((improved <= target_minutes) & (current > target_minutes)) @ weights
+
+        suggestions, chosen = [], []
+        for i in np.argsort(-saved, kind="stable"):
+            cell = int(candidates[i])
+            if any(math.hypot(self.x[cell] - self.x[other], self.y[cell] - self.y[other]) < SUGGESTION_SPACING_METERS
+                   for other in chosen):
+                continue
+            chosen.append(cell)
+            latitude, longitude = self._cell_center(cell)
+            suggestions.append({
+                "latitude": round(latitude, 6),
+                "longitude": round(longitude, 6),
+                "mean_minutes_saved": round(float(saved[i]), 2),
+                "alerts_newly_within_target": int(newly_within[i]),
+            })
+            if len(suggestions) == SUGGESTIONS:
+                break
+        self._suggestions[target_minutes] = suggestions
+        return suggestions
+
+
+class CoverageAnalyzer:
+    """LRU of coverage grids keyed by team-set version"""
+
+    def __init__(self, cache_size: int):
+        self._cache: "OrderedDict[tuple, CoverageGrid]" = OrderedDict()
+        self._cache_size = cache_size
+
+    def grid(self, db: Session, team_type: Optional[str] = None,
+             alert_types: Optional[Iterable[str]] = None) -> CoverageGrid:
+        """
+        Coverage grid of the current team bases
+
+        Args:
+            db: Database session
+            team_type: Only bases of teams of this type
+            alert_types: Only alerts of these types count as demand
+        """
+        query = db.query(RescueTeam.id, RescueTeam.base_latitude, RescueTeam.base_longitude).filter(
+            RescueTeam.base_latitude.isnot(None), RescueTeam.base_longitude.isnot(None)
+        )
+        if team_type:
+            query = query.filter(RescueTeam.type == team_type)
+        bases = [(team_id, float(latitude), float(longitude)) for team_id, latitude, longitude in query.all()]
+        version = team_set_version(bases)
+        alert_types = tuple(sorted(alert_types)) if alert_types else None
+        # Demand is reloaded daily; settings are part of the key so a config change is picked up
+        key = (version, alert_types, date.today(), settings.COVERAGE_CELL_METERS, settings.COVERAGE_AREA_KM,
+               settings.COVERAGE_HISTORY_DAYS)
+        grid = self._cache.get(key)
+        if grid is not None:
+            self._cache.move_to_end(key)
+            return grid
+
+        grid = CoverageGrid(bases, self._load_alerts(db, alert_types), version)
+        self._cache[key] = grid
+        while len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+        return grid
+
+    @staticmethod
+    def _load_alerts(db: Session, alert_types: Optional[Tuple[str, ...]]) -> np.ndarray:
+        since = datetime.utcnow() - timedelta(days=settings.COVERAGE_HISTORY_DAYS)
+        query = db.query(SOSAlert.latitude, SOSAlert.longitude).filter(
+            SOSAlert.created_at >= since,
+            SOSAlert.latitude.isnot(None),
+            SOSAlert.longitude.isnot(None)
+        )
+        if alert_types:
+            query = query.filter(SOSAlert.type.in_(alert_types))
+        points = [(float(latitude), float(longitude)) for latitude, longitude in query.yield_per(10000)]
+        return np.array(points, dtype=float).reshape(-1, 2)
+
+
+coverage_analyzer = CoverageAnalyzer(cache_size=CACHE_SIZE)
@@ -0,0 +1,287 @@
+"""
+Dispatch Service - Team recommendations and batch assignment of pending alerts
+
+Every (alert, available team) pair gets a cost in "minutes":
+
+    cost = (eta + mismatch penalty + load penalty) * priority weight
+
+ETA is the road-network travel time from the team's live position (its
+base when the position is unknown) to the alert when a road graph is built
+(app.services.routing), the great-circle distance at an average speed
+otherwise or for points off the network. The batch is then
+assigned with the Hungarian algorithm so that the total cost is minimal and
+no team gets two alerts. Every alert also has a private "stay pending"
+option, so when there are more alerts than suitable teams the low-priority
+ones wait.
+"""
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from typing import Dict, List, Optional, Sequence
+import time
+
+import numpy as np
+
+from app.core.config import settings
+from app.models.sos_alert import SOSAlert, AlertStatus
+from app.models.team import RescueTeam, TeamStatus
+from app.services.positions import position_store
+from app.services.routing import get_road_graph
+
+EARTH_RADIUS_KM = 6371.0
+ROAD_FACTOR = 1.3  # Road distance / great-circle distance
+MISMATCH_PENALTY_MIN = 30.0  # Cost of a team without a matching specialization
+LOAD_PENALTY_MIN = 10.0  # Cost of each active alert the team already works on
+UNASSIGNED_PENALTY_MIN = 240.0  # Cost of leaving an alert pending in this batch
+INFEASIBLE = 1e9
+
+# Team types and specializations able to handle an emergency type
+TYPE_SPECIALIZATIONS = {
+    "fire": {"fire", "firefighter"},
+    "medical": {"medical", "paramedic"},
+    "police": {"police"},
+    "water_rescue": {"water_rescue"},
+    "mountain_rescue": {"mountain_rescue"},
+    "search_rescue": {"search_rescue", "technical_rescue"},
+    "ecological": {"ecological"},
+}
+
+ACTIVE_STATUSES = [AlertStatus.ASSIGNED.value, AlertStatus.IN_PROGRESS.value]
+
+
+def type_match(alert_type: str, team_type: str, specialization: Optional[Sequence[str]]) -> float:
+    """
+    How well a team fits an emergency type
+
+    Returns:
+        float: 1.0 - team type matches, 0.8 - one of its specializations does,
+        0.6 - multi-purpose team or general alert, 0.2 - no match
+    """
+    wanted = TYPE_SPECIALIZATIONS.get(alert_type)
+    if wanted is None:
+        return 0.6
+    if team_type in wanted:
+        return 1.0
+    if specialization and wanted.intersection(specialization):
+        return 0.8
+    if team_type == "multi_purpose":
+        return 0.6
+    return 0.2
+
+
+def priority_weight(priority: Optional[int]) -> float:
+    """Cost multiplier of an alert: 3.0 for priority 1 down to 1.0 for priority 5"""
+    priority = min(max(priority or 3, 1), 5)
+    return 1 + (5 - priority) * 0.5
+
+
+def haversine_matrix(lat1: np.ndarray, lon1: np.ndarray, lat2: np.ndarray, lon2: np.ndarray) -> np.ndarray:
+    """Great-circle distances in km between every point of set 1 (rows) and set 2 (columns)"""
+    lat1, lon1, lat2, lon2 = (np.radians(values) for values in (lat1, lon1, lat2, lon2))
+    dlat = lat2[None, :] - lat1[:, None]
+    dlon = lon2[None, :] - lon1[:, None]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1)[:, None] * np.cos(lat2)[None, :] * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def solve_assignment(cost: np.ndarray) -> np.ndarray:
+    """
+    Minimum-cost assignment of rows to distinct columns (Hungarian algorithm)
+
+    Shortest augmenting path version with potentials, O(n^2 m); the inner
+    loop over columns is vectorized.
+
+    Args:
+        cost: n x m matrix with n <= m and finite values
+
+    Returns:
+        np.ndarray: Column index assigned to each row
+    """
+    n, m = cost.shape
+    if n > m:
+        raise ValueError("More rows than columns")
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    p = np.zeros(m + 1, dtype=np.int64)  # p[j] - row (1-based) matched to column j
+    way = np.zeros(m + 1, dtype=np.int64)
+
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            free = ~used[1:]
+            reduced = cost[i0 - 1] - u[i0] - v[1:]
+            better = free & (reduced < minv[1:])
+            minv[1:][better] = reduced[better]
+            way[1:][better] = j0
+            candidates = np.where(free, minv[1:], np.inf)
+            j1 = int(np.argmin(candidates)) + 1
+            delta = candidates[j1 - 1]
+            used_columns = np.flatnonzero(used)
+            u[p[used_columns]] += delta
+            v[used_columns] -= delta
+            minv[1:][free] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+
+    assignment = np.full(n, -1, dtype=np.int64)
+    matched = np.flatnonzero(p[1:])
+    assignment[p[1:][matched] - 1] = matched
+    return assignment
+
+
+def load_dispatch_candidates(db: Session, alert_ids: Optional[List[str]] = None):
+    """
+    Pending unassigned alerts, available teams with a known position and team loads
+
+    Args:
+        db: Database session
+        alert_ids: Restrict to these alerts (default - all pending ones)
+
+    Returns:
+        Tuple[List[SOSAlert], List[RescueTeam], Dict[str, int]]
+    """
+    alerts_query = db.query(SOSAlert).filter(
+        SOSAlert.status == AlertStatus.PENDING.value,
+        SOSAlert.team_id.is_(None)
+    )
+    if alert_ids is not None:
+        alerts_query = alerts_query.filter(SOSAlert.id.in_(alert_ids))
+    alerts = alerts_query.order_by(
+        SOSAlert.priority.asc(), SOSAlert.created_at.asc()
+    ).limit(settings.DISPATCH_MAX_BATCH).all()
+
+    teams = [
+        team for team in db.query(RescueTeam).filter(RescueTeam.status == TeamStatus.AVAILABLE.value).all()
+        if position_store.position_of(team) is not None or team.base_latitude is not None
+    ]
+
+    loads = dict(
+        db.query(SOSAlert.team_id, func.count(SOSAlert.id))
+        .filter(SOSAlert.status.in_(ACTIVE_STATUSES), SOSAlert.team_id.isnot(None))
+        .group_by(SOSAlert.team_id)
+        .all()
+    )
+    return alerts, teams, loads
+
+
+def team_position(team: RescueTeam):
+    position = position_store.position_of(team)
+    if position is not None:
+        return position
+    return float(team.base_latitude), float(team.base_longitude)
+
+
+def eta_matrix(alert_lat: np.ndarray, alert_lon: np.ndarray, positions: np.ndarray,
+               distance: np.ndarray) -> np.ndarray:
+    """
+    Minutes from every team to every alert (alerts x teams)
+
+    Road travel time when the road graph is available, inf when the alert is
+    unreachable within ROUTING_MAX_ETA_MINUTES; straight-line estimate
+    without a graph or for points off the network.
+    """
+    eta = distance * ROAD_FACTOR / settings.DISPATCH_SPEED_KMH * 60
+    graph = get_road_graph()
+    if graph is None or not eta.size:
+        return eta
+    road = graph.travel_times(
+        [tuple(position) for position in positions],
+        list(zip(alert_lat.tolist(), alert_lon.tolist())),
+        settings.ROUTING_MAX_ETA_MINUTES * 60
+    ).T / 60
+    return np.where(np.isnan(road), eta, road)
+
+
+def score_pairs(alerts: List[SOSAlert], teams: List[RescueTeam], loads: Dict[str, int]) -> Dict[str, np.ndarray]:
+    """
+    Cost matrix and its components for every (alert, team) pair
+
+    Returns:
+        Dict[str, np.ndarray]: "cost", "distance_km", "eta_min", "match" (alerts x teams)
+    """
+    positions = np.array([team_position(team) for team in teams], dtype=float).reshape(-1, 2)
+    alert_lat = np.array([float(alert.latitude) for alert in alerts])
+    alert_lon = np.array([float(alert.longitude) for alert in alerts])
+
+    distance = haversine_matrix(alert_lat, alert_lon, positions[:, 0], positions[:, 1])
+    eta = eta_matrix(alert_lat, alert_lon, positions, distance)
+    match = np.array(
+        [[type_match(alert.type, team.type, team.specialization) for team in teams] for alert in alerts],
+        dtype=float
+    ).reshape(len(alerts), len(teams))
+    load = np.array([loads.get(team.id, 0) for team in teams], dtype=float)
+    weight = np.array([priority_weight(alert.priority) for alert in alerts])
+
+    cost = (eta + MISMATCH_PENALTY_MIN * (1 - match) + LOAD_PENALTY_MIN * load[None, :]) * weight[:, None]
+    cost[(distance > settings.DISPATCH_MAX_DISTANCE_KM) | ~np.isfinite(eta)] = INFEASIBLE
+    return {"cost": cost, "distance_km": distance, "eta_min": eta, "match": match}
+
+
+def plan_dispatch(db: Session, alert_ids: Optional[List[str]] = None, limit: int = 3) -> dict:
+    """
+    Optimal batch assignment of pending alerts to available teams, plus ranked alternatives
+
+    Args:
+        db: Database session
+        alert_ids: Alerts to plan (default - all pending unassigned alerts)
+        limit: Ranked recommendations per alert
+
+    Returns:
+        dict: {"assignments": [...], "unassigned": [alert_id, ...], "solve_ms": float}
+    """
+    started = time.perf_counter()
+    alerts, teams, loads = load_dispatch_candidates(db, alert_ids)
+    if not alerts:
+        return {"assignments": [], "unassigned": [], "solve_ms": 0.0}
+
+    pairs = score_pairs(alerts, teams, loads)
+    cost = pairs["cost"]
+
+    # One "stay pending" column per alert keeps the problem feasible
+    weight = np.array([priority_weight(alert.priority) for alert in alerts])
+    pending = np.full((len(alerts), len(alerts)), INFEASIBLE)
+    np.fill_diagonal(pending, UNASSIGNED_PENALTY_MIN * weight)
+    assignment = solve_assignment(np.hstack([cost, pending]))
+
+    def option(i: int, j: int) -> dict:
+        team = teams[j]
+        return {
+            "team_id": team.id,
+            "team_name": team.name,
+            "team_type": team.type,
+            "distance_km": round(float(pairs["distance_km"][i, j]), 2),
+            "eta_minutes": round(float(pairs["eta_min"][i, j]), 1),
+            "type_match": round(float(pairs["match"][i, j]), 2),
+            "active_alerts": loads.get(team.id, 0),
+            "cost": round(float(cost[i, j]), 2),
+        }
+
+    ranked = np.argsort(cost, axis=1)[:, :limit] if teams else np.empty((len(alerts), 0), dtype=np.int64)
+    assignments, unassigned = [], []
+    for i, alert in enumerate(alerts):
+        j = int(assignment[i])
+        recommended = option(i, j) if j < len(teams) else None
+        if recommended is None:
+            unassigned.append(alert.id)
+        assignments.append({
+            "alert_id": alert.id,
+            "type": alert.type,
+            "priority": alert.priority,
+            "recommended": recommended,
+            "alternatives": [option(i, int(k)) for k in ranked[i] if cost[i, k] < INFEASIBLE],
+        })
+
+    return {
+        "assignments": assignments,
+        "unassigned": unassigned,
+        "solve_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
@@ -0,0 +1,332 @@
+"""
+Forecasting Service - Hour-of-week alert profiles and short-term forecasts for staffing
+
+Training never scans raw alerts beyond the last few days. Complete local days
+are counted once into the alert_rollups table (hourly counts per emergency
+type and district). Every refresh re-counts only the newest days
+(FORECAST_REROLL_DAYS, to pick up late edits) and copies those rollup rows
+into an in-memory series x day x hour array covering FORECAST_HISTORY_DAYS.
+
+The model is multiplicative exponential smoothing, fitted for all series at
+once with a few array reductions:
+
+    expected(hour) = level / 24 * profile[hour of week]
+
+- level: exponentially weighted mean of daily counts (half-life
+  FORECAST_LEVEL_HALFLIFE_DAYS)
+- profile: exponentially weighted mean count of each of the 168
+  hour-of-week slots (half-life FORECAST_SEASON_HALFLIFE_DAYS), normalised
+  to mean 1 and shrunk towards the all-series profile for sparse series
+
+Both are weighted sums, so series add up: the statistics of a type or
+district are the sums of its series. Counts are treated as Poisson for the
+prediction intervals.
+"""
+from collections import Counter
+from datetime import date, datetime, time as day_start, timedelta
+from pathlib import Path
+from sqlalchemy import func, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from typing import Dict, Iterable, List, Optional, Tuple
+import json
+import time
+
+import numpy as np
+
+from app.core.config import settings
+from app.models.alert_rollup import AlertRollup
+from app.models.sos_alert import SOSAlert
+
+HOURS_PER_WEEK = 168
+ROLLUP_CHUNK_DAYS = 31  # Raw alerts read per query when (re)building rollups
+SHRINKAGE_ALERTS = 50.0  # Weight (in alerts) of the all-series profile in a series profile
+INTERVAL = 0.9  # Central prediction interval
+DEFAULT_DISTRICT = "all"
+OUTSIDE_DISTRICT = "other"
+
+
+def local_now() -> datetime:
+    """Current local time (naive)"""
+    return datetime.utcnow() + timedelta(hours=settings.FORECAST_UTC_OFFSET_HOURS)
+
+
+class DistrictMap:
+    """District of a point from GeoJSON polygons (one district when no file is configured)"""
+
+    def __init__(self, path: str):
+        self.districts: List[Tuple[str, List[np.ndarray], Tuple[float, float, float, float]]] = []
+        if not path or not Path(path).exists():
+            return
+        for feature in json.loads(Path(path).read_text(encoding="utf-8")).get("features", []):
+            geometry = feature.get("geometry") or {}
+            name = str((feature.get("properties") or {}).get("name") or feature.get("id") or "")[:100]
+            polygons = {"Polygon": [geometry.get("coordinates")], "MultiPolygon": geometry.get("coordinates")}
+            rings = [
+                np.array(ring, dtype=float)[:, :2]
+                for polygon in polygons.get(geometry.get("type")) or [] for ring in polygon or [] if len(ring) >= 3
+            ]
+            if name and rings:
+                points = np.vstack(rings)
+                bounds = (points[:, 0].min(), points[:, 1].min(), points[:, 0].max(), points[:, 1].max())
+                self.districts.append((name, rings, bounds))
+
+    @staticmethod
+    def _inside(lon: np.ndarray, lat: np.ndarray, rings: List[np.ndarray]) -> np.ndarray:
+        """Even-odd rule over all rings (holes included)"""
+        inside = np.zeros(len(lon), dtype=bool)
+        for ring in rings:
+            x1, y1 = ring[:, 0], ring[:, 1]
+            x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+            for ax, ay, bx, by in zip(x1, y1, x2, y2):
+                if ay == by:
+                    continue
+                crosses = (ay > lat) != (by > lat)
+                inside ^= crosses & (lon < ax + (lat - ay) * (bx - ax) / (by - ay))
+        return inside
+
+    def assign(self, latitudes: np.ndarray, longitudes: np.ndarray) -> List[str]:
+        if not self.districts:
+            return [DEFAULT_DISTRICT] * len(latitudes)
+        names = np.full(len(latitudes), OUTSIDE_DISTRICT, dtype=object)
+        pending = np.ones(len(latitudes), dtype=bool)
+        for name, rings, (west, south, east, north) in self.districts:
+            candidates = np.flatnonzero(
+                pending & (longitudes >= west) & (longitudes <= east) & (latitudes >= south) & (latitudes <= north)
+            )
+            if len(candidates):
+                hits = candidates[self._inside(longitudes[candidates], latitudes[candidates], rings)]
+                names[hits] = name
+                pending[hits] = False
+        return names.tolist()
+
+
+# Rollups
+
+def rollup_days(db: Session, first: date, last: date, districts: DistrictMap) -> int:
+    """
+    Recount the rollup rows of local days first..last (inclusive) from sos_alerts
+
+    Returns:
+        int: Number of alerts counted
+    """
+    offset = timedelta(hours=settings.FORECAST_UTC_OFFSET_HOURS)
+    start = datetime.combine(first, day_start()) - offset
+    end = datetime.combine(last + timedelta(days=1), day_start()) - offset
+    alerts = db.query(SOSAlert.created_at, SOSAlert.type, SOSAlert.latitude, SOSAlert.longitude).filter(
+        SOSAlert.created_at >= start, SOSAlert.created_at < end
+    ).all()
+    names = districts.assign(
+        np.array([float(alert.latitude or 0) for alert in alerts]),
+        np.array([float(alert.longitude or 0) for alert in alerts]),
+    )
+    counts = Counter()
+    for (created_at, alert_type, _, _), district in zip(alerts, names):
+        local = created_at + offset
+        counts[(local.date(), local.hour, alert_type or "general", district)] += 1
+
+    try:
+        db.query(AlertRollup).filter(AlertRollup.day >= first, AlertRollup.day <= last).delete(
+            synchronize_session=False
+        )
+        if counts:
+            db.execute(insert(AlertRollup), [
+                {"day": day, "hour": hour, "type": alert_type, "district": district, "count": count}
+                for (day, hour, alert_type, district), count in counts.items()
+            ])
+        db.commit()
+    except IntegrityError:
+        db.rollback()  # Another worker rolled up the same days
+    return len(alerts)
+
+
+def refresh_rollups(db: Session, districts: DistrictMap, rebuild: bool = False) -> Tuple[date, date]:
+    """
+    Roll up complete local days that are missing, plus the last FORECAST_REROLL_DAYS
+
+    Args:
+        db: Database session
+        districts: District lookup
+        rebuild: Recount the whole history (after changing the districts)
+
+    Returns:
+        Tuple[date, date]: First and last day recounted (first > last - nothing to do)
+    """
+    last = local_now().date() - timedelta(days=1)
+    history_start = last - timedelta(days=settings.FORECAST_HISTORY_DAYS - 1)
+    latest = None if rebuild else db.query(func.max(AlertRollup.day)).scalar()
+    if latest is None:
+        if rebuild:
+            db.query(AlertRollup).delete(synchronize_session=False)
+            db.commit()
+        first = history_start
+    else:
+        first = max(history_start, min(latest + timedelta(days=1),
+                                       last - timedelta(days=settings.FORECAST_REROLL_DAYS - 1)))
+    chunk_start = first
+    while chunk_start <= last:
+        chunk_end = min(last, chunk_start + timedelta(days=ROLLUP_CHUNK_DAYS - 1))
+        rollup_days(db, chunk_start, chunk_end, districts)
+        chunk_start = chunk_end + timedelta(days=1)
+    return first, last
+
+
+# Model
+
+def poisson_interval(expected: np.ndarray, coverage: float = INTERVAL) -> Tuple[np.ndarray, np.ndarray]:
+    """Central Poisson interval [low, high] of every expected count"""
+    expected = np.maximum(np.asarray(expected, dtype=float), 1e-9)
+    k = np.arange(int(expected.max() + 10 * np.sqrt(expected.max()) + 10) + 1)
+    log_factorial = np.concatenate([[0.0], np.cumsum(np.log(k[1:]))])
+    cdf = np.cumsum(np.exp(k * np.log(expected)[..., None] - expected[..., None] - log_factorial), axis=-1)
+    tail = (1 - coverage) / 2
+    return np.argmax(cdf >= tail, axis=-1), np.argmax(cdf >= 1 - tail, axis=-1)
+
+
+class AlertForecaster:
+    """Rolling rollup window and smoothing statistics of every (type, district) series"""
+
+    def __init__(self):
+        self.districts = DistrictMap(settings.FORECAST_DISTRICTS_PATH)
+        self.series: Dict[Tuple[str, str], int] = {}
+        self.counts = np.zeros((0, settings.FORECAST_HISTORY_DAYS, 24))  # series x day x hour
+        self.trained_through: Optional[date] = None  # Day of counts[:, -1]
+        self.refreshed_at: Optional[float] = None
+        self.level = np.zeros(0)  # Smoothed alerts per day
+        self.slot_rates = np.zeros((0, HOURS_PER_WEEK))  # Smoothed alerts per hour-of-week slot
+
+    def ensure_fresh(self, db: Session):
+        if self.refreshed_at is None or time.monotonic() - self.refreshed_at > settings.FORECAST_REFRESH_MINUTES * 60:
+            self.refresh(db)
+
+    def refresh(self, db: Session):
+        """Update rollups, load the changed days and refit"""
+        first, last = refresh_rollups(db, self.districts)
+        days = self.counts.shape[1]
+        if self.trained_through is not None:
+            # Slide the window, keeping the days already loaded
+            shift = (last - self.trained_through).days
+            if 0 < shift < days:
+                self.counts = np.concatenate([self.counts[:, shift:], np.zeros((len(self.series), shift, 24))], axis=1)
+            elif shift != 0:
+                self.trained_through = None
+        if self.trained_through is None:
+            self.counts[:] = 0
+            first = last - timedelta(days=days - 1)
+        else:
+            first = min(first, self.trained_through + timedelta(days=1))
+        self.trained_through = last
+
+        if first <= last:
+            self.counts[:, days - 1 - (last - first).days:] = 0
+            rows = db.query(AlertRollup.day, AlertRollup.hour, AlertRollup.type, AlertRollup.district,
+                            AlertRollup.count).filter(AlertRollup.day >= first, AlertRollup.day <= last).all()
+            for day, hour, alert_type, district, count in rows:
+                index = self._series_index(alert_type, district)  # May grow self.counts
+                self.counts[index, days - 1 - (last - day).days, hour] = count
+        self._fit()
+        self.refreshed_at = time.monotonic()
+
+    def _series_index(self, alert_type: str, district: str) -> int:
+        key = (alert_type, district)
+        if key not in self.series:
+            self.series[key] = len(self.series)
+            self.counts = np.concatenate([self.counts, np.zeros((1,) + self.counts.shape[1:])])
+        return self.series[key]
+
+    def _fit(self):
+        days = self.counts.shape[1]
+        age = np.arange(days)[::-1]  # 0 - most recent day
+        level_weights = 0.5 ** (age / settings.FORECAST_LEVEL_HALFLIFE_DAYS)
+        season_weights = 0.5 ** (age / settings.FORECAST_SEASON_HALFLIFE_DAYS)
+
+        self.level = self.counts.sum(axis=2) @ level_weights / level_weights.sum()
+        weekdays = (self.trained_through.weekday() - age) % 7
+        slot_sums = np.zeros((len(self.series), HOURS_PER_WEEK))
+        slot_weights = np.zeros(HOURS_PER_WEEK)
+        for weekday in range(7):
+            mask = weekdays == weekday
+            slot_sums[:, weekday * 24:(weekday + 1) * 24] = np.einsum(
+                "sdh,d->sh", self.counts[:, mask], season_weights[mask]
+            )
+            slot_weights[weekday * 24:(weekday + 1) * 24] = season_weights[mask].sum()
+        self.slot_rates = slot_sums / np.maximum(slot_weights, 1e-12)
+
+    def _profiles(self, slot_rates: np.ndarray) -> np.ndarray:
+        """Hour-of-week multipliers (mean 1) shrunk towards the all-series profile"""
+        def normalise(rates: np.ndarray) -> np.ndarray:
+            means = rates.mean(axis=-1, keepdims=True)
+            return np.divide(rates, means, out=np.ones_like(rates), where=means > 0)
+
+        pooled = normalise(self.slot_rates.sum(axis=0))
+        # Effective number of alerts behind each profile
+        evidence = slot_rates.sum(axis=1, keepdims=True) * settings.FORECAST_SEASON_HALFLIFE_DAYS / 7
+        return (evidence * normalise(slot_rates) + SHRINKAGE_ALERTS * pooled) / (evidence + SHRINKAGE_ALERTS)
+
+    def forecast(self, by: str = "type", types: Optional[Iterable[str]] = None,
+                 districts: Optional[Iterable[str]] = None, hours: int = 24) -> List[dict]:
+        """
+        Expected alerts per local hour for the next `hours`, plus the weekly profile
+
+        Args:
+            by: Grouping - "type", "district", "type_district" or "total"
+            types: Only these emergency types
+            districts: Only these districts
+            hours: Forecast horizon starting at the current hour
+
+        Returns:
+            List[dict]: One entry per group, busiest first
+        """
+        types = set(types) if types else None
+        districts = set(districts) if districts else None
+        groups: Dict[Tuple[Optional[str], Optional[str]], List[int]] = {}
+        for (alert_type, district), index in self.series.items():
+            if (types and alert_type not in types) or (districts and district not in districts):
+                continue
+            key = (
+                alert_type if by in ("type", "type_district") else None,
+                district if by in ("district", "type_district") else None,
+            )
+            groups.setdefault(key, []).append(index)
+        if not groups:
+            return []
+
+        keys = list(groups)
+        members = np.zeros((len(keys), len(self.series)))
+        for row, key in enumerate(keys):
+            members[row, groups[key]] = 1
+        level = members @ self.level
+        profiles = self._profiles(members @ self.slot_rates)
+
+        start = local_now().replace(minute=0, second=0, microsecond=0)
+        slots = np.array([
+            (start + timedelta(hours=step)).weekday() * 24 + (start + timedelta(hours=step)).hour
+            for step in range(hours)
+        ])
+        hourly = level[:, None] / 24
+        expected = hourly * profiles[:, slots]
+        low, high = poisson_interval(expected)
+
+        result = []
+        for row, (alert_type, district) in enumerate(keys):
+            result.append({
+                "type": alert_type,
+                "district": district,
+                "daily_level": round(float(level[row]), 2),
+                "forecast": [
+                    {
+                        "hour": (start + timedelta(hours=step)).isoformat(),
+                        "expected": round(float(expected[row, step]), 3),
+                        "low": int(low[row, step]),
+                        "high": int(high[row, step]),
+                    }
+                    for step in range(hours)
+                ],
+                # Expected alerts per hour of the week, Monday 00:00 first
+                "profile": np.round(hourly[row] * profiles[row], 3).tolist(),
+            })
+        result.sort(key=lambda item: -item["daily_level"])
+        return result
+
+
+alert_forecaster = AlertForecaster()
@@ -0,0 +1,310 @@
+"""
+Geocoder Service - Offline forward and reverse geocoding from a local address index
+
+The index is built once from an address extract (see build_geocoder_index.py)
+into a directory of flat arrays that are memory-mapped on startup, so
+loading is instant and only the pages a lookup touches are read:
+
+    meta.json         count, projection latitude
+    coords.npy        (n, 2) latitude, longitude in k-d tree order
+    xy.npy            (n, 2) projected coordinates of the tree
+    text.bin          UTF-8 display addresses, text_offsets.npy - (n + 1) offsets
+    gram_keys.npy     sorted trigram codes, gram_offsets.npy - (k + 1) offsets
+    gram_postings.npy address ids of each trigram, sorted
+    gram_counts.npy   number of distinct trigrams of each address
+
+Forward lookup: the address is normalized (case, ё, street type abbreviations,
+house/building numbers) and split into tokens; every token contributes its
+space-padded trigrams, so word order and small typos barely matter. Candidates
+come from the postings of the rarest query trigrams and are ranked by the Dice
+coefficient of trigram sets. A last query word is not padded at its end, so
+a prefix ("тверс") matches like a partial word.
+
+Reverse lookup: nearest neighbour in an implicit k-d tree (addresses are
+stored in tree order: the split point of the range [lo, hi) is its middle,
+ranges of up to LEAF_SIZE points are scanned) over an equirectangular
+projection around the dataset.
+"""
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+import json
+import math
+import re
+
+import numpy as np
+
+from app.core.config import settings
+from app.utils.helpers import calculate_distance
+
+LEAF_SIZE = 16
+MAX_CANDIDATE_GRAMS = 12  # Rarest query trigrams used to collect candidates
+MAX_CANDIDATE_POSTINGS = 10000  # Trigrams in more addresses only rank, they don't select
+CANDIDATES = 64
+
+# Street and settlement types -> canonical token
+ABBREVIATIONS = {
+    "улица": "ул", "ул": "ул",
+    "проспект": "пр", "просп": "пр", "пр-т": "пр", "пр": "пр",
+    "переулок": "пер", "пер": "пер",
+    "площадь": "пл", "пл": "пл",
+    "бульвар": "б-р", "бул": "б-р", "б-р": "б-р",
+    "шоссе": "ш", "ш": "ш",
+    "набережная": "наб", "наб": "наб",
+    "проезд": "пр-д", "пр-д": "пр-д",
+    "тупик": "туп", "туп": "туп",
+    "микрорайон": "мкр", "мкр": "мкр",
+    "поселок": "п", "пос": "п", "село": "с",
+    "город": "", "г": "", "дом": "", "д": "", "россия": "", "рф": "",
+    "область": "обл", "обл": "обл", "район": "р-н", "р-н": "р-н",
+}
+_BUILDING = re.compile(r"(\d+)\s*(?:корпус|корп|кор|к)\s*(\d+)")
+_STRUCTURE = re.compile(r"(\d+)\s*(?:строение|стр|с)\s*(\d+)")
+_LETTER = re.compile(r"(\d+)\s+([а-я])(?=\s|$)")
+_SEPARATORS = re.compile(r"[^\w\-/]+")
+
+
+def normalize(address: str) -> List[str]:
+    """Lower-case tokens of an address with canonical types and house numbers"""
+    text = address.lower().replace("ё", "е")
+    text = _SEPARATORS.sub(" ", text)
+    text = _BUILDING.sub(r"\1к\2", text)
+    text = _STRUCTURE.sub(r"\1с\2", text)
+    text = _LETTER.sub(r"\1\2", text)
+    tokens = []
+    for token in text.split():
+        token = ABBREVIATIONS.get(token, token)
+        if token:
+            tokens.append(token)
+    return tokens
+
+
+def _gram_code(gram: str) -> int:
+    return (ord(gram[0]) << 42) | (ord(gram[1]) << 21) | ord(gram[2])
+
+
+def trigrams(tokens: List[str], prefix: bool = False) -> List[int]:
+    """
+    Distinct trigram codes of the tokens (padded with spaces)
+
+    Args:
+        tokens: Normalized tokens
+        prefix: The last token may be incomplete: no padding at its end
+    """
+    codes = set()
+    for i, token in enumerate(tokens):
+        padded = " " + token + ("" if prefix and i == len(tokens) - 1 else " ")
+        if len(padded) < 3:
+            padded += " "
+        for j in range(len(padded) - 2):
+            codes.add(_gram_code(padded[j:j + 3]))
+    return sorted(codes)
+
+
+def _kd_order(xy: np.ndarray) -> np.ndarray:
+    """Permutation that lays the points out as an implicit k-d tree"""
+    order = np.arange(len(xy))
+    stack = [(0, len(xy), 0)]
+    while stack:
+        lo, hi, depth = stack.pop()
+        if hi - lo <= LEAF_SIZE:
+            continue
+        mid = (lo + hi) // 2
+        axis = depth % 2
+        part = np.argpartition(xy[order[lo:hi], axis], mid - lo)
+        order[lo:hi] = order[lo:hi][part]
+        stack.append((lo, mid, depth + 1))
+        stack.append((mid + 1, hi, depth + 1))
+    return order
+
+
+def build_index(records: Iterable[Tuple[str, float, float]], path: str) -> int:
+    """
+    Write the index files of an address dataset
+
+    Args:
+        records: (display address, latitude, longitude)
+        path: Index directory (created if missing)
+
+    Returns:
+        int: Number of indexed addresses
+    """
+    addresses, coords = [], []
+    for address, latitude, longitude in records:
+        if address and -90 <= latitude <= 90 and -180 <= longitude <= 180:
+            addresses.append(address.strip())
+            coords.append((latitude, longitude))
+    if not addresses:
+        raise ValueError("No addresses to index")
+
+    coords = np.array(coords, dtype=np.float64)
+    lat0 = float(coords[:, 0].mean())
+    xy = np.column_stack([coords[:, 1] * math.cos(math.radians(lat0)), coords[:, 0]])
+    order = _kd_order(xy)
+    coords, xy = coords[order], xy[order]
+    addresses = [addresses[i] for i in order]
+
+    encoded = [address.encode("utf-8") for address in addresses]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(data) for data in encoded])
+
+    grams_per_address = [trigrams(normalize(address)) for address in addresses]
+    counts = np.array([len(grams) for grams in grams_per_address], dtype=np.int32)
+    gram_codes = np.fromiter(
+        (code for grams in grams_per_address for code in grams), dtype=np.uint64, count=int(counts.sum())
+    )
+    gram_ids = np.repeat(np.arange(len(addresses), dtype=np.int32), counts)
+    by_gram = np.lexsort((gram_ids, gram_codes))
+    gram_codes, gram_ids = gram_codes[by_gram], gram_ids[by_gram]
+    keys, starts = np.unique(gram_codes, return_index=True)
+    gram_offsets = np.append(starts, len(gram_codes)).astype(np.int64)
+
+    directory = Path(path)
+    directory.mkdir(parents=True, exist_ok=True)
+    np.save(directory / "coords.npy", coords)
+    np.save(directory / "xy.npy", xy)
+    (directory / "text.bin").write_bytes(b"".join(encoded))
+    np.save(directory / "text_offsets.npy", offsets)
+    np.save(directory / "gram_keys.npy", keys)
+    np.save(directory / "gram_offsets.npy", gram_offsets)
+    np.save(directory / "gram_postings.npy", gram_ids)
+    np.save(directory / "gram_counts.npy", counts)
+    (directory / "meta.json").write_text(json.dumps({"count": len(addresses), "lat0": lat0}))
+    return len(addresses)
+
+
+class Geocoder:
+    """Memory-mapped address index"""
+
+    def __init__(self, path: str):
+        directory = Path(path)
+        meta = json.loads((directory / "meta.json").read_text())
+        self.count = meta["count"]
+        self.lon_scale = math.cos(math.radians(meta["lat0"]))
+        # Plain ndarray views of the maps: memmap slicing has a per-call overhead
+        load = lambda name: np.load(directory / name, mmap_mode="r").view(np.ndarray)
+        self.coords = load("coords.npy")
+        self.xy = load("xy.npy")
+        self.text = np.memmap(directory / "text.bin", dtype=np.uint8, mode="r").view(np.ndarray)
+        self.text_offsets = load("text_offsets.npy")
+        self.gram_keys = load("gram_keys.npy")
+        self.gram_offsets = load("gram_offsets.npy")
+        self.gram_postings = load("gram_postings.npy")
+        self.gram_counts = load("gram_counts.npy")
+
+    def address(self, i: int) -> str:
+        return bytes(self.text[self.text_offsets[i]:self.text_offsets[i + 1]]).decode("utf-8")
+
+    def _result(self, i: int) -> dict:
+        return {
+            "address": self.address(i),
+            "latitude": float(self.coords[i, 0]),
+            "longitude": float(self.coords[i, 1]),
+        }
+
+    def _postings(self, codes: List[int]) -> List[np.ndarray]:
+        """Address ids of each trigram (empty for unknown ones)"""
+        codes = np.array(codes, dtype=np.uint64)
+        k = np.searchsorted(self.gram_keys, codes)
+        found = k < len(self.gram_keys)
+        found[found] = self.gram_keys[k[found]] == codes[found]
+        empty = self.gram_postings[0:0]
+        return [
+            self.gram_postings[self.gram_offsets[i]:self.gram_offsets[i + 1]] if hit else empty
+            for i, hit in zip(k.tolist(), found.tolist())
+        ]
+
+    # Forward
+
+    def geocode(self, query: str, limit: int = 5) -> List[dict]:
+        """
+        Best matching addresses
+
+        Returns:
+            List[dict]: {"address", "latitude", "longitude", "confidence"} sorted
+            by confidence (trigram Dice coefficient, 1.0 - same normalized address)
+        """
+        tokens = normalize(query)
+        # A word being typed matches as a prefix, house numbers only exactly
+        prefix = bool(tokens) and not query[-1].isspace() and not tokens[-1][0].isdigit()
+        codes = trigrams(tokens, prefix=prefix)
+        if not codes:
+            return []
+        postings = self._postings(codes)
+        by_rarity = sorted((p for p in postings if len(p)), key=len)
+        if not by_rarity:
+            return []
+
+        selecting = [p for p in by_rarity[:MAX_CANDIDATE_GRAMS] if len(p) <= MAX_CANDIDATE_POSTINGS]
+        if not selecting:
+            selecting = [by_rarity[0][:MAX_CANDIDATE_POSTINGS]]
+        ids, hits = np.unique(np.concatenate(selecting), return_counts=True)
+        if len(ids) > CANDIDATES:
+            top = np.argpartition(-hits, CANDIDATES)[:CANDIDATES]
+            ids = ids[top]
+
+        # Exact shared trigram counts: candidate membership in every query trigram's postings
+        shared = np.zeros(len(ids), dtype=np.int64)
+        for posting in postings:
+            if len(posting):
+                positions = np.searchsorted(posting, ids)
+                positions[positions == len(posting)] = 0
+                shared += posting[positions] == ids
+        dice = 2 * shared / (len(codes) + self.gram_counts[ids])
+        ranked = np.argsort(-dice, kind="stable")[:limit]
+        return [
+            {**self._result(int(ids[j])), "confidence": round(float(dice[j]), 3)}
+            for j in ranked if shared[j]
+        ]
+
+    # Reverse
+
+    def nearest(self, latitude: float, longitude: float) -> Optional[dict]:
+        """
+        Closest address point
+
+        Returns:
+            Optional[dict]: {"address", "latitude", "longitude", "distance_m"}
+        """
+        if not self.count:
+            return None
+        query = (longitude * self.lon_scale, latitude)
+        best = [math.inf, -1]
+        self._search(query, 0, self.count, 0, best)
+        result = self._result(best[1])
+        result["distance_m"] = round(
+            calculate_distance(latitude, longitude, result["latitude"], result["longitude"]) * 1000, 1
+        )
+        return result
+
+    def _search(self, query: Tuple[float, float], lo: int, hi: int, depth: int, best: list):
+        if hi - lo <= LEAF_SIZE:
+            if hi > lo:
+                leaf = self.xy[lo:hi]
+                distances = (leaf[:, 0] - query[0]) ** 2 + (leaf[:, 1] - query[1]) ** 2
+                i = int(np.argmin(distances))
+                if distances[i] < best[0]:
+                    best[0], best[1] = float(distances[i]), lo + i
+            return
+        mid = (lo + hi) // 2
+        x, y = self.xy[mid]
+        distance = (x - query[0]) ** 2 + (y - query[1]) ** 2
+        if distance < best[0]:
+            best[0], best[1] = float(distance), mid
+        diff = query[depth % 2] - (x, y)[depth % 2]
+        near, far = ((lo, mid), (mid + 1, hi)) if diff < 0 else ((mid + 1, hi), (lo, mid))
+        self._search(query, near[0], near[1], depth + 1, best)
+        if diff * diff < best[0]:
+            self._search(query, far[0], far[1], depth + 1, best)
+
+
+_geocoders: Dict[str, Geocoder] = {}
+
+
+def get_geocoder() -> Optional[Geocoder]:
+    """Index at GEOCODER_INDEX_PATH, mapped on first use; None if it has not been built"""
+    path = settings.GEOCODER_INDEX_PATH
+    if path not in _geocoders:
+        if not (Path(path) / "meta.json").exists():
+            return None
+        _geocoders[path] = Geocoder(path)
+    return _geocoders[path]
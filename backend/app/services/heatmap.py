@@ -0,0 +1,273 @@
+"""
+Heatmap Service - Alert counts binned into quadkey cells for map tiles
+
+Every alert is counted in its Web Mercator cell at BASE_ZOOM, identified by
+its quadkey as an integer (Morton code: interleaved x/y bits). All cells of
+a tile z/x/y then form one contiguous range of codes, so a tile is a binary
+search over counter rows sorted by code followed by a bincount into a
+TILE_RESOLUTION x TILE_RESOLUTION grid.
+
+Counter rows are (code, day, type, status, count). Writes go to a small
+delta map that is folded into the sorted arrays when it grows, and bump a
+version that keys the LRU cache of encoded tiles.
+
+Counters live in process memory, loaded from the database on first use.
+With the shared (Redis) cache backend they are rebuilt when the "alerts"
+cache version moved past the one they were loaded at, so a worker never
+serves tiles missing the others' writes under the new ETag;
+HEATMAP_REBUILD_SECONDS additionally rebuilds them periodically.
+"""
+from collections import OrderedDict
+from datetime import date, datetime
+from sqlalchemy.orm import Session
+from typing import Dict, Iterable, List, Optional, Tuple
+import math
+import time
+
+import numpy as np
+import orjson
+
+from app.core.config import settings
+from app.models.sos_alert import SOSAlert
+
+BASE_ZOOM = 24
+RESOLUTION_BITS = 6
+TILE_RESOLUTION = 1 << RESOLUTION_BITS  # 64 x 64 bins per tile
+MAX_ZOOM = BASE_ZOOM - RESOLUTION_BITS
+MAX_LATITUDE = 85.05112878
+DELTA_COMPACT_THRESHOLD = 512
+
+
+def _spread_bits(values: np.ndarray) -> np.ndarray:
+    """Insert a zero bit between the bits of 32-bit integers"""
+    values = values.astype(np.uint64) & np.uint64(0xFFFFFFFF)
+    for shift, mask in ((16, 0x0000FFFF0000FFFF), (8, 0x00FF00FF00FF00FF), (4, 0x0F0F0F0F0F0F0F0F),
+                        (2, 0x3333333333333333), (1, 0x5555555555555555)):
+        values = (values | (values << np.uint64(shift))) & np.uint64(mask)
+    return values
+
+
+def _compact_bits(values: np.ndarray) -> np.ndarray:
+    """Inverse of _spread_bits: keep every other bit"""
+    values = values.astype(np.uint64) & np.uint64(0x5555555555555555)
+    for shift, mask in ((1, 0x3333333333333333), (2, 0x0F0F0F0F0F0F0F0F), (4, 0x00FF00FF00FF00FF),
+                        (8, 0x0000FFFF0000FFFF), (16, 0x00000000FFFFFFFF)):
+        values = (values | (values >> np.uint64(shift))) & np.uint64(mask)
+    return values
+
+
+def quadkey_codes(latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+    """Integer quadkeys of the BASE_ZOOM cells containing the points"""
+    n = 1 << BASE_ZOOM
+    lat = np.radians(np.clip(latitudes.astype(float), -MAX_LATITUDE, MAX_LATITUDE))
+    x = np.clip(((longitudes.astype(float) + 180) / 360 * n).astype(np.int64), 0, n - 1)
+    y = np.clip(((1 - np.log(np.tan(lat) + 1 / np.cos(lat)) / math.pi) / 2 * n).astype(np.int64), 0, n - 1)
+    return _spread_bits(x) | (_spread_bits(y) << np.uint64(1))
+
+
+def tile_code_range(z: int, x: int, y: int) -> Tuple[int, int]:
+    """[first, last) BASE_ZOOM codes inside tile z/x/y"""
+    prefix = int(_spread_bits(np.array([x]))[0] | (_spread_bits(np.array([y]))[0] << np.uint64(1)))
+    shift = 2 * (BASE_ZOOM - z)
+    return prefix << shift, (prefix + 1) << shift
+
+
+class HeatmapIndex:
+    """Per-cell alert counters by day, type and status"""
+
+    def __init__(self, cache_size: int):
+        self.codes = np.empty(0, dtype=np.uint64)
+        self.days = np.empty(0, dtype=np.int32)
+        self.types = np.empty(0, dtype=np.int16)
+        self.statuses = np.empty(0, dtype=np.int16)
+        self.counts = np.empty(0, dtype=np.int32)
+        self._delta: Dict[Tuple[int, int, int, int], int] = {}
+        self._vocabulary: Dict[str, int] = {}
+        self.version = 0
+        self.loaded_at: Optional[float] = None
+        self.synced_version: Optional[str] = None  # "alerts" cache version loaded
+        self._cache: "OrderedDict[tuple, bytes]" = OrderedDict()
+        self._cache_size = cache_size
+
+    def _term(self, value: Optional[str]) -> int:
+        value = value or ""
+        if value not in self._vocabulary:
+            self._vocabulary[value] = len(self._vocabulary)
+        return self._vocabulary[value]
+
+    # Writes
+
+    def add(self, latitude: float, longitude: float, created_at: datetime, alert_type: str,
+            status: str, delta: int = 1):
+        """Count an alert (delta=-1 to uncount it)"""
+        if self.loaded_at is None:
+            return  # Loaded from the database later, with this alert
+        code = int(quadkey_codes(np.array([latitude]), np.array([longitude]))[0])
+        key = (code, created_at.toordinal(), self._term(alert_type), self._term(status))
+        self._delta[key] = self._delta.get(key, 0) + delta
+        self.version += 1
+        if len(self._delta) >= DELTA_COMPACT_THRESHOLD:
+            self._compact()
+
+    def move(self, latitude: float, longitude: float, created_at: datetime, alert_type: str,
+             old_status: str, new_status: str):
+        """Recount an alert whose status changed"""
+        if old_status != new_status:
+            self.add(latitude, longitude, created_at, alert_type, old_status, -1)
+            self.add(latitude, longitude, created_at, alert_type, new_status, 1)
+
+    def _compact(self):
+        """Fold the delta map into the sorted arrays, summing equal rows"""
+        if self._delta:
+            keys = np.array(list(self._delta), dtype=np.int64).reshape(-1, 4)
+            self._set_rows(
+                np.concatenate([self.codes, keys[:, 0].astype(np.uint64)]),
+                np.concatenate([self.days, keys[:, 1].astype(np.int32)]),
+                np.concatenate([self.types, keys[:, 2].astype(np.int16)]),
+                np.concatenate([self.statuses, keys[:, 3].astype(np.int16)]),
+                np.concatenate([self.counts, np.fromiter(self._delta.values(), dtype=np.int32)]),
+            )
+            self._delta = {}
+
+    def _set_rows(self, codes, days, types, statuses, counts):
+        order = np.lexsort((statuses, types, days, codes))
+        codes, days, types, statuses, counts = (
+            column[order] for column in (codes, days, types, statuses, counts)
+        )
+        if len(codes):
+            starts = np.flatnonzero(np.concatenate([[True], (
+                (codes[1:] != codes[:-1]) | (days[1:] != days[:-1])
+                | (types[1:] != types[:-1]) | (statuses[1:] != statuses[:-1])
+            )]))
+            counts = np.add.reduceat(counts, starts)
+            codes, days, types, statuses = (column[starts] for column in (codes, days, types, statuses))
+            keep = counts != 0
+            codes, days, types, statuses, counts = (
+                column[keep] for column in (codes, days, types, statuses, counts)
+            )
+        self.codes, self.days, self.types, self.statuses, self.counts = codes, days, types, statuses, counts
+
+    def load(self, db: Session):
+        """(Re)build all counters from the alerts table"""
+        latitudes, longitudes, days, types, statuses = [], [], [], [], []
+        rows = db.query(
+            SOSAlert.latitude, SOSAlert.longitude, SOSAlert.created_at, SOSAlert.type, SOSAlert.status
+        ).yield_per(10000)
+        for latitude, longitude, created_at, alert_type, status in rows:
+            if latitude is None or longitude is None or created_at is None:
+                continue
+            latitudes.append(float(latitude))
+            longitudes.append(float(longitude))
+            days.append(created_at.toordinal())
+            types.append(self._term(alert_type))
+            statuses.append(self._term(status))
+        self._set_rows(
+            quadkey_codes(np.array(latitudes, dtype=float), np.array(longitudes, dtype=float)),
+            np.array(days, dtype=np.int32),
+            np.array(types, dtype=np.int16),
+            np.array(statuses, dtype=np.int16),
+            np.ones(len(days), dtype=np.int32),
+        )
+        self._delta = {}
+        self.version += 1
+        self.loaded_at = time.monotonic()
+
+    def ensure_loaded(self, db: Session, version: Optional[str] = None):
+        """
+        Load or rebuild the counters before a read if they may be stale
+
+        Args:
+            db: Database session
+            version: Current shared "alerts" cache version (None - no shared store)
+        """
+        rebuild = settings.HEATMAP_REBUILD_SECONDS
+        if (
+            self.loaded_at is None
+            or (version is not None and version != self.synced_version)
+            or (rebuild > 0 and time.monotonic() - self.loaded_at > rebuild)
+        ):
+            self.load(db)
+        if version is not None:
+            self.synced_version = version
+
+    # Reads
+
+    def tile(self, z: int, x: int, y: int, types: Optional[Iterable[str]] = None,
+             statuses: Optional[Iterable[str]] = None, day_from: Optional[date] = None,
+             day_to: Optional[date] = None) -> bytes:
+        """
+        Encoded tile: JSON with sparse bins
+
+        `cells` is a flat [gap, count, gap, count, ...] list of non-empty bins,
+        bin = previous bin + gap (starting from 0), bin = row * resolution + column
+        with row 0 at the top of the tile. Gaps keep dense tiles small.
+        """
+        types = tuple(sorted(types)) if types else None
+        statuses = tuple(sorted(statuses)) if statuses else None
+        key = (z, x, y, types, statuses, day_from, day_to, self.version)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            return cached
+
+        grid = self._bin(z, x, y, types, statuses, day_from, day_to)
+        bins = np.flatnonzero(grid)
+        cells = np.empty(2 * len(bins), dtype=np.int64)
+        cells[0::2], cells[1::2] = np.diff(bins, prepend=0), grid[bins]
+        body = orjson.dumps({
+            "z": z, "x": x, "y": y,
+            "resolution": TILE_RESOLUTION,
+            "total": int(grid.sum()),
+            "max": int(grid.max()) if len(bins) else 0,
+            "cells": cells.tolist(),
+        })
+
+        self._cache[key] = body
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+        return body
+
+    def _bin(self, z, x, y, types, statuses, day_from, day_to) -> np.ndarray:
+        first, last = tile_code_range(z, x, y)
+        lo = np.searchsorted(self.codes, np.uint64(first), side="left")
+        hi = np.searchsorted(self.codes, np.uint64(last), side="left")
+        codes, days, type_terms, status_terms, counts = (
+            column[lo:hi] for column in (self.codes, self.days, self.types, self.statuses, self.counts)
+        )
+        if self._delta:
+            # Recent writes not folded into the sorted arrays yet
+            delta = np.array(
+                [key + (count,) for key, count in self._delta.items() if first <= key[0] < last],
+                dtype=np.int64
+            ).reshape(-1, 5)
+            codes = np.concatenate([codes, delta[:, 0].astype(np.uint64)])
+            days, type_terms, status_terms, counts = (
+                np.concatenate([column, delta[:, i]])
+                for i, column in enumerate((days, type_terms, status_terms, counts), start=1)
+            )
+
+        mask = np.ones(len(codes), dtype=bool)
+        if day_from is not None:
+            mask &= days >= day_from.toordinal()
+        if day_to is not None:
+            mask &= days <= day_to.toordinal()
+        if types is not None:
+            mask &= np.isin(type_terms, self._terms(types))
+        if statuses is not None:
+            mask &= np.isin(status_terms, self._terms(statuses))
+
+        # Morton order inside the tile -> row/column of the bin
+        local = (codes[mask] - np.uint64(first)) >> np.uint64(2 * (BASE_ZOOM - z - RESOLUTION_BITS))
+        columns = _compact_bits(local).astype(np.int64)
+        rows = _compact_bits(local >> np.uint64(1)).astype(np.int64)
+        return np.bincount(
+            rows * TILE_RESOLUTION + columns,
+            weights=counts[mask],
+            minlength=TILE_RESOLUTION * TILE_RESOLUTION
+        ).astype(np.int64)
+
+    def _terms(self, values: Iterable[str]) -> List[int]:
+        return [self._vocabulary[value] for value in values if value in self._vocabulary]
+
+
+heatmap_index = HeatmapIndex(cache_size=settings.HEATMAP_TILE_CACHE_SIZE)
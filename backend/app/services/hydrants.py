@@ -0,0 +1,296 @@
+"""
+Hydrant Service - Water source registry: bulk import and in-memory spatial grid index
+
+Hydrants are bucketed into HYDRANT_GRID_CELL_METERS cells of a local
+equirectangular projection. Radius and k-nearest queries scan rings of
+cells around the query point: after ring r every hydrant closer than
+r cells has been seen, so a k-nearest query stops as soon as it has k of
+them instead of scanning the whole radius.
+
+The index is loaded from the database on first use and then refreshed
+incrementally (rows with a newer updated_at) when the shared "hydrants"
+cache version moved past the one it was synced at, so no worker serves an
+import made by another one as stale data under the new ETag, and at least
+every HYDRANT_RELOAD_SECONDS for writes made outside the API; a changed row
+count (deleted rows) triggers a full reload.
+"""
+from datetime import datetime
+from sqlalchemy import func, insert, update
+from sqlalchemy.orm import Session
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import csv
+import io
+import json
+import math
+import time
+import uuid
+
+from app.core.config import settings
+from app.models.hydrant import Hydrant, HydrantStatus, HydrantType
+
+METERS_PER_DEGREE = 111320.0
+IMPORT_CHUNK = 1000
+FIELDS = ("type", "status", "latitude", "longitude", "address", "flow_rate")
+
+
+# Import
+
+def _clean_record(raw: dict) -> Optional[dict]:
+    """Hydrant fields of a CSV row / GeoJSON properties, None if unusable"""
+    try:
+        latitude = float(raw.get("latitude", raw.get("lat")))
+        longitude = float(raw.get("longitude", raw.get("lon")))
+    except (TypeError, ValueError):
+        return None
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return None
+    hydrant_type = (raw.get("type") or HydrantType.UNDERGROUND.value).strip().lower()
+    status = (raw.get("status") or HydrantStatus.UNKNOWN.value).strip().lower()
+    if hydrant_type not in {member.value for member in HydrantType}:
+        return None
+    if status not in {member.value for member in HydrantStatus}:
+        return None
+    try:
+        flow_rate = float(raw["flow_rate"]) if raw.get("flow_rate") not in (None, "") else None
+    except (TypeError, ValueError):
+        flow_rate = None
+    external_id = raw.get("external_id", raw.get("id"))
+    address = raw.get("address")
+    return {
+        "external_id": str(external_id).strip()[:64] if external_id not in (None, "") else None,
+        "type": hydrant_type,
+        "status": status,
+        "latitude": round(latitude, 8),
+        "longitude": round(longitude, 8),
+        "address": str(address).strip()[:500] if address else None,
+        "flow_rate": flow_rate,
+    }
+
+
+def parse_hydrants(content: bytes, filename: str = "") -> Tuple[List[dict], int]:
+    """
+    Parse a hydrant dataset
+
+    CSV: header with latitude/lat, longitude/lon and optional external_id/id,
+    type, status, address, flow_rate. GeoJSON: FeatureCollection of Point
+    features with the same properties.
+
+    Returns:
+        Tuple[List[dict], int]: Records and the number of skipped rows
+    """
+    text = content.decode("utf-8-sig")
+    if filename.lower().endswith((".geojson", ".json")) or text.lstrip().startswith("{"):
+        raws = []
+        for feature in json.loads(text).get("features", []):
+            geometry = feature.get("geometry") or {}
+            properties = dict(feature.get("properties") or {})
+            if geometry.get("type") == "Point" and len(geometry.get("coordinates") or []) >= 2:
+                properties["longitude"], properties["latitude"] = geometry["coordinates"][:2]
+            properties.setdefault("id", feature.get("id"))
+            raws.append(properties)
+    else:
+        raws = list(csv.DictReader(io.StringIO(text)))
+
+    records = [record for record in map(_clean_record, raws) if record is not None]
+    return records, len(raws) - len(records)
+
+
+def import_hydrants(db: Session, records: List[dict]) -> dict:
+    """
+    Upsert hydrants by external_id (records without one are always inserted)
+
+    Returns:
+        dict: {"created": int, "updated": int, "unchanged": int}
+    """
+    now = datetime.utcnow()
+    # The last record of an external_id wins
+    keyed = {record["external_id"]: record for record in records if record["external_id"]}
+    anonymous = [record for record in records if not record["external_id"]]
+
+    existing: Dict[str, Hydrant] = {}
+    external_ids = list(keyed)
+    for i in range(0, len(external_ids), IMPORT_CHUNK):
+        chunk = external_ids[i:i + IMPORT_CHUNK]
+        for hydrant in db.query(Hydrant).filter(Hydrant.external_id.in_(chunk)).all():
+            existing[hydrant.external_id] = hydrant
+
+    new_rows, changed_rows, unchanged = [], [], 0
+    for external_id, record in keyed.items():
+        hydrant = existing.get(external_id)
+        if hydrant is None:
+            new_rows.append(record)
+            continue
+        current = {field: getattr(hydrant, field) for field in FIELDS}
+        current["latitude"], current["longitude"] = float(hydrant.latitude), float(hydrant.longitude)
+        if all(current[field] == record[field] for field in FIELDS):
+            unchanged += 1
+        else:
+            changed_rows.append({"id": hydrant.id, **record, "updated_at": now})
+
+    new_rows = [
+        {"id": str(uuid.uuid4()), **record, "created_at": now, "updated_at": now}
+        for record in new_rows + anonymous
+    ]
+    for i in range(0, len(new_rows), IMPORT_CHUNK):
+        db.execute(insert(Hydrant), new_rows[i:i + IMPORT_CHUNK])
+    for i in range(0, len(changed_rows), IMPORT_CHUNK):
+        db.execute(update(Hydrant), changed_rows[i:i + IMPORT_CHUNK])
+    db.commit()
+    return {"created": len(new_rows), "updated": len(changed_rows), "unchanged": unchanged}
+
+
+# Index
+
+class HydrantPoint:
+    """One hydrant in the grid"""
+    __slots__ = ("id", "external_id", "type", "status", "latitude", "longitude", "address",
+                 "flow_rate", "x", "y", "cell")
+
+    def to_dict(self, distance: float) -> dict:
+        return {
+            "id": self.id,
+            "external_id": self.external_id,
+            "latitude": self.latitude,
+            "longitude": self.longitude,
+            "type": self.type,
+            "status": self.status,
+            "address": self.address,
+            "flow_rate": self.flow_rate,
+            "distance_m": round(distance, 1),
+        }
+
+
+class HydrantIndex:
+    """Uniform grid of hydrants"""
+
+    def __init__(self, cell_meters: float):
+        self.cell = cell_meters
+        # Local equirectangular projection around the service area
+        self._lon_scale = METERS_PER_DEGREE * math.cos(math.radians(settings.DEFAULT_LATITUDE))
+        self.hydrants: Dict[str, HydrantPoint] = {}
+        self._grid: Dict[Tuple[int, int], Set[str]] = {}
+        self.synced_to: Optional[datetime] = None  # Latest updated_at loaded
+        self.checked_at: Optional[float] = None
+        self.synced_version: Optional[str] = None  # "hydrants" cache version loaded
+
+    def _project(self, latitude: float, longitude: float) -> Tuple[float, float]:
+        return longitude * self._lon_scale, latitude * METERS_PER_DEGREE
+
+    def _cell(self, x: float, y: float) -> Tuple[int, int]:
+        return math.floor(x / self.cell), math.floor(y / self.cell)
+
+    # Writes
+
+    def upsert(self, hydrant: Hydrant):
+        self.remove(hydrant.id)
+        point = HydrantPoint()
+        point.id = hydrant.id
+        point.external_id = hydrant.external_id
+        point.type = hydrant.type
+        point.status = hydrant.status
+        point.latitude = float(hydrant.latitude)
+        point.longitude = float(hydrant.longitude)
+        point.address = hydrant.address
+        point.flow_rate = hydrant.flow_rate
+        point.x, point.y = self._project(point.latitude, point.longitude)
+        point.cell = self._cell(point.x, point.y)
+        self.hydrants[point.id] = point
+        self._grid.setdefault(point.cell, set()).add(point.id)
+
+    def remove(self, hydrant_id: str):
+        point = self.hydrants.pop(hydrant_id, None)
+        if point is not None:
+            cell = self._grid[point.cell]
+            cell.discard(hydrant_id)
+            if not cell:
+                del self._grid[point.cell]
+
+    def _apply(self, hydrants: Iterable[Hydrant]):
+        for hydrant in hydrants:
+            self.upsert(hydrant)
+            if hydrant.updated_at and (self.synced_to is None or hydrant.updated_at > self.synced_to):
+                self.synced_to = hydrant.updated_at
+
+    def load(self, db: Session):
+        """(Re)build the index from the hydrants table"""
+        self.hydrants, self._grid, self.synced_to = {}, {}, None
+        self._apply(db.query(Hydrant).yield_per(5000))
+        self.checked_at = time.monotonic()
+
+    def refresh(self, db: Session):
+        """Apply rows changed since the last load/refresh"""
+        if self.synced_to is None:
+            self.load(db)
+            return
+        # >=: rows written in the same clock tick as the last one seen
+        self._apply(db.query(Hydrant).filter(Hydrant.updated_at >= self.synced_to).all())
+        if db.query(func.count(Hydrant.id)).scalar() != len(self.hydrants):
+            self.load(db)  # Rows were deleted
+        self.checked_at = time.monotonic()
+
+    def ensure_fresh(self, db: Session, version: Optional[str] = None):
+        """
+        Load or refresh the index before a read if it may be stale
+
+        Args:
+            db: Database session
+            version: Current shared "hydrants" cache version (None - no shared store)
+        """
+        if self.checked_at is None:
+            self.load(db)
+        elif version is not None and version != self.synced_version:
+            self.refresh(db)
+        elif time.monotonic() - self.checked_at > settings.HYDRANT_RELOAD_SECONDS:
+            self.refresh(db)
+        if version is not None:
+            self.synced_version = version
+
+    # Reads
+
+    def _ring(self, cx: int, cy: int, r: int) -> Iterable[Tuple[int, int]]:
+        if r == 0:
+            yield cx, cy
+            return
+        for dx in range(-r, r + 1):
+            yield cx + dx, cy - r
+            yield cx + dx, cy + r
+        for dy in range(-r + 1, r):
+            yield cx - r, cy + dy
+            yield cx + r, cy + dy
+
+    def query(self, latitude: float, longitude: float, radius_m: float, limit: Optional[int] = None,
+              statuses: Optional[Iterable[str]] = None) -> List[Tuple[float, HydrantPoint]]:
+        """
+        Hydrants within radius_m, nearest first
+
+        Args:
+            latitude, longitude: Query point
+            radius_m: Search radius in meters
+            limit: Return at most this many (k nearest)
+            statuses: Only hydrants with these statuses
+
+        Returns:
+            List[Tuple[float, HydrantPoint]]: (distance in meters, hydrant)
+        """
+        statuses = set(statuses) if statuses else None
+        x, y = self._project(latitude, longitude)
+        cx, cy = self._cell(x, y)
+        found = []
+        rings = math.ceil(radius_m / self.cell) + 1
+        for r in range(rings + 1):
+            for cell in self._ring(cx, cy, r):
+                for hydrant_id in self._grid.get(cell, ()):
+                    point = self.hydrants[hydrant_id]
+                    if statuses is not None and point.status not in statuses:
+                        continue
+                    distance = math.hypot(point.x - x, point.y - y)
+                    if distance <= radius_m:
+                        found.append((distance, point))
+            # Every hydrant within r cells of the query point has been seen
+            if limit and sum(1 for distance, _ in found if distance <= r * self.cell) >= limit:
+                break
+        found.sort(key=lambda item: item[0])
+        return found[:limit] if limit else found
+
+
+hydrant_index = HydrantIndex(cell_meters=settings.HYDRANT_GRID_CELL_METERS)
@@ -4,9 +4,12 @@ Notification Service
 from sqlalchemy.orm import Session
 from uuid import UUID
 from typing import Optional
+import logging
 
 from app.models.notification import Notification, NotificationType
 
+logger = logging.getLogger(__name__)
+
 
 async def send_notification(
     db: Session,
@@ -56,7 +59,7 @@ async def send_email(to: str, subject: str, body: str):
     
     In production: integrate with SMTP or email service
     """
-    print(f"[EMAIL] To: {to}, Subject: {subject}, Body: {body}")
+    logger.info("Email queued (stub)", extra={"to": to, "subject": subject})
     # TODO: Implement actual email sending
     pass
 
@@ -67,6 +70,6 @@ async def send_sms(phone: str, message: str):
     
     In production: integrate with SMS gateway
     """
-    print(f"[SMS] To: {phone}, Message: {message}")
+    logger.info("SMS queued (stub)", extra={"phone": phone})
     # TODO: Implement actual SMS sending
     pass
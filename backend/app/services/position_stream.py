@@ -0,0 +1,134 @@
+"""
+Position Stream - Live team positions pushed to operator maps over WebSocket
+
+Operators subscribe to the "team_positions" topic with their map viewport:
+
+    {"type": "subscribe", "topics": ["team_positions"], "bbox": [west, south, east, north]}
+
+Fixes are not forwarded one by one. Every 1 / POSITION_STREAM_HZ seconds the
+teams that moved since the previous tick are encoded once, and each
+subscriber gets one message with the teams inside its viewport. A team
+reporting ten times a second is still sent POSITION_STREAM_HZ times, so the
+bandwidth per operator depends on the teams in view, not on how often units
+report.
+
+Message (rows in FIELDS order, coordinates rounded to ~1 m):
+
+    {"type": "team_positions", "data": [[team_id, lat, lon, speed, heading, unix seconds], ...]}
+
+A (re)subscription first gets the latest position of every team in the
+viewport known to this worker. A subscriber whose send takes longer than
+POSITION_STREAM_SEND_TIMEOUT_SECONDS is disconnected, so a stalled map
+cannot hold up the ticks of everyone else.
+"""
+from fastapi import WebSocket
+from typing import Iterable, Optional, Tuple
+import asyncio
+import logging
+
+import orjson
+
+from app.core.config import settings
+from app.services.positions import EPOCH, TeamPosition, position_store
+from app.services.websocket_service import manager
+
+logger = logging.getLogger(__name__)
+
+TOPIC = "team_positions"
+FIELDS = ("team_id", "latitude", "longitude", "speed", "heading", "recorded_at")
+
+BBox = Tuple[float, float, float, float]
+
+
+def parse_bbox(value) -> Optional[BBox]:
+    """[west, south, east, north] from a subscribe message, None if absent or invalid"""
+    try:
+        west, south, east, north = (float(part) for part in value)
+    except (TypeError, ValueError):
+        return None
+    if not (-180 <= west <= east <= 180 and -90 <= south <= north <= 90):
+        return None
+    return west, south, east, north
+
+
+def in_bbox(fix: TeamPosition, bbox: Optional[BBox]) -> bool:
+    if bbox is None:
+        return True
+    west, south, east, north = bbox
+    return west <= fix.longitude <= east and south <= fix.latitude <= north
+
+
+def encode_row(fix: TeamPosition) -> bytes:
+    return orjson.dumps([
+        fix.team_id,
+        round(fix.latitude, 5),
+        round(fix.longitude, 5),
+        round(fix.speed, 1) if fix.speed is not None else None,
+        round(fix.heading) if fix.heading is not None else None,
+        int((fix.recorded_at - EPOCH).total_seconds()),
+    ])
+
+
+def encode_message(rows: Iterable[bytes]) -> str:
+    """Message from pre-encoded rows (shared by all subscribers of a tick)"""
+    return (b'{"type":"' + TOPIC.encode() + b'","data":[' + b",".join(rows) + b"]}").decode()
+
+
+class PositionStream:
+    """Periodic, coalesced fan-out of moved teams to viewport subscribers"""
+
+    def __init__(self, rate_hz: float):
+        self.interval = 1 / rate_hz if rate_hz > 0 else 1.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Run the tick loop on the current event loop (idempotent)"""
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._task = loop.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.tick()
+            except Exception as e:
+                logger.error(f"Error streaming team positions: {e}")
+
+    async def tick(self) -> int:
+        """
+        Send the teams that moved since the previous tick
+
+        Returns:
+            int: Number of messages sent
+        """
+        changed = position_store.take_changed()
+        subscribers = list(manager.subscribers(TOPIC).items())
+        if not changed or not subscribers:
+            return 0
+        rows = [(fix, encode_row(fix)) for fix in changed]
+        messages = []
+        for websocket, bbox in subscribers:
+            visible = [row for fix, row in rows if in_bbox(fix, bbox)]
+            if visible:
+                messages.append((websocket, encode_message(visible)))
+        timeout = settings.POSITION_STREAM_SEND_TIMEOUT_SECONDS
+        failed = await manager.send_to_connections(messages, timeout=timeout)
+        if failed:
+            logger.warning("Dropping %d stalled position subscribers", len(failed))
+            await asyncio.gather(*(manager.drop(websocket, timeout) for websocket in failed))
+        return len(messages) - len(failed)
+
+    def snapshot(self, bbox: Optional[BBox]) -> str:
+        """Latest position of every team in the viewport"""
+        return encode_message(
+            encode_row(fix) for fix in list(position_store.latest.values()) if in_bbox(fix, bbox)
+        )
+
+    async def subscribe(self, websocket: WebSocket, bbox: Optional[BBox]):
+        manager.subscribe(websocket, TOPIC, bbox)
+        self.start()
+        await websocket.send_text(self.snapshot(bbox))
+
+
+position_stream = PositionStream(rate_hz=settings.POSITION_STREAM_HZ)
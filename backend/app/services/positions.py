@@ -0,0 +1,304 @@
+"""
+Positions Service - Latest team positions in memory, coalesced DB writes, track history
+
+GPS fixes arrive far more often than anything needs them in the database:
+every fix replaces the team's entry in an in-memory map (reads use it
+directly) and marks the team dirty. A background task writes all dirty
+teams' current_latitude/current_longitude in one bulk UPDATE every
+POSITION_FLUSH_SECONDS, so N fixes cost one statement instead of N commits.
+
+Optionally the last POSITION_TRACK_SIZE fixes of every team are kept as a
+ring buffer of deltas in ~1 m / 1 s units: 12 bytes per fix.
+
+The map lives in process memory: with several workers each one serves the
+fixes it received and falls back to the flushed DB value when that is newer.
+Both sides of that comparison are server receipt times: device clocks
+drift, so `recorded_at` only orders fixes of the same team.
+"""
+from array import array
+from datetime import datetime, timezone
+from sqlalchemy import update
+from typing import Dict, List, Optional, Set, Tuple
+import asyncio
+import logging
+
+from app.core.cache import invalidate
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.team import RescueTeam
+
+logger = logging.getLogger(__name__)
+
+TRACK_SCALE = 100000  # Track coordinates in 1e-5 degrees (~1.1 m)
+EPOCH = datetime(1970, 1, 1)
+
+
+def to_utc_naive(value: Optional[datetime]) -> datetime:
+    """Client timestamp as naive UTC (like the DB columns), never in the future"""
+    now = datetime.utcnow()
+    if value is None:
+        return now
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return min(value, now)
+
+
+class TeamPosition:
+    """Latest fix of a team"""
+    __slots__ = ("team_id", "latitude", "longitude", "accuracy", "speed", "heading",
+                 "recorded_at", "received_at", "reported_by")
+
+    def __init__(self, team_id: str, latitude: float, longitude: float, recorded_at: datetime,
+                 accuracy: Optional[float] = None, speed: Optional[float] = None,
+                 heading: Optional[float] = None, reported_by: Optional[str] = None,
+                 received_at: Optional[datetime] = None):
+        self.team_id = team_id
+        self.latitude = latitude
+        self.longitude = longitude
+        self.recorded_at = recorded_at
+        self.received_at = received_at or datetime.utcnow()  # Server clock
+        self.accuracy = accuracy
+        self.speed = speed
+        self.heading = heading
+        self.reported_by = reported_by
+
+    def to_dict(self) -> dict:
+        return {
+            "team_id": self.team_id,
+            "latitude": self.latitude,
+            "longitude": self.longitude,
+            "accuracy": self.accuracy,
+            "speed": self.speed,
+            "heading": self.heading,
+            "recorded_at": self.recorded_at,
+        }
+
+
+class TrackBuffer:
+    """
+    Ring buffer of delta-encoded fixes
+
+    Slot k holds (seconds, lat, lon) relative to the previous fix; the oldest
+    fix is kept absolute in `_first`, so evicting it folds the next delta in.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._deltas = array("i", bytes(3 * capacity * array("i").itemsize))
+        self._head = 0  # Slot of the oldest fix
+        self._count = 0
+        self._first = (0, 0, 0)
+        self._last = (0, 0, 0)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, recorded_at: datetime, latitude: float, longitude: float):
+        point = (
+            int((recorded_at - EPOCH).total_seconds()),
+            round(latitude * TRACK_SCALE),
+            round(longitude * TRACK_SCALE),
+        )
+        if self._count == self.capacity:
+            self._evict()
+        if self._count == 0:
+            self._first = self._last = point
+            self._count = 1
+            return
+        slot = 3 * ((self._head + self._count) % self.capacity)
+        self._deltas[slot:slot + 3] = array("i", (a - b for a, b in zip(point, self._last)))
+        self._last = point
+        self._count += 1
+
+    def _evict(self):
+        self._count -= 1
+        if self._count == 0:
+            return
+        self._head = (self._head + 1) % self.capacity
+        slot = 3 * self._head
+        self._first = tuple(a + b for a, b in zip(self._first, self._deltas[slot:slot + 3]))
+
+    def points(self, since: Optional[datetime] = None) -> List[Tuple[int, float, float]]:
+        """Decoded fixes, oldest first: (unix seconds, latitude, longitude)"""
+        if self._count == 0:
+            return []
+        cutoff = int((since - EPOCH).total_seconds()) if since else None
+        seconds, lat, lon = self._first
+        decoded = []
+        for i in range(self._count):
+            if i:
+                slot = 3 * ((self._head + i) % self.capacity)
+                seconds += self._deltas[slot]
+                lat += self._deltas[slot + 1]
+                lon += self._deltas[slot + 2]
+            if cutoff is None or seconds >= cutoff:
+                decoded.append((seconds, lat / TRACK_SCALE, lon / TRACK_SCALE))
+        return decoded
+
+
+class PositionStore:
+    """Latest team positions, dirty set for the periodic flush and track history"""
+
+    def __init__(self, flush_seconds: float, track_size: int):
+        self.flush_seconds = flush_seconds
+        self.track_size = track_size
+        self.latest: Dict[str, TeamPosition] = {}
+        self.tracks: Dict[str, TrackBuffer] = {}
+        self._dirty: Set[str] = set()
+        self._changed: Set[str] = set()  # Since the last take_changed() (live streaming)
+        self._flusher: Optional[asyncio.Task] = None
+
+    # Writes
+
+    def record(self, team_id: str, latitude: float, longitude: float,
+               recorded_at: Optional[datetime] = None, accuracy: Optional[float] = None,
+               speed: Optional[float] = None, heading: Optional[float] = None,
+               reported_by: Optional[str] = None, persisted: bool = False) -> bool:
+        """
+        Store a fix
+
+        Args:
+            team_id: Team the fix belongs to
+            latitude, longitude: Position
+            recorded_at: Device time of the fix (default - now)
+            accuracy, speed, heading: Optional GPS details
+            reported_by: User who sent the fix
+            persisted: Already written to the DB (PATCH /teams), don't flush it
+
+        Returns:
+            bool: False if the fix is older than the latest one (out of order)
+        """
+        recorded_at = to_utc_naive(recorded_at)
+        current = self.latest.get(team_id)
+        if current is not None and recorded_at < current.recorded_at:
+            return False
+
+        self.latest[team_id] = TeamPosition(
+            team_id, latitude, longitude, recorded_at, accuracy, speed, heading, reported_by
+        )
+        if self.track_size > 0:
+            track = self.tracks.get(team_id)
+            if track is None:
+                track = self.tracks[team_id] = TrackBuffer(self.track_size)
+            track.append(recorded_at, latitude, longitude)
+        self._changed.add(team_id)
+        if persisted:
+            self._dirty.discard(team_id)
+        else:
+            self._dirty.add(team_id)
+            self._ensure_flusher()
+        return True
+
+    def forget(self, team_id: str):
+        """Drop a deleted team"""
+        self.latest.pop(team_id, None)
+        self.tracks.pop(team_id, None)
+        self._dirty.discard(team_id)
+        self._changed.discard(team_id)
+
+    # Reads
+
+    def get(self, team_id: str) -> Optional[TeamPosition]:
+        return self.latest.get(team_id)
+
+    def position_of(self, team: RescueTeam) -> Optional[Tuple[float, float]]:
+        """
+        Latest known position of a team
+
+        The in-memory fix unless the DB row holds one received later (another
+        worker flushed a newer fix), then the DB value. Flushes stamp
+        updated_at with the receipt time of the fix they write, so both
+        sides come from server clocks.
+        """
+        fix = self.latest.get(team.id)
+        if fix is not None and (team.updated_at is None or fix.received_at >= team.updated_at
+                                or team.current_latitude is None):
+            return fix.latitude, fix.longitude
+        if team.current_latitude is not None and team.current_longitude is not None:
+            return float(team.current_latitude), float(team.current_longitude)
+        return None
+
+    def take_changed(self) -> List[TeamPosition]:
+        """Latest fix of every team that moved since the previous call"""
+        changed, self._changed = self._changed, set()
+        return [self.latest[team_id] for team_id in changed if team_id in self.latest]
+
+    def track(self, team_id: str, since: Optional[datetime] = None) -> List[Tuple[int, float, float]]:
+        buffer = self.tracks.get(team_id)
+        return buffer.points(since) if buffer is not None else []
+
+    # Flushing
+
+    def _ensure_flusher(self):
+        loop = asyncio.get_running_loop()
+        if self._flusher is None or self._flusher.done() or self._flusher.get_loop() is not loop:
+            self._flusher = loop.create_task(self._flush_loop())
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_seconds)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing team positions: {e}")
+
+    async def flush(self) -> int:
+        """
+        Write the latest position of every dirty team in one bulk UPDATE
+
+        Returns:
+            int: Number of teams written
+        """
+        if not self._dirty:
+            return 0
+        dirty, self._dirty = self._dirty, set()
+        rows = [
+            {
+                "id": team_id,
+                "current_latitude": self.latest[team_id].latitude,
+                "current_longitude": self.latest[team_id].longitude,
+                "updated_at": self.latest[team_id].received_at,
+            }
+            for team_id in dirty if team_id in self.latest
+        ]
+        try:
+            await asyncio.to_thread(self._write, rows)
+        except Exception:
+            self._dirty |= dirty  # Retried on the next tick
+            raise
+        # GET /teams responses carry the positions
+        await invalidate("teams")
+        return len(rows)
+
+    async def close(self):
+        """Stop the periodic flush and write what is still buffered (shutdown)"""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except (asyncio.CancelledError, RuntimeError):
+                pass  # RuntimeError: the task belongs to another (closed) loop
+            self._flusher = None
+        await self.flush()
+
+    @staticmethod
+    def _write(rows: List[dict]):
+        db = SessionLocal()
+        try:
+            # Only existing teams: a bulk UPDATE by primary key fails on a missing row
+            existing = {
+                team_id for (team_id,) in
+                db.query(RescueTeam.id).filter(RescueTeam.id.in_([row["id"] for row in rows])).all()
+            }
+            rows = [row for row in rows if row["id"] in existing]
+            if rows:
+                db.execute(update(RescueTeam), rows)
+                db.commit()
+        finally:
+            db.close()
+
+
+position_store = PositionStore(
+    flush_seconds=settings.POSITION_FLUSH_SECONDS,
+    track_size=settings.POSITION_TRACK_SIZE,
+)
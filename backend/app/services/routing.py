@@ -0,0 +1,468 @@
+"""
+Routing Service - Road-network travel times (contraction hierarchies over CSR arrays)
+
+The road graph is built once from an OSM extract (see build_road_graph.py):
+drivable ways become directed edges weighted by free-flow travel time (from
+maxspeed or the highway class), the largest strongly connected component is
+kept, and the graph is preprocessed into a contraction hierarchy: nodes are
+contracted one by one (fewest shortcuts first) and a shortcut u->x is added
+whenever the path u->v->x through a contracted node v has no witness path.
+
+Every edge then leads "up" from the lower ranked endpoint, stored as two CSR
+graphs: fwd (upward edges in travel direction) and bwd (upward edges
+against it). A shortest path always climbs from the source and descends to
+the target, so a travel time is the best meeting node of two small upward
+searches instead of a search over the whole city.
+
+Many-to-many (teams x alerts) uses buckets: one backward upward search per
+target stores (target, time) in a bucket at every node it reaches, then one
+forward upward search per source scans the buckets of the nodes it reaches.
+Cost is one small search per team and per alert.
+
+Points are snapped to the nearest graph node through a uniform grid; the
+snap distance is added at ACCESS_SPEED_KMH.
+"""
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import heapq
+import json
+import math
+import re
+import xml.etree.ElementTree as ElementTree
+
+import numpy as np
+
+from app.core.config import settings
+
+METERS_PER_DEGREE = 111320.0
+ACCESS_SPEED_KMH = 20.0  # From the snapped point to the road
+SNAP_CELL_METERS = 250.0
+SEARCH_CACHE_SIZE = 4096  # Upward search spaces kept (per snapped node and direction)
+WITNESS_SETTLE_LIMIT = 200  # Witness searches give up after this many nodes (adds a few extra shortcuts)
+
+# Free-flow speed (km/h) of drivable highway classes
+HIGHWAY_SPEEDS = {
+    "motorway": 90, "motorway_link": 60,
+    "trunk": 80, "trunk_link": 50,
+    "primary": 60, "primary_link": 45,
+    "secondary": 50, "secondary_link": 40,
+    "tertiary": 40, "tertiary_link": 35,
+    "unclassified": 30, "residential": 25, "road": 25,
+    "living_street": 10, "service": 15,
+}
+# Implicit Russian speed limits
+MAXSPEED_ZONES = {"ru:urban": 60, "ru:rural": 90, "ru:living_street": 20, "ru:motorway": 110}
+_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+
+
+def _haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371000.0 * math.asin(math.sqrt(min(a, 1.0)))
+
+
+def way_speed(tags: Dict[str, str]) -> Optional[float]:
+    """Travel speed (km/h) of a way, None if it is not drivable"""
+    default = HIGHWAY_SPEEDS.get(tags.get("highway"))
+    if default is None or tags.get("area") == "yes":
+        return None
+    maxspeed = tags.get("maxspeed", "").strip().lower()
+    if maxspeed in MAXSPEED_ZONES:
+        return float(MAXSPEED_ZONES[maxspeed])
+    match = _NUMBER.match(maxspeed)
+    if match:
+        speed = float(match.group())
+        return speed * 1.609 if "mph" in maxspeed else speed
+    return float(default)
+
+
+def way_directions(tags: Dict[str, str]) -> Tuple[bool, bool]:
+    """(forward allowed, backward allowed) of a way"""
+    oneway = tags.get("oneway", "").lower()
+    if oneway == "-1":
+        return False, True
+    if oneway in ("yes", "true", "1") or tags.get("junction") in ("roundabout", "circular") \
+            or (tags.get("highway") == "motorway" and oneway != "no"):
+        return True, False
+    return True, True
+
+
+# Build
+
+def parse_osm(path: str) -> Tuple[np.ndarray, Dict[Tuple[int, int], float]]:
+    """
+    Directed road edges of an OSM XML extract
+
+    Two passes: drivable ways first, then only the nodes they use.
+
+    Returns:
+        Tuple[np.ndarray, Dict]: (n, 2) node latitude/longitude, {(u, v): seconds}
+    """
+    ways = []
+    for _, element in ElementTree.iterparse(path, events=("end",)):
+        if element.tag == "way":
+            tags = {tag.get("k"): tag.get("v") for tag in element.iter("tag")}
+            speed = way_speed(tags)
+            if speed is not None:
+                refs = [int(nd.get("ref")) for nd in element.iter("nd")]
+                if len(refs) > 1:
+                    ways.append((refs, speed, way_directions(tags)))
+            element.clear()
+        elif element.tag == "node":
+            element.clear()
+
+    needed = {ref for refs, _, _ in ways for ref in refs}
+    index: Dict[int, int] = {}
+    coords = []
+    for _, element in ElementTree.iterparse(path, events=("end",)):
+        if element.tag == "node":
+            node_id = int(element.get("id"))
+            if node_id in needed:
+                index[node_id] = len(coords)
+                coords.append((float(element.get("lat")), float(element.get("lon"))))
+        element.clear()
+
+    edges: Dict[Tuple[int, int], float] = {}
+    for refs, speed, (forward, backward) in ways:
+        nodes = [index[ref] for ref in refs if ref in index]
+        for a, b in zip(nodes, nodes[1:]):
+            if a == b:
+                continue
+            seconds = _haversine_m(*coords[a], *coords[b]) / (speed / 3.6)
+            for u, v, allowed in ((a, b, forward), (b, a, backward)):
+                if allowed and seconds < edges.get((u, v), math.inf):
+                    edges[(u, v)] = seconds
+    return np.array(coords, dtype=np.float64).reshape(-1, 2), edges
+
+
+def largest_component(n: int, edges: Dict[Tuple[int, int], float]) -> List[int]:
+    """Nodes of the largest strongly connected component (iterative Kosaraju)"""
+    out, inn = [[] for _ in range(n)], [[] for _ in range(n)]
+    for u, v in edges:
+        out[u].append(v)
+        inn[v].append(u)
+
+    order, seen = [], [False] * n
+    for start in range(n):
+        if seen[start]:
+            continue
+        seen[start] = True
+        stack = [(start, iter(out[start]))]
+        while stack:
+            node, neighbors = stack[-1]
+            for nxt in neighbors:
+                if not seen[nxt]:
+                    seen[nxt] = True
+                    stack.append((nxt, iter(out[nxt])))
+                    break
+            else:
+                stack.pop()
+                order.append(node)
+
+    component, best = [-1] * n, (0, -1)
+    for label, start in enumerate(reversed(order)):
+        if component[start] != -1:
+            continue
+        component[start], stack, size = label, [start], 0
+        while stack:
+            node = stack.pop()
+            size += 1
+            for prev in inn[node]:
+                if component[prev] == -1:
+                    component[prev] = label
+                    stack.append(prev)
+        best = max(best, (size, label))
+    return [node for node in range(n) if component[node] == best[1]]
+
+
+def contract(n: int, edges: Dict[Tuple[int, int], float]) -> Tuple[list, list]:
+    """
+    Contraction hierarchy of a graph
+
+    Nodes are contracted in order of edge difference (shortcuts added minus
+    edges removed) plus contracted neighbours, with lazy priority updates.
+
+    Returns:
+        Tuple[list, list]: Upward forward edges [(v, x, w)] (edge v->x, x ranks
+        higher) and upward backward edges [(v, u, w)] (edge u->v, u ranks higher)
+    """
+    out: List[Dict[int, float]] = [dict() for _ in range(n)]
+    inn: List[Dict[int, float]] = [dict() for _ in range(n)]
+    for (u, v), w in edges.items():
+        out[u][v] = w
+        inn[v][u] = w
+    contracted = [False] * n
+    deleted_neighbors = [0] * n
+
+    def witness_distances(source: int, excluded: int, max_cost: float, targets: set) -> Dict[int, float]:
+        dist = {source: 0.0}
+        heap = [(0.0, source)]
+        settled = 0
+        remaining = set(targets)
+        while heap and remaining and settled < WITNESS_SETTLE_LIMIT:
+            d, node = heapq.heappop(heap)
+            if d > max_cost:
+                break
+            if d > dist[node]:
+                continue
+            settled += 1
+            remaining.discard(node)
+            for nxt, w in out[node].items():
+                if nxt == excluded:
+                    continue
+                nd = d + w
+                if nd < dist.get(nxt, math.inf):
+                    dist[nxt] = nd
+                    heapq.heappush(heap, (nd, nxt))
+        return dist
+
+    def shortcuts(v: int) -> List[Tuple[int, int, float]]:
+        found = []
+        for u, wu in inn[v].items():
+            costs = {x: wu + wx for x, wx in out[v].items() if x != u}
+            if not costs:
+                continue
+            dist = witness_distances(u, v, max(costs.values()), set(costs))
+            found.extend((u, x, cost) for x, cost in costs.items() if dist.get(x, math.inf) > cost)
+        return found
+
+    def priority(v: int) -> int:
+        return len(shortcuts(v)) - len(inn[v]) - len(out[v]) + deleted_neighbors[v]
+
+    heap = [(priority(v), v) for v in range(n)]
+    heapq.heapify(heap)
+    fwd, bwd = [], []
+    while heap:
+        _, v = heapq.heappop(heap)
+        if contracted[v]:
+            continue
+        current = priority(v)
+        if heap and current > heap[0][0]:
+            heapq.heappush(heap, (current, v))  # Lazy update
+            continue
+
+        added = shortcuts(v)
+        contracted[v] = True
+        # All remaining neighbours are contracted later, so rank higher
+        fwd.extend((v, x, w) for x, w in out[v].items())
+        bwd.extend((v, u, w) for u, w in inn[v].items())
+        neighbors = set(inn[v]) | set(out[v])
+        for u in inn[v]:
+            del out[u][v]
+        for x in out[v]:
+            del inn[x][v]
+        out[v], inn[v] = {}, {}
+        for u, x, cost in added:
+            if cost < out[u].get(x, math.inf):
+                out[u][x] = cost
+                inn[x][u] = cost
+        for neighbor in neighbors:
+            deleted_neighbors[neighbor] += 1
+    return fwd, bwd
+
+
+def _csr(n: int, edges: List[Tuple[int, int, float]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    edges = sorted(edges)
+    sources = np.array([edge[0] for edge in edges], dtype=np.int64)
+    indptr = np.searchsorted(sources, np.arange(n + 1)).astype(np.int64)
+    indices = np.array([edge[1] for edge in edges], dtype=np.int32)
+    weights = np.array([edge[2] for edge in edges], dtype=np.float32)
+    return indptr, indices, weights
+
+
+def build_graph(coords: np.ndarray, edges: Dict[Tuple[int, int], float], path: str) -> dict:
+    """
+    Preprocess a road graph and write its index files
+
+    Args:
+        coords: (n, 2) node latitude/longitude
+        edges: {(u, v): seconds}
+        path: Output directory (created if missing)
+
+    Returns:
+        dict: Graph statistics
+    """
+    keep = largest_component(len(coords), edges)
+    if len(keep) < 2:
+        raise ValueError("No connected road network")
+    renumber = {node: i for i, node in enumerate(keep)}
+    coords = coords[keep]
+    edges = {
+        (renumber[u], renumber[v]): w for (u, v), w in edges.items() if u in renumber and v in renumber
+    }
+    n = len(coords)
+    fwd, bwd = contract(n, edges)
+
+    directory = Path(path)
+    directory.mkdir(parents=True, exist_ok=True)
+    np.save(directory / "coords.npy", coords)
+    for name, graph in (("fwd", fwd), ("bwd", bwd)):
+        indptr, indices, weights = _csr(n, graph)
+        np.save(directory / f"{name}_indptr.npy", indptr)
+        np.save(directory / f"{name}_indices.npy", indices)
+        np.save(directory / f"{name}_weights.npy", weights)
+    meta = {
+        "nodes": n,
+        "edges": len(edges),
+        "hierarchy_edges": len(fwd) + len(bwd),
+        "lat0": float(coords[:, 0].mean()),
+    }
+    (directory / "meta.json").write_text(json.dumps(meta))
+    return meta
+
+
+# Queries
+
+class RoadGraph:
+    """Contraction hierarchy loaded for queries"""
+
+    def __init__(self, path: str):
+        directory = Path(path)
+        meta = json.loads((directory / "meta.json").read_text())
+        self.nodes = meta["nodes"]
+        self.coords = np.load(directory / "coords.npy")
+        # Adjacency lists of (node, seconds): searches touch few edges each, far cheaper than numpy indexing
+        self._fwd = self._adjacency(directory, "fwd")
+        self._bwd = self._adjacency(directory, "bwd")
+        self._spaces: Dict[Tuple[int, bool], List[Tuple[int, float]]] = {}  # Upward search spaces (FIFO)
+
+        self._lon_scale = METERS_PER_DEGREE * math.cos(math.radians(meta["lat0"]))
+        self._xy = np.column_stack([self.coords[:, 1] * self._lon_scale, self.coords[:, 0] * METERS_PER_DEGREE])
+        cells = np.floor(self._xy / SNAP_CELL_METERS).astype(np.int64)
+        self._grid: Dict[Tuple[int, int], np.ndarray] = {}
+        order = np.lexsort((cells[:, 1], cells[:, 0]))
+        sorted_cells = cells[order]
+        starts = np.flatnonzero(np.any(np.diff(sorted_cells, axis=0, prepend=[[-1 << 62, 0]]) != 0, axis=1))
+        for start, end in zip(starts, np.append(starts[1:], len(order))):
+            self._grid[(int(sorted_cells[start, 0]), int(sorted_cells[start, 1]))] = order[start:end]
+
+    @staticmethod
+    def _adjacency(directory: Path, name: str) -> List[List[Tuple[int, float]]]:
+        indptr = np.load(directory / f"{name}_indptr.npy").tolist()
+        edges = list(zip(
+            np.load(directory / f"{name}_indices.npy").tolist(),
+            np.load(directory / f"{name}_weights.npy").tolist(),
+        ))
+        return [edges[indptr[node]:indptr[node + 1]] for node in range(len(indptr) - 1)]
+
+    def snap(self, latitude: float, longitude: float, max_meters: float) -> Optional[Tuple[int, float]]:
+        """Nearest node within max_meters: (node, distance in meters)"""
+        x, y = longitude * self._lon_scale, latitude * METERS_PER_DEGREE
+        cx, cy = math.floor(x / SNAP_CELL_METERS), math.floor(y / SNAP_CELL_METERS)
+        best = (math.inf, -1)
+        for r in range(int(max_meters // SNAP_CELL_METERS) + 2):
+            # Nodes in ring r are at least (r - 1) cells away
+            if (r - 1) * SNAP_CELL_METERS > best[0]:
+                break
+            cells = [(cx + dx, cy + dy) for dx in range(-r, r + 1) for dy in range(-r, r + 1)
+                     if max(abs(dx), abs(dy)) == r]
+            for cell in cells:
+                members = self._grid.get(cell)
+                if members is None:
+                    continue
+                distances = np.hypot(self._xy[members, 0] - x, self._xy[members, 1] - y)
+                i = int(np.argmin(distances))
+                if distances[i] < best[0]:
+                    best = (float(distances[i]), int(members[i]))
+        if best[1] < 0 or best[0] > max_meters:
+            return None
+        return best[1], best[0]
+
+    def _upward(self, source: int, forward: bool) -> List[Tuple[int, float]]:
+        """
+        Dijkstra restricted to upward edges, cached per node
+
+        Stall-on-demand: a node reached more cheaply through a higher ranked
+        neighbour (an upward edge of the opposite graph pointing at it) is not
+        on a shortest up-down path, so its edges are not relaxed.
+        """
+        key = (source, forward)
+        space = self._spaces.get(key)
+        if space is not None:
+            return space
+        graph, opposite = (self._fwd, self._bwd) if forward else (self._bwd, self._fwd)
+        inf, pop, push = math.inf, heapq.heappop, heapq.heappush
+        dist = {source: 0.0}
+        get = dist.get
+        heap = [(0.0, source)]
+        space, done = [], set()
+        while heap:
+            d, node = pop(heap)
+            if node in done:
+                continue
+            done.add(node)
+            for higher, w in opposite[node]:
+                if get(higher, inf) + w < d:
+                    break
+            else:
+                space.append((node, d))
+                for nxt, w in graph[node]:
+                    nd = d + w
+                    if nd < get(nxt, inf):
+                        dist[nxt] = nd
+                        push(heap, (nd, nxt))
+        if len(self._spaces) >= SEARCH_CACHE_SIZE:
+            self._spaces.pop(next(iter(self._spaces)), None)
+        self._spaces[key] = space
+        return space
+
+    def travel_times(self, sources: Sequence[Tuple[float, float]], targets: Sequence[Tuple[float, float]],
+                     cutoff_seconds: float = math.inf) -> np.ndarray:
+        """
+        Travel times in seconds from every source to every target
+
+        Args:
+            sources: (latitude, longitude) of the origins (teams)
+            targets: (latitude, longitude) of the destinations (alerts)
+            cutoff_seconds: Longer trips are reported as unreachable
+
+        Returns:
+            np.ndarray: len(sources) x len(targets); inf - unreachable within
+            the cutoff, nan - the source or target is farther than
+            ROUTING_MAX_SNAP_METERS from the network
+        """
+        access_speed = ACCESS_SPEED_KMH / 3.6
+        max_snap = settings.ROUTING_MAX_SNAP_METERS
+
+        def snapped(points: Iterable[Tuple[float, float]]) -> list:
+            result = []
+            for latitude, longitude in points:
+                snap = self.snap(latitude, longitude, max_snap)
+                result.append((snap[0], snap[1] / access_speed) if snap else None)
+            return result
+
+        times = np.full((len(sources), len(targets)), np.inf)
+        buckets: Dict[int, List[Tuple[int, float]]] = defaultdict(list)
+        for j, target in enumerate(snapped(targets)):
+            if target is None:
+                times[:, j] = np.nan
+                continue
+            for node, d in self._upward(target[0], forward=False):
+                buckets[node].append((j, d + target[1]))
+
+        for i, source in enumerate(snapped(sources)):
+            if source is None:
+                times[i] = np.nan
+                continue
+            best = [math.inf] * len(targets)
+            for node, d in self._upward(source[0], forward=True):
+                for j, remaining in buckets.get(node, ()):
+                    if d + remaining < best[j]:
+                        best[j] = d + remaining
+            times[i] = np.where(np.isnan(times[i]), np.nan, np.array(best) + source[1])
+        times[times > cutoff_seconds] = np.inf
+        return times
+
+
+_graphs: Dict[str, RoadGraph] = {}
+
+
+def get_road_graph() -> Optional[RoadGraph]:
+    """Graph at ROUTING_GRAPH_PATH, loaded on first use; None if it has not been built"""
+    path = settings.ROUTING_GRAPH_PATH
+    if path not in _graphs:
+        if not (Path(path) / "meta.json").exists():
+            return None
+        _graphs[path] = RoadGraph(path)
+    return _graphs[path]
@@ -4,9 +4,14 @@ SOS Service - Business logic for SOS alerts
 from sqlalchemy.orm import Session
 from typing import Optional
 from uuid import UUID
+from datetime import datetime, timedelta
 
+from app.core.config import settings
 from app.models.sos_alert import SOSAlert, AlertStatus
 from app.schemas.sos import SOSAlertCreate
+from app.utils.helpers import calculate_distance
+
+ACTIVE_STATUSES = [AlertStatus.PENDING.value, AlertStatus.ASSIGNED.value, AlertStatus.IN_PROGRESS.value]
 
 
 async def create_sos_alert(
@@ -27,6 +32,54 @@ async def create_sos_alert(
     return new_alert
 
 
+def find_near_duplicate(
+    db: Session,
+    user_id: str,
+    alert_type: str,
+    latitude: float,
+    longitude: float
+) -> Optional[SOSAlert]:
+    """
+    Find an active alert of the same user and type created nearby moments ago
+    
+    Within SOS_DUPLICATE_RADIUS_METERS and SOS_DUPLICATE_WINDOW_SECONDS,
+    e.g. a retried or repeated SOS while the first one is still open.
+    
+    Returns:
+        Optional[SOSAlert]: Closest matching alert or None
+    """
+    if settings.SOS_DUPLICATE_WINDOW_SECONDS <= 0:
+        return None
+    since = datetime.utcnow() - timedelta(seconds=settings.SOS_DUPLICATE_WINDOW_SECONDS)
+    candidates = db.query(SOSAlert).filter(
+        SOSAlert.user_id == user_id,
+        SOSAlert.type == alert_type,
+        SOSAlert.status.in_(ACTIVE_STATUSES),
+        SOSAlert.created_at >= since
+    ).all()
+    
+    best, best_distance = None, settings.SOS_DUPLICATE_RADIUS_METERS
+    for alert in candidates:
+        distance = calculate_distance(
+            float(alert.latitude), float(alert.longitude), latitude, longitude
+        ) * 1000
+        if distance <= best_distance:
+            best, best_distance = alert, distance
+    return best
+
+
+def merge_duplicate(alert: SOSAlert, alert_data: SOSAlertCreate):
+    """Add new details of a near-duplicate request to the existing alert"""
+    if alert_data.description and alert_data.description not in (alert.description or ""):
+        alert.description = "\n".join(filter(None, [alert.description, alert_data.description]))
+    if alert_data.address and not alert.address:
+        alert.address = alert_data.address
+    if alert_data.media_urls:
+        known = alert.media_urls or []
+        alert.media_urls = known + [url for url in alert_data.media_urls if url not in known]
+    alert.updated_at = datetime.utcnow()
+
+
 async def update_sos_status(
     db: Session,
     alert_id: UUID,
@@ -0,0 +1,168 @@
+"""
+Team Service - Rescue team projections and roster management
+"""
+from sqlalchemy import case, or_
+from sqlalchemy.orm import Session, Query
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.models.team import RescueTeam
+from app.models.user import User
+
+
+def team_to_dict(team: RescueTeam, leader_name: Optional[str] = None) -> dict:
+    """Shape a team row like RescueTeamResponse"""
+    return {
+        "id": team.id,
+        "name": team.name,
+        "type": team.type,
+        "status": team.status,
+        "current_latitude": team.current_latitude,
+        "current_longitude": team.current_longitude,
+        "members": team.members,
+        "equipment": team.equipment,
+        "base_latitude": team.base_latitude,
+        "base_longitude": team.base_longitude,
+        "base_address": team.base_address,
+        "capacity": team.capacity,
+        "specialization": team.specialization,
+        "leader_id": team.leader_id,
+        "leader_name": leader_name,
+        "member_count": len(team.members) if team.members else 0,
+        "contact_phone": team.contact_phone,
+        "contact_email": team.contact_email,
+        "created_at": team.created_at,
+        "updated_at": team.updated_at
+    }
+
+
+def query_teams_with_leaders(db: Session) -> Query:
+    """
+    Teams joined with their leader's name columns in the same query
+
+    Rows are (RescueTeam, leader_full_name, leader_email).
+    """
+    return db.query(RescueTeam, User.full_name, User.email).outerjoin(
+        User, User.id == RescueTeam.leader_id
+    )
+
+
+def project_team_rows(rows: Iterable) -> List[dict]:
+    """Serialize rows produced by query_teams_with_leaders"""
+    return [team_to_dict(team, full_name or email) for team, full_name, email in rows]
+
+
+def load_leader_names(db: Session, teams: Iterable[RescueTeam]) -> Dict[str, str]:
+    """Batch-load leader names for already loaded teams with one IN query"""
+    leader_ids = {team.leader_id for team in teams if team.leader_id}
+    if not leader_ids:
+        return {}
+    return {
+        user_id: full_name or email
+        for user_id, full_name, email in db.query(User.id, User.full_name, User.email)
+        .filter(User.id.in_(leader_ids))
+    }
+
+
+def serialize_teams(db: Session, teams: List[RescueTeam]) -> List[dict]:
+    """Serialize already loaded teams (leader names in one query)"""
+    leader_names = load_leader_names(db, teams)
+    return [team_to_dict(team, leader_names.get(team.leader_id)) for team in teams]
+
+
+def serialize_team(db: Session, team: RescueTeam) -> dict:
+    """Serialize a single already loaded team"""
+    return serialize_teams(db, [team])[0]
+
+
+def replace_team_rosters(
+    db: Session,
+    rosters: Sequence[Tuple[RescueTeam, List[str], Optional[str]]]
+) -> List[str]:
+    """
+    Replace the member lists of one or more teams with set-based statements
+
+    Runs one SELECT to validate the requested users, one UPDATE to detach the
+    current members of the teams (and the requested users from wherever they
+    are) and one UPDATE to attach the users to their new teams, regardless of
+    roster size. Only rescuers can be members; the leader flag is set for
+    members whose ID matches the roster's leader_id.
+
+    Users moved away from a team that is not in `rosters` are also removed
+    from its `members` list (and `leader_id`), one more SELECT for those teams.
+
+    Args:
+        db: Database session (not committed here)
+        rosters: (team, member_ids, leader_id) per team
+
+    Returns:
+        List[str]: Requested member IDs skipped as unknown or not rescuers
+    """
+    db.flush()  # Pending ORM changes must not be written after the bulk updates
+
+    requested = list(dict.fromkeys(
+        member_id for _, member_ids, _ in rosters for member_id in member_ids
+    ))
+    rescuers = {}
+    previous_teams: Dict[str, str] = {}  # Member ID -> team they are leaving
+    if requested:
+        for user_id, full_name, email, specialization, team_id in db.query(
+            User.id, User.full_name, User.email, User.specialization, User.team_id
+        ).filter(User.id.in_(requested), User.role == "rescuer"):
+            rescuers[user_id] = (full_name, email, specialization)
+            if team_id:
+                previous_teams[user_id] = team_id
+
+    assignments: Dict[str, str] = {}
+    leader_ids = []
+    for team, member_ids, leader_id in rosters:
+        members = []
+        for member_id in dict.fromkeys(member_ids):
+            if member_id not in rescuers:
+                continue
+            full_name, email, specialization = rescuers[member_id]
+            assignments[member_id] = team.id
+            if member_id == leader_id:
+                leader_ids.append(member_id)
+            members.append({
+                "user_id": member_id,
+                "name": full_name or email,
+                "specialization": specialization if specialization else None
+            })
+        team.members = members
+
+    team_ids = [team.id for team, _, _ in rosters]
+    left = {
+        team_id for member_id, team_id in previous_teams.items()
+        if member_id in assignments and team_id not in team_ids
+    }
+    if left:
+        moved = set(assignments)
+        for team in db.query(RescueTeam).filter(RescueTeam.id.in_(left)):
+            # Reassigned, not mutated in place, so the JSON column is written
+            team.members = [member for member in team.members or [] if member.get("user_id") not in moved]
+            if team.leader_id in moved:
+                team.leader_id = None
+
+    db.query(User).filter(
+        or_(User.team_id.in_(team_ids), User.id.in_(list(assignments)))
+    ).update(
+        {User.team_id: None, User.is_team_leader: False},
+        synchronize_session=False
+    )
+
+    if assignments:
+        if len(rosters) == 1:
+            new_team_id = team_ids[0]
+        else:
+            new_team_id = case(assignments, value=User.id)
+        db.query(User).filter(User.id.in_(list(assignments))).update(
+            {User.team_id: new_team_id, User.is_team_leader: User.id.in_(leader_ids)},
+            synchronize_session=False
+        )
+
+    # Bulk updates bypass the identity map: reload users on next access
+    for obj in list(db.identity_map.values()):
+        if isinstance(obj, User):
+            db.expire(obj)
+
+    return [member_id for member_id in requested if member_id not in rescuers]
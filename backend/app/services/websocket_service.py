@@ -2,9 +2,15 @@
 WebSocket Service for real-time updates
 """
 from fastapi import WebSocket
-from typing import Dict, List
+from typing import Dict, Iterable, List, Optional, Tuple
 from uuid import UUID
-import json
+import asyncio
+import logging
+
+from app.core.metrics import WS_CONNECTIONS, WS_PENDING_SENDS
+from app.core.tracing import tracer
+
+logger = logging.getLogger(__name__)
 
 
 class ConnectionManager:
@@ -12,50 +18,132 @@ class ConnectionManager:
     
     def __init__(self):
         self.active_connections: Dict[str, List[WebSocket]] = {}
+        self.user_roles: Dict[str, str] = {}  # Role of connected users (from their access token)
+        # Topic -> subscribed connections and their viewport (west, south, east, north), None - everywhere
+        self.subscriptions: Dict[str, Dict[WebSocket, Optional[Tuple[float, float, float, float]]]] = {}
     
-    async def connect(self, websocket: WebSocket, user_id: str):
+    async def connect(self, websocket: WebSocket, user_id: str, role: Optional[str] = None):
         """Accept new WebSocket connection"""
         await websocket.accept()
         if user_id not in self.active_connections:
             self.active_connections[user_id] = []
         self.active_connections[user_id].append(websocket)
+        if role:
+            self.user_roles[user_id] = role
+        WS_CONNECTIONS.inc()
     
     def disconnect(self, websocket: WebSocket, user_id: str):
         """Remove WebSocket connection"""
-        if user_id in self.active_connections:
+        if user_id in self.active_connections and websocket in self.active_connections[user_id]:
             self.active_connections[user_id].remove(websocket)
+            WS_CONNECTIONS.dec()
             if not self.active_connections[user_id]:
                 del self.active_connections[user_id]
+                self.user_roles.pop(user_id, None)
+        for subscribers in self.subscriptions.values():
+            subscribers.pop(websocket, None)
+    
+    def subscribe(self, websocket: WebSocket, topic: str,
+                  bbox: Optional[Tuple[float, float, float, float]] = None):
+        """Subscribe a connection to a topic (again to change its viewport)"""
+        self.subscriptions.setdefault(topic, {})[websocket] = bbox
+    
+    def unsubscribe(self, websocket: WebSocket, topic: str):
+        """Unsubscribe a connection from a topic"""
+        self.subscriptions.get(topic, {}).pop(websocket, None)
+    
+    def subscribers(self, topic: str) -> Dict[WebSocket, Optional[Tuple[float, float, float, float]]]:
+        return self.subscriptions.get(topic, {})
+    
+    async def _send(self, connection: WebSocket, message: str):
+        """Send a message, tracking sends blocked on slow clients"""
+        WS_PENDING_SENDS.inc()
+        try:
+            with tracer.start_as_current_span("ws.send", attributes={"ws.message_bytes": len(message)}):
+                await connection.send_text(message)
+        finally:
+            WS_PENDING_SENDS.dec()
+    
+    async def send_to_connections(self, messages: Iterable[Tuple[WebSocket, str]],
+                                  timeout: Optional[float] = None) -> List[WebSocket]:
+        """
+        Send per-connection messages concurrently, so one slow client doesn't delay the others
+
+        Args:
+            messages: (connection, message) pairs
+            timeout: Seconds a single send may take (default - no limit)
+
+        Returns:
+            List[WebSocket]: Connections whose send failed or timed out
+        """
+        messages = list(messages)
+        results = await asyncio.gather(
+            *(asyncio.wait_for(self._send(connection, message), timeout) for connection, message in messages),
+            return_exceptions=True
+        )
+        failed = []
+        for (connection, _), result in zip(messages, results):
+            if isinstance(result, asyncio.TimeoutError):
+                logger.warning(f"WebSocket send timed out after {timeout}s")
+                failed.append(connection)
+            elif isinstance(result, Exception):
+                logger.warning(f"WebSocket send failed: {result}")
+                failed.append(connection)
+        return failed
+
+    async def drop(self, websocket: WebSocket, timeout: float):
+        """
+        Close a connection that cannot keep up
+
+        A send cancelled by a timeout may have left half a frame behind, so
+        the connection is not used again. The client reconnects and gets a
+        fresh snapshot; its receive loop cleans up with disconnect().
+        """
+        for subscribers in self.subscriptions.values():
+            subscribers.pop(websocket, None)
+        try:
+            await asyncio.wait_for(websocket.close(code=1013), timeout)  # 1013 - try again later
+        except Exception:
+            pass  # Already closed, or the transport is stuck: the server's ping timeout reaps it
     
     async def send_personal_message(self, message: str, user_id: str):
         """Send message to specific user"""
-        print(f"📨 Sending message to user {user_id}")
-        print(f"📋 Active connections: {list(self.active_connections.keys())}")
+        connections = self.active_connections.get(user_id)
+        if not connections:
+            logger.debug("WebSocket recipient not connected", extra={"user_id": user_id})
+            return
         
-        if user_id in self.active_connections:
-            print(f"✅ User {user_id} has {len(self.active_connections[user_id])} active connections")
-            for connection in self.active_connections[user_id]:
+        for connection in list(connections):
+            try:
+                await self._send(connection, message)
+            except Exception as e:
+                logger.warning(f"WebSocket send failed: {e}", extra={"user_id": user_id})
+        logger.debug("WebSocket message sent", extra={"user_id": user_id, "connections": len(connections)})
+    
+    async def send_to_users(self, message: str, user_ids: Iterable[str]):
+        """Send one pre-encoded message to several users"""
+        for user_id in user_ids:
+            for connection in list(self.active_connections.get(user_id, ())):
                 try:
-                    await connection.send_text(message)
-                    print(f"✅ Message sent successfully to user {user_id}")
+                    await self._send(connection, message)
                 except Exception as e:
-                    print(f"❌ Error sending to connection: {e}")
-        else:
-            print(f"⚠️ User {user_id} not found in active connections!")
-    
-    async def broadcast(self, message: dict):
-        """Broadcast message to all connected users"""
-        for user_connections in self.active_connections.values():
-            for connection in user_connections:
+                    logger.warning(f"WebSocket send failed: {e}", extra={"user_id": user_id})
+    
+    async def broadcast(self, message: str, exclude_user: Optional[str] = None):
+        """Broadcast pre-encoded message to all connected users"""
+        for user_id, user_connections in list(self.active_connections.items()):
+            if user_id == exclude_user:
+                continue
+            for connection in list(user_connections):
                 try:
-                    await connection.send_json(message)
+                    await self._send(connection, message)
                 except:
                     pass
     
-    async def broadcast_to_role(self, message: dict, role: str):
-        """Broadcast message to users with specific role"""
-        # TODO: Track user roles in connections
-        await self.broadcast(message)
+    async def broadcast_to_role(self, message: str, *roles: str):
+        """Broadcast pre-encoded message to connected users with any of the roles"""
+        user_ids = [user_id for user_id, role in list(self.user_roles.items()) if role in roles]
+        await self.send_to_users(message, user_ids)
 
 
 # Global connection manager instance
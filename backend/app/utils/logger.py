@@ -1,34 +1,151 @@
 """
 Logging configuration
+
+Records are formatted as JSON (or text, LOG_FORMAT) and written by a
+QueueListener thread: the calling coroutine only enqueues the record.
+Every record carries the current request_id / alert_id correlation IDs
+and the trace_id of the active span when tracing is enabled.
 """
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from pathlib import Path
+from typing import Optional
+import atexit
+import copy
 import logging
+import queue
+import random
 import sys
-from pathlib import Path
+
+import orjson
 
 from app.core.config import settings
+from app.core.tracing import current_trace_id
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+alert_id_var: ContextVar[Optional[str]] = ContextVar("alert_id", default=None)
+
+# LogRecord attributes that are not user supplied `extra` fields
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id", "alert_id", "trace_id"}
+
+_listener: Optional[QueueListener] = None
+
+
+def bind_alert_id(alert_id) -> None:
+    """Attach an SOS alert ID to all log records of the current request and its tasks"""
+    alert_id_var.set(str(alert_id) if alert_id is not None else None)
+
+
+class CorrelationFilter(logging.Filter):
+    """Copy correlation IDs from the caller's context onto the record"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        record.alert_id = alert_id_var.get()
+        record.trace_id = current_trace_id()
+        return True
+
+
+class DebugSamplingFilter(logging.Filter):
+    """Keep only a fraction of DEBUG records (high-volume per-message events)"""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno > logging.DEBUG or self.rate >= 1 or random.random() < self.rate
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key in ("request_id", "alert_id", "trace_id"):
+            value = getattr(record, key, None)
+            if value:
+                payload[key] = value
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                payload[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            payload["exc"] = record.exc_text
+        return orjson.dumps(payload, default=str).decode()
+
+
+class TextFormatter(logging.Formatter):
+    """Human readable format with correlation IDs"""
+
+    def __init__(self):
+        super().__init__('%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s')
+
+
+class StructuredQueueHandler(QueueHandler):
+    """
+    QueueHandler that keeps records structured
+
+    The default prepare() bakes the formatted text (with traceback) into
+    msg; here only the arguments are merged and the traceback is rendered
+    so the listener's formatter still sees separate fields.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
 
 
 def setup_logging():
     """Setup application logging"""
-    
+    global _listener
+    if _listener is not None:
+        return logging.getLogger(__name__)
+
     # Create logs directory if not exists
-    log_dir = Path("logs")
-    log_dir.mkdir(exist_ok=True)
-    
-    # Configure logging
-    logging.basicConfig(
-        level=getattr(logging, settings.LOG_LEVEL),
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler(settings.LOG_FILE),
-            logging.StreamHandler(sys.stdout)
-        ]
-    )
-    
+    log_dir = Path(settings.LOG_FILE).parent
+    log_dir.mkdir(parents=True, exist_ok=True)
+
+    formatter = JSONFormatter() if settings.LOG_FORMAT == "json" else TextFormatter()
+    handlers = [
+        logging.FileHandler(settings.LOG_FILE, encoding="utf-8"),
+        logging.StreamHandler(sys.stdout),
+    ]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = StructuredQueueHandler(log_queue)
+    # Filters run in the calling context, where the contextvars are set
+    queue_handler.addFilter(CorrelationFilter())
+    queue_handler.addFilter(DebugSamplingFilter(settings.LOG_DEBUG_SAMPLE_RATE))
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(getattr(logging, settings.LOG_LEVEL))
+
     # Set specific loggers
     logging.getLogger("uvicorn").setLevel(logging.INFO)
     logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
-    
+    for name, level in settings.LOG_LEVELS.items():
+        logging.getLogger(name).setLevel(level.upper())
+
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
     return logging.getLogger(__name__)
 
 
@@ -0,0 +1,108 @@
+"""
+Benchmark: JSON serialization of a 100-alert page and WebSocket fan-out encoding
+
+Compares the previous path (response_model validation + stdlib json) with the
+orjson fast path used by list endpoints, and per-recipient json.dumps with
+encoding a WebSocket message once.
+
+Usage:
+    python benchmarks/bench_serialization.py [--alerts 100] [--recipients 20]
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("DEBUG", "False")
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from app.core.responses import FastJSONResponse, dumps
+from app.schemas.sos import SOSAlertResponse
+
+
+def make_alerts(count: int) -> List[dict]:
+    """Build alert dicts shaped like enrich_alerts_with_names output"""
+    now = datetime.utcnow()
+    alerts = []
+    for i in range(count):
+        alerts.append({
+            "id": str(uuid.uuid4()),
+            "user_id": str(uuid.uuid4()),
+            "type": "fire",
+            "status": "assigned",
+            "priority": 2,
+            "latitude": Decimal("56.85870000") + Decimal(i) / 10000,
+            "longitude": Decimal("35.91760000") + Decimal(i) / 10000,
+            "address": f"Тверь, ул. Советская, д. {i}",
+            "title": f"Пожар #{i}",
+            "description": "Возгорание на кухне, задымление подъезда",
+            "media_urls": [f"/uploads/{i}.jpg"],
+            "ai_analysis": {"type": "fire", "priority": 2, "confidence": 0.93, "keywords": ["пожар", "дым"]},
+            "assigned_to": str(uuid.uuid4()),
+            "team_id": str(uuid.uuid4()),
+            "created_at": now - timedelta(minutes=i),
+            "updated_at": now,
+            "assigned_at": now,
+            "completed_at": None,
+            "assigned_to_name": "Иван Спасателев",
+            "team_name": "Пожарная бригада №1",
+        })
+    return alerts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--alerts", type=int, default=100)
+    parser.add_argument("--recipients", type=int, default=20)
+    parser.add_argument("--number", type=int, default=200)
+    args = parser.parse_args()
+
+    alerts = make_alerts(args.alerts)
+    adapter = TypeAdapter(List[SOSAlertResponse])
+
+    def validated_stdlib():
+        # What FastAPI does for response_model endpoints with JSONResponse
+        content = adapter.dump_python(adapter.validate_python(alerts), mode="json")
+        return JSONResponse(jsonable_encoder(content)).body
+
+    def fast_path():
+        return FastJSONResponse(alerts).body
+
+    assert json.loads(validated_stdlib()) == json.loads(fast_path()), "payloads differ"
+
+    message = {"type": "new_alert", "data": alerts[0]}
+
+    def ws_per_recipient():
+        return [json.dumps(jsonable_encoder(message)) for _ in range(args.recipients)]
+
+    def ws_encode_once():
+        encoded = dumps(message).decode()
+        return [encoded for _ in range(args.recipients)]
+
+    cases = [
+        (f"{args.alerts}-alert page: validate + stdlib json", validated_stdlib),
+        (f"{args.alerts}-alert page: orjson fast path", fast_path),
+        (f"WS message x{args.recipients}: json.dumps per recipient", ws_per_recipient),
+        (f"WS message x{args.recipients}: encode once", ws_encode_once),
+    ]
+
+    print(f"{'case':<55} {'ms/op':>10}")
+    for name, func in cases:
+        best = min(timeit.repeat(func, number=args.number, repeat=5)) / args.number
+        print(f"{name:<55} {best * 1000:>10.3f}")
+    print(f"\npayload size: {len(fast_path())} bytes")
+
+
+if __name__ == "__main__":
+    main()
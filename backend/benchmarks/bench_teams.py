@@ -0,0 +1,93 @@
+"""
+Benchmark: team listing with per-team leader lookups vs. joined projection
+
+Seeds an in-memory SQLite database with N teams (each with a leader) and
+compares the old N+1 serialization with query_teams_with_leaders.
+
+Usage:
+    python benchmarks/bench_teams.py [--teams 500]
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("DEBUG", "False")
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base
+import app.models  # noqa: F401 - register all models on Base.metadata
+from app.models.team import RescueTeam
+from app.models.user import User
+from app.services.team_service import team_to_dict, query_teams_with_leaders, project_team_rows
+
+
+def seed(db, count: int):
+    for i in range(count):
+        leader = User(email=f"leader{i}@bench.ru", hashed_password="x", role="rescuer", full_name=f"Leader {i}")
+        db.add(leader)
+        db.flush()
+        db.add(RescueTeam(
+            name=f"Team {i}", type="fire", leader_id=leader.id,
+            members=[{"user_id": leader.id, "name": leader.full_name}],
+            base_latitude=56.85, base_longitude=35.91
+        ))
+    db.commit()
+
+
+def list_n_plus_one(db):
+    """Previous get_teams implementation"""
+    result = []
+    for team in db.query(RescueTeam).all():
+        team_dict = team_to_dict(team)
+        if team.leader_id:
+            leader = db.query(User).filter(User.id == team.leader_id).first()
+            if leader:
+                team_dict["leader_name"] = leader.full_name or leader.email
+        result.append(team_dict)
+    return result
+
+
+def list_joined(db):
+    return project_team_rows(query_teams_with_leaders(db).all())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--teams", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        seed(db, args.teams)
+
+    queries = 0
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count_query(*_):
+        nonlocal queries
+        queries += 1
+
+    print(f"{'case':<30} {'queries':>8} {'ms':>10}")
+    for name, func in (("N+1 leader lookups", list_n_plus_one), ("joined projection", list_joined)):
+        timings = []
+        for _ in range(args.repeat):
+            with Session() as db:
+                queries = 0
+                start = time.perf_counter()
+                rows = func(db)
+                timings.append(time.perf_counter() - start)
+        assert len(rows) == args.teams and all(row["leader_name"] for row in rows)
+        print(f"{name:<30} {queries:>8} {min(timings) * 1000:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""
+Seeded benchmark data generator
+
+Creates users, rescue teams and 100k-10M SOS alerts with the application
+models, using bulk inserts in chunks. The same --seed always produces the
+same rows (IDs included), so runs against different builds are comparable.
+Every row of a table carries the same keys: executemany inserts use the
+columns of the first row.
+
+Accounts (password: BENCH_PASSWORD):
+    operator{i}@bench.ru, rescuer{i}@bench.ru, citizen{i}@bench.ru, admin0@bench.ru
+
+Rescuers are spread over the teams; rescuer{i} belongs to team i % teams and
+the first rescuer of every team is its leader.
+
+Usage:
+    python benchmarks/datagen.py --database-url sqlite:///bench.db --alerts 100000
+    python benchmarks/datagen.py --database-url mysql+pymysql://... --alerts 10000000 --chunk 20000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+DEFAULT_DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///bench.db")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("DEBUG", "False")
+
+from sqlalchemy import create_engine, insert
+
+from app.core.database import Base
+from app.core.security import get_password_hash
+import app.models  # noqa: F401 - register all models on Base.metadata
+from app.models.sos_alert import SOSAlert, EmergencyType
+from app.models.team import RescueTeam
+from app.models.user import User
+
+BENCH_PASSWORD = "BenchPass123"
+BENCH_DOMAIN = "bench.ru"
+
+# Tver and a few hotspots where incidents concentrate
+CENTER = (56.8587, 35.9176)
+HOTSPOTS = [(56.8587, 35.9176), (56.8790, 35.8750), (56.8340, 35.9480), (56.9010, 35.9900)]
+TEAM_TYPES = ["fire", "medical", "police", "water_rescue", "mountain_rescue", "search_rescue", "ecological", "general"]
+ALERT_TYPES = [t.value for t in EmergencyType]
+STATUSES = ["pending", "assigned", "in_progress", "completed", "cancelled"]
+STATUS_WEIGHTS = [5, 5, 10, 70, 10]
+
+
+def seeded_uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def bench_email(role: str, index: int) -> str:
+    return f"{role}{index}@{BENCH_DOMAIN}"
+
+
+def random_point(rng: random.Random):
+    lat, lon = rng.choice(HOTSPOTS) if rng.random() < 0.7 else CENTER
+    spread = 0.01 if rng.random() < 0.7 else 0.08
+    return round(rng.gauss(lat, spread), 8), round(rng.gauss(lon, spread * 1.8), 8)
+
+
+def make_users(rng: random.Random, role: str, count: int, password_hash: str, now: datetime):
+    return [
+        {
+            "id": seeded_uuid(rng),
+            "email": bench_email(role, i),
+            "hashed_password": password_hash,
+            "role": role,
+            "full_name": f"{role.capitalize()} {i}",
+            "is_active": True,
+            "is_verified": True,
+            "team_id": None,
+            "is_team_leader": False,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for i in range(count)
+    ]
+
+
+def make_teams(rng: random.Random, count: int, rescuers: list, now: datetime):
+    teams = []
+    for i in range(count):
+        lat, lon = random_point(rng)
+        teams.append({
+            "id": seeded_uuid(rng),
+            "name": f"Bench team {i}",
+            "type": TEAM_TYPES[i % len(TEAM_TYPES)],
+            "status": "available",
+            "base_latitude": lat,
+            "base_longitude": lon,
+            "current_latitude": lat,
+            "current_longitude": lon,
+            "members": [],
+            "leader_id": None,
+            "created_at": now,
+            "updated_at": now,
+        })
+    for i, rescuer in enumerate(rescuers):
+        team = teams[i % count]
+        rescuer["team_id"] = team["id"]
+        rescuer["is_team_leader"] = not team["members"]
+        if rescuer["is_team_leader"]:
+            team["leader_id"] = rescuer["id"]
+        team["members"].append({"user_id": rescuer["id"], "name": rescuer["full_name"]})
+    return teams
+
+
+def alert_rows(rng: random.Random, count: int, citizens: list, teams: list, days: int, now: datetime):
+    """Yield alert dicts; timestamps spread over the last `days` days"""
+    span_seconds = days * 86400
+    for i in range(count):
+        created_at = now - timedelta(seconds=rng.random() * span_seconds)
+        status = rng.choices(STATUSES, STATUS_WEIGHTS)[0]
+        lat, lon = random_point(rng)
+        row = {
+            "id": seeded_uuid(rng),
+            "user_id": rng.choice(citizens)["id"],
+            "type": rng.choice(ALERT_TYPES),
+            "status": status,
+            "priority": rng.choices([1, 2, 3, 4, 5], [5, 20, 50, 20, 5])[0],
+            "latitude": lat,
+            "longitude": lon,
+            "title": f"Bench alert {i}",
+            "description": "Сгенерировано для нагрузочного тестирования",
+            "created_at": created_at,
+            "updated_at": created_at,
+            "assigned_to": None,
+            "team_id": None,
+            "assigned_at": None,
+            "completed_at": None,
+        }
+        if status != "pending" and status != "cancelled" and teams:
+            team = rng.choice(teams)
+            row["team_id"] = team["id"]
+            row["assigned_to"] = team.get("leader_id")
+            row["assigned_at"] = created_at + timedelta(seconds=rng.expovariate(1 / 180))
+            if status == "completed":
+                row["completed_at"] = row["assigned_at"] + timedelta(seconds=rng.expovariate(1 / 2400))
+            row["updated_at"] = row["completed_at"] or row["assigned_at"]
+        yield row
+
+
+def insert_chunked(connection, table, rows, chunk: int) -> int:
+    batch, total = [], 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= chunk:
+            connection.execute(insert(table), batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        connection.execute(insert(table), batch)
+        total += len(batch)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database-url", default=DEFAULT_DATABASE_URL)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--alerts", type=int, default=100_000)
+    parser.add_argument("--citizens", type=int, default=5_000)
+    parser.add_argument("--operators", type=int, default=20)
+    parser.add_argument("--rescuers", type=int, default=1_000)
+    parser.add_argument("--teams", type=int, default=100)
+    parser.add_argument("--days", type=int, default=365, help="Spread alert timestamps over this many days")
+    parser.add_argument("--chunk", type=int, default=10_000, help="Rows per INSERT batch")
+    parser.add_argument("--drop", action="store_true", help="Drop and recreate all tables first")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    # IDs and values depend only on the seed; timestamps are relative to today
+    # so "today"/"last 24h" queries select the same share of rows on every run
+    now = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    engine = create_engine(args.database_url)
+    if args.drop:
+        Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    password_hash = get_password_hash(BENCH_PASSWORD)
+    admins = make_users(rng, "admin", 1, password_hash, now)
+    operators = make_users(rng, "operator", args.operators, password_hash, now)
+    rescuers = make_users(rng, "rescuer", args.rescuers, password_hash, now)
+    citizens = make_users(rng, "citizen", args.citizens, password_hash, now)
+    teams = make_teams(rng, args.teams, rescuers, now) if args.teams else []
+
+    start = time.perf_counter()
+    with engine.begin() as connection:
+        users = admins + operators + rescuers + citizens
+        insert_chunked(connection, User.__table__, users, args.chunk)
+        insert_chunked(connection, RescueTeam.__table__, teams, args.chunk)
+    print(f"users: {len(users)}, teams: {len(teams)}")
+
+    inserted = 0
+    rows = alert_rows(rng, args.alerts, citizens, teams, args.days, now)
+    while inserted < args.alerts:
+        # One transaction per 10 chunks keeps undo logs small on 10M-row runs
+        with engine.begin() as connection:
+            batch_rows = (row for _, row in zip(range(args.chunk * 10), rows))
+            inserted += insert_chunked(connection, SOSAlert.__table__, batch_rows, args.chunk)
+        elapsed = time.perf_counter() - start
+        print(f"alerts: {inserted}/{args.alerts} ({inserted / elapsed:,.0f} rows/s)", end="\r")
+    print(f"\ndone in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
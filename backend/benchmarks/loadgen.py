@@ -0,0 +1,158 @@
+"""
+Load generation helpers shared by the scenario runner and the WebSocket soak test
+
+Latencies are collected per operation. Reports hold throughput and latency
+percentiles and can be saved as baselines and compared with later runs.
+"""
+import asyncio
+import json
+import math
+import platform
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+from datagen import BENCH_PASSWORD, bench_email
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(q / 100 * len(sorted_values)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+class Recorder:
+    """Per-operation latency samples and error counts"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+
+    def record(self, operation: str, seconds: float, ok: bool = True):
+        if ok:
+            self.latencies[operation].append(seconds)
+        else:
+            self.errors[operation] += 1
+
+    async def timed(self, operation: str, request: Awaitable[httpx.Response],
+                    ok_statuses=(200, 201, 304)) -> Optional[httpx.Response]:
+        """Await an HTTP request and record its latency under `operation`"""
+        start = time.perf_counter()
+        try:
+            response = await request
+        except httpx.HTTPError:
+            self.record(operation, time.perf_counter() - start, ok=False)
+            return None
+        self.record(operation, time.perf_counter() - start, ok=response.status_code in ok_statuses)
+        return response
+
+    def stop(self):
+        self.finished = time.perf_counter()
+
+    def summary(self) -> Dict[str, dict]:
+        duration = (self.finished or time.perf_counter()) - self.started
+        result = {}
+        for operation in sorted(set(self.latencies) | set(self.errors)):
+            samples = sorted(self.latencies.get(operation, []))
+            errors = self.errors.get(operation, 0)
+            total = len(samples) + errors
+            stats = {
+                "count": total,
+                "errors": errors,
+                "error_rate": round(errors / total, 4) if total else 0.0,
+                "throughput_rps": round(total / duration, 2) if duration else 0.0,
+                "mean_ms": round(sum(samples) / len(samples) * 1000, 2) if samples else 0.0,
+                "max_ms": round(samples[-1] * 1000, 2) if samples else 0.0,
+            }
+            for q in PERCENTILES:
+                stats[f"p{q}_ms"] = round(percentile(samples, q) * 1000, 2)
+            result[operation] = stats
+        return result
+
+
+def build_report(scenario: str, params: dict, recorder: Recorder, extra: Optional[dict] = None) -> dict:
+    report = {
+        "scenario": scenario,
+        "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+        "host": platform.node(),
+        "params": params,
+        "operations": recorder.summary(),
+    }
+    if extra:
+        report.update(extra)
+    return report
+
+
+def print_report(report: dict):
+    print(f"\nscenario: {report['scenario']}")
+    header = f"{'operation':<36} {'count':>8} {'err%':>6} {'rps':>9}" + "".join(f" {f'p{q}':>8}" for q in PERCENTILES) + f" {'max':>8}"
+    print(header)
+    for operation, stats in report["operations"].items():
+        line = f"{operation:<36} {stats['count']:>8} {stats['error_rate'] * 100:>6.2f} {stats['throughput_rps']:>9.1f}"
+        line += "".join(f" {stats[f'p{q}_ms']:>8.1f}" for q in PERCENTILES)
+        print(line + f" {stats['max_ms']:>8.1f}")
+
+
+def save_report(report: dict, path: Path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+def compare_with_baseline(report: dict, baseline: dict, tolerance: float) -> List[str]:
+    """
+    Regressions of a report against a baseline
+
+    An operation regresses when its p95 latency grows, or its throughput
+    drops, by more than `tolerance` (0.2 = 20%), or its error rate rises by
+    more than one percentage point.
+    """
+    regressions = []
+    for operation, base in baseline.get("operations", {}).items():
+        current = report["operations"].get(operation)
+        if current is None:
+            regressions.append(f"{operation}: missing from this run")
+            continue
+        if base["p95_ms"] and current["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{operation}: p95 {base['p95_ms']} -> {current['p95_ms']} ms")
+        if base["throughput_rps"] and current["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{operation}: throughput {base['throughput_rps']} -> {current['throughput_rps']} rps")
+        if current["error_rate"] > base["error_rate"] + 0.01:
+            regressions.append(f"{operation}: error rate {base['error_rate']} -> {current['error_rate']}")
+    return regressions
+
+
+async def login(client: httpx.AsyncClient, role: str, index: int) -> dict:
+    """Authorization headers of a datagen account"""
+    response = await client.post("/api/v1/auth/login", json={
+        "email": bench_email(role, index),
+        "password": BENCH_PASSWORD,
+    })
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def login_many(client: httpx.AsyncClient, role: str, count: int, concurrency: int = 20) -> List[dict]:
+    """Log in `count` accounts of a role (password hashing makes this slow, so it is bounded)"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(index: int):
+        async with semaphore:
+            return await login(client, role, index)
+
+    return await asyncio.gather(*(one(i) for i in range(count)))
+
+
+async def run_workers(count: int, duration: float, worker: Callable[[int, float], Awaitable[None]]):
+    """Run `count` copies of worker(index, deadline) concurrently until the deadline"""
+    deadline = time.perf_counter() + duration
+    await asyncio.gather(*(worker(i, deadline) for i in range(count)))
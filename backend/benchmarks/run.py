@@ -0,0 +1,81 @@
+"""
+Run a load test scenario and report throughput / latency percentiles
+
+Seed the database with datagen.py and start the backend first (for the
+ai_routes scenario, against stub_openai.py). Reports are written to
+benchmarks/results/; --save-baseline stores one under benchmarks/baselines/
+and --compare exits with status 1 when the run regresses against it.
+Per-user rate limits throttle the polling and report scenarios: start the
+backend with RATE_LIMIT_ENABLED=False to measure raw capacity.
+
+Usage:
+    python benchmarks/run.py sos_burst --concurrency 50 --duration 60
+    python benchmarks/run.py dashboard_polling --users 20 --interval 2 --save-baseline
+    python benchmarks/run.py dashboard_polling --users 20 --interval 2 --compare --tolerance 0.2
+"""
+import argparse
+import asyncio
+import json
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import httpx
+
+from loadgen import Recorder, build_report, compare_with_baseline, print_report, save_report
+from scenarios import SCENARIOS
+
+BENCH_DIR = Path(__file__).resolve().parent
+BASELINE_DIR = BENCH_DIR / "baselines"
+RESULTS_DIR = BENCH_DIR / "results"
+
+
+async def run(args) -> dict:
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=args.concurrency * 2, max_keepalive_connections=args.concurrency * 2)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        await SCENARIOS[args.scenario](client, recorder, args)
+    recorder.stop()
+    params = {
+        key: getattr(args, key)
+        for key in ("base_url", "concurrency", "duration", "users", "interval", "seed")
+    }
+    return build_report(args.scenario, params, recorder)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("scenario", choices=sorted(SCENARIOS))
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, default=20, help="Concurrent virtual clients")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to run")
+    parser.add_argument("--users", type=int, default=10, help="Accounts to log in (per role used)")
+    parser.add_argument("--interval", type=float, default=1.0, help="Pause between polls/assignments")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--compare", action="store_true", help="Compare with the saved baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print_report(report)
+
+    stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+    save_report(report, RESULTS_DIR / f"{args.scenario}-{stamp}.json")
+    baseline_path = BASELINE_DIR / f"{args.scenario}.json"
+    if args.save_baseline:
+        save_report(report, baseline_path)
+        print(f"\nbaseline saved: {baseline_path}")
+    if args.compare:
+        if not baseline_path.exists():
+            sys.exit(f"no baseline at {baseline_path}")
+        regressions = compare_with_baseline(report, json.loads(baseline_path.read_text()), args.tolerance)
+        if regressions:
+            print("\nREGRESSIONS:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+        print(f"\nno regressions against {baseline_path} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
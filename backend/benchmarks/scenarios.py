@@ -0,0 +1,188 @@
+"""
+Load test scenarios against a running backend seeded by datagen.py
+
+Each scenario is `async def scenario(client, recorder, args)` and records
+its operations in the Recorder; run.py handles setup and reporting.
+"""
+import asyncio
+import json
+import random
+import time
+from collections import defaultdict
+
+import httpx
+import websockets
+
+from datagen import HOTSPOTS, ALERT_TYPES
+from loadgen import Recorder, login_many, run_workers
+
+
+def random_location(rng: random.Random):
+    lat, lon = rng.choice(HOTSPOTS)
+    return round(rng.gauss(lat, 0.01), 6), round(rng.gauss(lon, 0.018), 6)
+
+
+async def create_alert(client: httpx.AsyncClient, recorder: Recorder, headers: dict,
+                       rng: random.Random, operation: str = "POST /sos/"):
+    lat, lon = random_location(rng)
+    response = await recorder.timed(operation, client.post("/api/v1/sos/", headers=headers, json={
+        "type": rng.choice(ALERT_TYPES),
+        "latitude": lat,
+        "longitude": lon,
+        "title": "Нагрузочный тест",
+        "description": "Дым из окна на третьем этаже",
+    }))
+    return response.json() if response is not None and response.status_code == 201 else None
+
+
+async def sos_burst(client: httpx.AsyncClient, recorder: Recorder, args):
+    """Citizens create SOS alerts as fast as possible (disaster burst)"""
+    citizens = await login_many(client, "citizen", args.users)
+
+    async def worker(index: int, deadline: float):
+        rng = random.Random(args.seed + index)
+        headers = citizens[index % len(citizens)]
+        while time.perf_counter() < deadline:
+            await create_alert(client, recorder, headers, rng)
+
+    recorder.started = time.perf_counter()
+    await run_workers(args.concurrency, args.duration, worker)
+
+
+async def dashboard_polling(client: httpx.AsyncClient, recorder: Recorder, args):
+    """Operators poll the dashboard and pending list with conditional requests"""
+    operators = await login_many(client, "operator", args.users)
+    endpoints = [
+        ("GET /analytics/dashboard", "/api/v1/analytics/dashboard"),
+        ("GET /sos/?status=pending", "/api/v1/sos/?status=pending&limit=100"),
+        ("GET /teams/", "/api/v1/teams/"),
+    ]
+
+    async def worker(index: int, deadline: float):
+        headers = operators[index % len(operators)]
+        etags = {}
+        while time.perf_counter() < deadline:
+            for name, url in endpoints:
+                request_headers = dict(headers)
+                if url in etags:
+                    request_headers["If-None-Match"] = etags[url]
+                response = await recorder.timed(name, client.get(url, headers=request_headers))
+                if response is not None and response.headers.get("etag"):
+                    etags[url] = response.headers["etag"]
+                    if response.status_code == 304:
+                        recorder.record(f"{name} (304)", 0.0)
+            await asyncio.sleep(args.interval)
+
+    recorder.started = time.perf_counter()
+    await run_workers(args.concurrency, args.duration, worker)
+
+
+async def analytics_reports(client: httpx.AsyncClient, recorder: Recorder, args):
+    """Heavy read-only reports over the whole alert table"""
+    operators = await login_many(client, "operator", args.users)
+    endpoints = [
+        ("GET /analytics/reports/daily", "/api/v1/analytics/reports/daily"),
+        ("GET /analytics/reports/response-time", "/api/v1/analytics/reports/response-time"),
+        ("GET /sos/stats/summary", "/api/v1/sos/stats/summary"),
+    ]
+
+    async def worker(index: int, deadline: float):
+        headers = operators[index % len(operators)]
+        while time.perf_counter() < deadline:
+            for name, url in endpoints:
+                await recorder.timed(name, client.get(url, headers=headers))
+
+    recorder.started = time.perf_counter()
+    await run_workers(args.concurrency, args.duration, worker)
+
+
+async def ai_routes(client: httpx.AsyncClient, recorder: Recorder, args):
+    """AI analysis routes (run the backend against stub_openai.py)"""
+    texts = [
+        "Пожар в многоэтажном доме, люди на балконах",
+        "Человеку плохо на остановке, не дышит",
+        "Ребёнок провалился под лёд на реке",
+    ]
+
+    async def worker(index: int, deadline: float):
+        rng = random.Random(args.seed + index)
+        while time.perf_counter() < deadline:
+            await recorder.timed("POST /ai/analyze/text", client.post(
+                "/api/v1/ai/analyze/text", json={"text": rng.choice(texts)}
+            ))
+
+    recorder.started = time.perf_counter()
+    await run_workers(args.concurrency, args.duration, worker)
+
+
+async def ws_fanout(client: httpx.AsyncClient, recorder: Recorder, args):
+    """
+    Rescuers listen on WebSockets while operators assign alerts to their teams
+
+    Records PATCH latency and, per recipient, the time from sending the
+    PATCH to receiving the new_alert message.
+    """
+    rescuers = await login_many(client, "rescuer", args.users)
+    profiles = await asyncio.gather(*(client.get("/api/v1/auth/me", headers=h) for h in rescuers))
+    members = defaultdict(list)
+    for headers, profile in zip(rescuers, profiles):
+        profile = profile.json()
+        if profile.get("team_id"):
+            members[profile["team_id"]].append((profile["id"], headers["Authorization"].split()[1]))
+    if not members:
+        raise SystemExit("No rescuers with teams - seed the database with datagen.py first")
+
+    operator = (await login_many(client, "operator", 1))[0]
+    citizen = (await login_many(client, "citizen", 1))[0]
+    sent_at = {}
+    ws_base = str(client.base_url).replace("http", "ws", 1).rstrip("/")
+
+    async def listen(user_id: str, token: str, stop: asyncio.Event):
+        async with websockets.connect(f"{ws_base}/api/v1/ws/{user_id}?token={token}") as socket:
+            while not stop.is_set():
+                try:
+                    raw = await asyncio.wait_for(socket.recv(), timeout=0.5)
+                except asyncio.TimeoutError:
+                    continue
+                message = json.loads(raw)
+                if message.get("type") == "new_alert":
+                    started = sent_at.get(message["data"]["id"])
+                    if started is not None:
+                        recorder.record("ws new_alert delivery", time.perf_counter() - started)
+
+    stop = asyncio.Event()
+    listeners = [
+        asyncio.create_task(listen(user_id, token, stop))
+        for team in members.values() for user_id, token in team
+    ]
+    await asyncio.sleep(1)  # Let the sockets connect
+
+    team_ids = list(members)
+
+    async def worker(index: int, deadline: float):
+        rng = random.Random(args.seed + index)
+        while time.perf_counter() < deadline:
+            alert = await create_alert(client, recorder, citizen, rng)
+            if alert is None:
+                continue
+            sent_at[alert["id"]] = time.perf_counter()
+            await recorder.timed("PATCH /sos/{id} assign", client.patch(
+                f"/api/v1/sos/{alert['id']}", headers=operator,
+                json={"status": "assigned", "team_id": rng.choice(team_ids)}
+            ))
+            await asyncio.sleep(args.interval)
+
+    recorder.started = time.perf_counter()
+    await run_workers(args.concurrency, args.duration, worker)
+    await asyncio.sleep(1)  # Drain in-flight deliveries
+    stop.set()
+    await asyncio.gather(*listeners, return_exceptions=True)
+
+
+SCENARIOS = {
+    "sos_burst": sos_burst,
+    "dashboard_polling": dashboard_polling,
+    "analytics_reports": analytics_reports,
+    "ai_routes": ai_routes,
+    "ws_fanout": ws_fanout,
+}
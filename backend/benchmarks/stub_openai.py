@@ -0,0 +1,103 @@
+"""
+Local OpenAI-compatible stub server for the AI routes
+
+Answers chat completions (JSON classification, rescue plans, guidance),
+audio transcriptions and speech synthesis with canned payloads after a
+configurable latency, so AI-heavy scenarios run offline and never bill a
+real API key. Start the backend with OPENAI_BASE_URL pointing at it.
+
+Usage:
+    python benchmarks/stub_openai.py --port 8900 --latency-ms 400 --jitter-ms 150 --error-rate 0.01
+    OPENAI_BASE_URL=http://127.0.0.1:8900/v1 OPENAI_API_KEY=stub uvicorn app.main:app
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import Response
+
+CLASSIFICATION = {
+    "type": "fire",
+    "priority": 2,
+    "severity": "high",
+    "keywords": ["пожар", "дым"],
+    "confidence": 0.91,
+    "estimated_victims": 2,
+    "location_hints": ["подъезд", "5 этаж"],
+    "required_resources": ["Пожарный расчёт", "Скорая помощь"],
+    "immediate_actions": ["Эвакуация жильцов"],
+    "risk_assessment": "Угроза распространения огня",
+    "people_count": 2,
+    "description": "Задымление лестничной клетки",
+}
+
+app = FastAPI(title="OpenAI stub")
+app.state.latency_ms = 0.0
+app.state.jitter_ms = 0.0
+app.state.error_rate = 0.0
+
+
+async def simulate_latency():
+    delay = app.state.latency_ms + random.uniform(-app.state.jitter_ms, app.state.jitter_ms)
+    await asyncio.sleep(max(delay, 0) / 1000)
+    if random.random() < app.state.error_rate:
+        raise HTTPException(status_code=503, detail={"error": {"message": "stub overloaded", "type": "server_error"}})
+
+
+@app.post("/v1/chat/completions")
+@app.post("/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    await simulate_latency()
+    wants_json = (body.get("response_format") or {}).get("type") == "json_object"
+    content = json.dumps(CLASSIFICATION, ensure_ascii=False) if wants_json else "Сохраняйте спокойствие и покиньте помещение."
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "stub"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {"prompt_tokens": 200, "completion_tokens": 150, "total_tokens": 350},
+    }
+
+
+@app.post("/v1/audio/transcriptions")
+@app.post("/audio/transcriptions")
+async def transcriptions():
+    await simulate_latency()
+    return {"text": "Помогите, пожар на пятом этаже, в квартире остались люди"}
+
+
+@app.post("/v1/audio/speech")
+@app.post("/audio/speech")
+async def speech():
+    await simulate_latency()
+    return Response(content=b"\x00" * 16000, media_type="audio/mpeg")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=300)
+    parser.add_argument("--jitter-ms", type=float, default=100)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    app.state.latency_ms = args.latency_ms
+    app.state.jitter_ms = args.jitter_ms
+    app.state.error_rate = args.error_rate
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""
+WebSocket fan-out soak test
+
+Opens thousands of concurrent /api/v1/ws/{user_id} connections as
+datagen.py rescuers, assigns alerts to their teams through PATCH /sos/{id}
+and measures:
+    - connect latency and failures while ramping up
+    - end-to-end delivery latency (PATCH sent -> new_alert received) and
+      the share of expected deliveries that arrived
+    - server memory per connection (RSS from /proc, --server-pid)
+    - a reconnect storm: every socket drops and reconnects at once
+
+A fraction of clients can be made slow consumers (--slow-fraction) that
+pause before every read, to see how they hold up delivery to the others.
+
+Rescuer IDs and teams are read from the database and access tokens are
+minted locally, so SECRET_KEY must match the server's. Seed enough
+rescuers first, e.g. datagen.py --rescuers 12000 --teams 600.
+
+Usage:
+    python benchmarks/ws_soak.py --database-url sqlite:///bench.db --connections 10000 \\
+        --server-pid $(pgrep -f "uvicorn app.main") --assignments 500 --slow-fraction 0.02 --storm
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+DEFAULT_DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///bench.db")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("DEBUG", "False")
+
+import httpx
+import websockets
+from sqlalchemy import create_engine, select
+
+from app.core.security import create_access_token
+from app.models.user import User
+from loadgen import Recorder, build_report, login, print_report, save_report
+from scenarios import create_alert
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+def raise_fd_limit(needed: int):
+    """Lift the soft open-files limit (each socket is a descriptor)"""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    target = hard if hard != resource.RLIM_INFINITY else max(needed + 1024, soft)
+    if soft < target:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+    if target < needed + 256:
+        print(f"warning: open files limit {target} is below {needed} connections; raise `ulimit -n`")
+
+
+def rss_bytes(pid: Optional[int]) -> Optional[int]:
+    """Resident set size of a process (Linux)"""
+    if not pid:
+        return None
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+def load_rescuers(database_url: str, count: int) -> List[dict]:
+    engine = create_engine(database_url)
+    with engine.connect() as connection:
+        rows = connection.execute(
+            select(User.id, User.team_id)
+            .where(User.role == "rescuer", User.team_id.isnot(None))
+            .order_by(User.email)
+            .limit(count)
+        ).all()
+    return [
+        {"id": user_id, "team_id": team_id, "token": create_access_token({"sub": user_id, "role": "rescuer"})}
+        for user_id, team_id in rows
+    ]
+
+
+class SoakClient:
+    """One rescuer socket that reconnects until stopped"""
+
+    def __init__(self, rescuer: dict, ws_base: str, slow_delay: float):
+        self.rescuer = rescuer
+        self.url = f"{ws_base}/api/v1/ws/{rescuer['id']}?token={rescuer['token']}"
+        self.slow_delay = slow_delay
+        self.socket = None
+        self.connected = asyncio.Event()
+
+    async def run(self, recorder: Recorder, sent_at: Dict[str, float], stop: asyncio.Event, connect_op: str):
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                self.socket = await websockets.connect(self.url, open_timeout=30, max_queue=None)
+            except Exception:
+                recorder.record(connect_op, time.perf_counter() - start, ok=False)
+                await asyncio.sleep(random.uniform(0.5, 2))
+                continue
+            recorder.record(connect_op, time.perf_counter() - start)
+            self.connected.set()
+            try:
+                async for raw in self.socket:
+                    if self.slow_delay:
+                        await asyncio.sleep(self.slow_delay)
+                    message = json.loads(raw)
+                    if message.get("type") == "new_alert":
+                        started = sent_at.get(message["data"]["id"])
+                        if started is not None:
+                            operation = "ws delivery (slow client)" if self.slow_delay else "ws delivery"
+                            recorder.record(operation, time.perf_counter() - started)
+            except websockets.ConnectionClosed:
+                pass
+            finally:
+                self.connected.clear()
+            connect_op = "ws reconnect"
+
+    async def drop(self):
+        # Cleared before closing, so waiting on `connected` waits for the reconnect
+        self.connected.clear()
+        if self.socket is not None:
+            await self.socket.close()
+
+
+async def soak(args) -> dict:
+    rescuers = load_rescuers(args.database_url, args.connections)
+    if len(rescuers) < args.connections:
+        print(f"warning: only {len(rescuers)} rescuers with teams in the database")
+    raise_fd_limit(len(rescuers))
+
+    recorder = Recorder()
+    rng = random.Random(args.seed)
+    ws_base = args.base_url.replace("http", "ws", 1).rstrip("/")
+    sent_at: Dict[str, float] = {}
+    stop = asyncio.Event()
+    extra = {"connections_requested": len(rescuers)}
+
+    clients = [
+        SoakClient(rescuer, ws_base, args.slow_delay if rng.random() < args.slow_fraction else 0.0)
+        for rescuer in rescuers
+    ]
+    members = defaultdict(int)
+    for client in clients:
+        members[client.rescuer["team_id"]] += 1
+
+    rss_before = rss_bytes(args.server_pid)
+    tasks = []
+    ramp_start = time.perf_counter()
+    for index, client in enumerate(clients):
+        tasks.append(asyncio.create_task(client.run(recorder, sent_at, stop, "ws connect")))
+        if args.ramp_rate and index % max(int(args.ramp_rate / 10), 1) == 0:
+            await asyncio.sleep(0.1)
+    try:
+        await asyncio.wait_for(
+            asyncio.gather(*(client.connected.wait() for client in clients)), timeout=args.connect_timeout
+        )
+    except asyncio.TimeoutError:
+        print(f"warning: not all sockets connected within {args.connect_timeout}s")
+    extra["ramp_seconds"] = round(time.perf_counter() - ramp_start, 2)
+    extra["connected"] = sum(client.connected.is_set() for client in clients)
+
+    rss_after = rss_bytes(args.server_pid)
+    if rss_before and rss_after and extra["connected"]:
+        extra["server_rss_mb"] = round(rss_after / 2**20, 1)
+        extra["server_bytes_per_connection"] = round((rss_after - rss_before) / extra["connected"])
+
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout) as http:
+        operator = await login(http, "operator", 0)
+        citizen = await login(http, "citizen", 0)
+        team_ids = list(members)
+        expected = 0
+        fanout_start = time.perf_counter()
+        for _ in range(args.assignments):
+            alert = await create_alert(http, recorder, citizen, rng)
+            if alert is None:
+                continue
+            team_id = rng.choice(team_ids)
+            sent_at[alert["id"]] = time.perf_counter()
+            response = await recorder.timed("PATCH /sos/{id} assign", http.patch(
+                f"/api/v1/sos/{alert['id']}", headers=operator,
+                json={"status": "assigned", "team_id": team_id}
+            ))
+            if response is not None and response.status_code == 200:
+                expected += members[team_id]
+            await asyncio.sleep(1 / args.rate)
+        await asyncio.sleep(args.drain)
+        extra["fanout_seconds"] = round(time.perf_counter() - fanout_start, 2)
+
+        delivered = len(recorder.latencies["ws delivery"]) + len(recorder.latencies["ws delivery (slow client)"])
+        extra["deliveries_expected"] = expected
+        extra["deliveries_received"] = delivered
+        extra["delivery_ratio"] = round(delivered / expected, 4) if expected else None
+
+        if args.storm:
+            storm_start = time.perf_counter()
+            await asyncio.gather(*(client.drop() for client in clients), return_exceptions=True)
+            try:
+                await asyncio.wait_for(
+                    asyncio.gather(*(client.connected.wait() for client in clients)), timeout=args.connect_timeout
+                )
+            except asyncio.TimeoutError:
+                pass
+            extra["storm_recovery_seconds"] = round(time.perf_counter() - storm_start, 2)
+            extra["storm_reconnected"] = sum(client.connected.is_set() for client in clients)
+            rss_storm = rss_bytes(args.server_pid)
+            if rss_storm:
+                extra["server_rss_after_storm_mb"] = round(rss_storm / 2**20, 1)
+
+    stop.set()
+    await asyncio.gather(*(client.drop() for client in clients), return_exceptions=True)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    recorder.stop()
+
+    params = {key: getattr(args, key) for key in (
+        "base_url", "connections", "assignments", "rate", "slow_fraction", "slow_delay", "storm", "seed"
+    )}
+    return build_report("ws_soak", params, recorder, extra={"summary": extra})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--database-url", default=DEFAULT_DATABASE_URL, help="Database seeded by datagen.py")
+    parser.add_argument("--connections", type=int, default=10_000)
+    parser.add_argument("--ramp-rate", type=float, default=1_000, help="New connections per second (0 - all at once)")
+    parser.add_argument("--connect-timeout", type=float, default=120)
+    parser.add_argument("--assignments", type=int, default=200, help="Alerts to assign during the fan-out phase")
+    parser.add_argument("--rate", type=float, default=10, help="Assignments per second")
+    parser.add_argument("--drain", type=float, default=5, help="Seconds to wait for late deliveries")
+    parser.add_argument("--slow-fraction", type=float, default=0.0, help="Share of clients that read slowly")
+    parser.add_argument("--slow-delay", type=float, default=1.0, help="Pause of slow clients before each read")
+    parser.add_argument("--storm", action="store_true", help="Drop and reconnect every socket at once")
+    parser.add_argument("--server-pid", type=int, help="Backend PID for RSS measurements")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    report = asyncio.run(soak(args))
+    print_report(report)
+    for key, value in report["summary"].items():
+        print(f"{key:<36} {value}")
+
+    stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+    save_report(report, RESULTS_DIR / f"ws_soak-{stamp}.json")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Build the offline geocoder index from an address extract
+
+Input is a CSV file (UTF-8, header row) with coordinates in `lat`/`latitude`
+and `lon`/`longitude`, and either a full `address` column or OSM address
+tags (`addr:city`, `addr:street`, `addr:housenumber`, as exported by
+osmium/Overpass; FIAS extracts joined with coordinates work the same way).
+
+Usage:
+    python build_geocoder_index.py tver_addresses.csv
+    python build_geocoder_index.py tver_addresses.csv --output data/geocoder
+"""
+import argparse
+import csv
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.core.config import settings
+from app.services.geocoder import build_index
+
+ADDRESS_PARTS = ("addr:city", "addr:street", "addr:housenumber")
+
+
+def read_records(path: str):
+    """(address, latitude, longitude) of every usable CSV row"""
+    with open(path, encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            address = row.get("address") or ", ".join(
+                row[part].strip() for part in ADDRESS_PARTS if row.get(part)
+            )
+            try:
+                latitude = float(row.get("lat") or row["latitude"])
+                longitude = float(row.get("lon") or row["longitude"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            yield address, latitude, longitude
+
+
+def main():
+    """Main execution"""
+    parser = argparse.ArgumentParser(description="Build the offline geocoder index")
+    parser.add_argument("csv", help="Address extract (CSV)")
+    parser.add_argument("--output", default=settings.GEOCODER_INDEX_PATH, help="Index directory")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    count = build_index(read_records(args.csv), args.output)
+    print(f"✓ {count} addresses indexed into {args.output} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
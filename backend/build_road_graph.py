@@ -0,0 +1,43 @@
+"""
+Build the road graph used for ETA estimates from an OSM extract
+
+Input is an OSM XML file (.osm) covering the service area. A .pbf extract
+(e.g. from Geofabrik) can be converted and cut to the city first:
+
+    osmium extract -b 35.6,56.7,36.2,57.0 central-fed-district-latest.osm.pbf -o tver.osm.pbf
+    osmium tags-filter tver.osm.pbf w/highway -o tver.osm
+
+Usage:
+    python build_road_graph.py tver.osm
+    python build_road_graph.py tver.osm --output data/roads
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.core.config import settings
+from app.services.routing import build_graph, parse_osm
+
+
+def main():
+    """Main execution"""
+    parser = argparse.ArgumentParser(description="Build the road graph for ETA estimates")
+    parser.add_argument("osm", help="OSM XML extract")
+    parser.add_argument("--output", default=settings.ROUTING_GRAPH_PATH, help="Graph directory")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    coords, edges = parse_osm(args.osm)
+    print(f"Parsed {len(coords)} nodes, {len(edges)} road segments")
+    meta = build_graph(coords, edges, args.output)
+    print(
+        f"✓ {meta['nodes']} nodes, {meta['hierarchy_edges']} hierarchy edges written to {args.output} "
+        f"in {time.perf_counter() - started:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
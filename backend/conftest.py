@@ -0,0 +1,88 @@
+"""
+Shared pytest fixtures
+
+The app reads its settings at import time, so the test database, the log
+file and the other environment defaults are set here, before anything from
+app is imported.
+"""
+import os
+import tempfile
+
+_TEST_DIR = tempfile.mkdtemp(prefix="rescue-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_TEST_DIR}/test.db")
+os.environ.setdefault("LOG_FILE", f"{_TEST_DIR}/app.log")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+os.environ.setdefault("CACHE_BACKEND", "memory")
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.database import Base, SessionLocal, sync_engine
+from app.core.query_stats import query_budget as _query_budget
+from app.core.security import create_access_token, get_password_hash
+from app.models.user import User
+
+
+@pytest.fixture(scope="session")
+def client():
+    """TestClient over a temporary SQLite database"""
+    from app.main import app
+
+    Base.metadata.create_all(bind=sync_engine)
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def db(client):
+    """
+    Database session of the test database
+
+    Rows left by the test are deleted afterwards.
+    """
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.rollback()
+        for table in reversed(Base.metadata.sorted_tables):
+            session.execute(table.delete())
+        session.commit()
+        session.close()
+
+
+@pytest.fixture
+def operator(db):
+    """Operator user"""
+    user = User(
+        email="operator@example.com",
+        hashed_password=get_password_hash("operator-password"),
+        role="operator",
+        full_name="Test Operator",
+        is_active=True,
+        is_verified=True
+    )
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return user
+
+
+@pytest.fixture
+def auth_headers(operator):
+    """Authorization header of the operator user"""
+    token = create_access_token({"sub": operator.id, "role": operator.role})
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def query_budget():
+    """
+    Query budget assertion for endpoint tests
+
+    Usage:
+        def test_get_teams(client, auth_headers, query_budget):
+            with query_budget(2):
+                client.get("/api/v1/teams/", headers=auth_headers)
+    """
+    return _query_budget
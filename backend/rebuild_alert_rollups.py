@@ -0,0 +1,33 @@
+"""
+Recount the alert_rollups table used by the alert forecast
+
+Needed after changing FORECAST_DISTRICTS_PATH or FORECAST_UTC_OFFSET_HOURS;
+new days are rolled up automatically by the forecast endpoint.
+
+Usage:
+    python rebuild_alert_rollups.py
+"""
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.core.database import SessionLocal
+from app.services.forecasting import DistrictMap, refresh_rollups
+from app.core.config import settings
+
+
+def main():
+    """Main execution"""
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        first, last = refresh_rollups(db, DistrictMap(settings.FORECAST_DISTRICTS_PATH), rebuild=True)
+    finally:
+        db.close()
+    print(f"✓ Alert rollups rebuilt for {first} - {last} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Incremental DBSCAN of SOS alerts compared with a batch DBSCAN
+"""
+import math
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.api.v1 import sos
+from app.models.sos_alert import SOSAlert
+from app.models.user import User
+from app.services.clustering import METERS_PER_DEGREE, ClusterEngine
+
+EPS = 100.0
+MIN_POINTS = 4
+WINDOW = timedelta(minutes=30)
+START = datetime(2026, 1, 1, 12, 0)
+LATITUDE, LONGITUDE = 56.86, 35.9
+
+
+def engine() -> ClusterEngine:
+    return ClusterEngine(eps_meters=EPS, min_points=MIN_POINTS, window=WINDOW)
+
+
+def add_at(clusters: ClusterEngine, alert_id: str, east_m: float, north_m: float = 0.0,
+           now: datetime = START) -> list:
+    latitude = LATITUDE + north_m / METERS_PER_DEGREE
+    longitude = LONGITUDE + east_m / (METERS_PER_DEGREE * math.cos(math.radians(LATITUDE)))
+    return clusters.add(alert_id, latitude, longitude, now, "fire", 3, now=now)
+
+
+def batch_dbscan(clusters: ClusterEngine):
+    """(core points, clusters as sets of core points, noise) of the points in the engine"""
+    points = list(clusters.points.values())
+
+    def near(a, b):
+        return (a.x - b.x) ** 2 + (a.y - b.y) ** 2 <= EPS * EPS
+
+    neighbors = {a.id: [b for b in points if b is not a and near(a, b)] for a in points}
+    cores = {a.id for a in points if len(neighbors[a.id]) + 1 >= MIN_POINTS}
+    groups, seen = [], set()
+    for core in cores:
+        if core in seen:
+            continue
+        group, stack = set(), [core]
+        while stack:
+            current = stack.pop()
+            if current in group:
+                continue
+            group.add(current)
+            stack.extend(b.id for b in neighbors[current] if b.id in cores)
+        seen |= group
+        groups.append(frozenset(group))
+    noise = {a.id for a in points if a.id not in cores and not any(b.id in cores for b in neighbors[a.id])}
+    return cores, neighbors, set(groups), noise
+
+
+def assert_matches_batch(clusters: ClusterEngine, now: datetime):
+    summaries = clusters.clusters(now)
+    cores, neighbors, groups, noise = batch_dbscan(clusters)
+    members = [set(summary["alert_ids"]) for summary in summaries]
+
+    assert {point.id for point in clusters.points.values() if point.core} == cores
+    assert {frozenset(m & cores) for m in members} == groups
+    clustered = set().union(*members)
+    assert not clustered & noise
+    assert clustered | noise == set(clusters.points)
+    # Border points belong to the cluster of one of their core neighbours
+    for m in members:
+        for border in m - cores:
+            assert any(b.id in m and b.id in cores for b in neighbors[border])
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_incremental_matches_batch_dbscan(seed):
+    rng = random.Random(seed)
+    clusters, now, announced = engine(), START, []
+    for i in range(200):
+        now += timedelta(seconds=rng.uniform(0, 20))
+        if clusters.points and rng.random() < 0.1:
+            clusters.remove(rng.choice(sorted(clusters.points)))
+        else:
+            # A few hotspots plus scattered noise in a 1.5 km square
+            if rng.random() < 0.6:
+                cx, cy = rng.choice([(0, 0), (400, 200), (-300, 500)])
+                east, north = cx + rng.gauss(0, 60), cy + rng.gauss(0, 60)
+            else:
+                east, north = rng.uniform(-750, 750), rng.uniform(-750, 750)
+            announced += add_at(clusters, f"a{i:03d}", east, north, now)
+        assert_matches_batch(clusters, now)
+        # Every current cluster has been announced, and only once
+        assert {clusters._find(s["alert_ids"][0]) for s in clusters.clusters(now)} == clusters._announced
+    assert announced
+
+
+def test_cluster_detected_once_while_growing():
+    clusters = engine()
+    events = [add_at(clusters, f"a{i}", east_m=i * 5.0) for i in range(12)]
+    assert [len(detected) for detected in events] == [0, 0, 0, 1] + [0] * 8
+    assert events[3][0]["alert_count"] == MIN_POINTS
+    assert len(clusters.clusters(START)) == 1
+
+
+def test_one_insert_can_detect_two_clusters():
+    clusters = engine()
+    for alert_id, east in (("w1", -90), ("w2", -150), ("w3", -160), ("e1", 90), ("e2", 150), ("e3", 160)):
+        assert add_at(clusters, alert_id, east) == []
+    # The bridge is a border point of both groups, so they stay separate clusters
+    detected = add_at(clusters, "bridge", 0)
+    assert len(detected) == 2
+    assert sorted(len(summary["alert_ids"]) for summary in detected) == [3, 4]
+    assert_matches_batch(clusters, START)
+
+
+def test_reformed_cluster_is_announced_again():
+    clusters = engine()
+    for i in range(MIN_POINTS):
+        add_at(clusters, f"a{i}", east_m=i * 5.0)
+    clusters.remove("a0")
+    assert clusters.clusters(START) == []
+    assert len(add_at(clusters, "again", east_m=2.0)) == 1
+
+
+def test_split_clusters_stay_announced():
+    clusters = engine()
+    for i, east in enumerate([0, 10, 20, 30, 115, 195, 205, 215, 225]):
+        add_at(clusters, f"a{i}", east)
+    assert len(clusters.clusters(START)) == 1
+    clusters.remove("a4")  # The link between the two halves
+    assert len(clusters.clusters(START)) == 2
+    assert add_at(clusters, "extra", east_m=215) == []
+
+
+def test_expired_alerts_leave_clusters():
+    clusters = engine()
+    for i in range(MIN_POINTS):
+        add_at(clusters, f"a{i}", east_m=i * 5.0)
+    later = START + WINDOW + timedelta(seconds=1)
+    assert clusters.clusters(later) == []
+    assert clusters.points == {}
+
+
+def test_cold_start_announces_cluster_completed_by_first_sos(client, db, operator, auth_headers, monkeypatch):
+    cold = engine()
+    announced = []
+
+    async def capture(cluster):
+        announced.append(cluster)
+
+    monkeypatch.setattr(sos, "cluster_engine", cold)
+    monkeypatch.setattr(sos, "send_cluster_detected", capture)
+    # Reported by other people, so the new SOS is not merged as a near duplicate
+    neighbour = User(email="neighbour@example.com", hashed_password="-", role="citizen")
+    db.add(neighbour)
+    db.flush()
+    now = datetime.utcnow()
+    for i in range(MIN_POINTS - 1):
+        db.add(SOSAlert(user_id=neighbour.id, type="fire", latitude=LATITUDE, longitude=LONGITUDE + i * 1e-4,
+                        created_at=now - timedelta(minutes=1)))
+    db.commit()
+
+    response = client.post(
+        "/api/v1/sos/",
+        json={"type": "fire", "latitude": LATITUDE, "longitude": LONGITUDE + 5e-5, "description": "Smoke"},
+        headers=auth_headers
+    )
+
+    assert response.status_code == 201
+    assert cold.warmed
+    assert len(announced) == 1
+    assert response.json()["id"] in announced[0]["alert_ids"]
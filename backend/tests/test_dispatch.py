@@ -0,0 +1,87 @@
+"""
+Dispatch: assignment solver, batch planning and auto-assignment
+"""
+from itertools import permutations
+
+import numpy as np
+import pytest
+
+from app.api.v1 import dispatch as dispatch_api
+from app.models.sos_alert import SOSAlert
+from app.models.team import RescueTeam
+from app.services.dispatch import plan_dispatch, solve_assignment
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_solve_assignment_is_optimal(seed):
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(1, 6))
+    m = int(rng.integers(n, 8))
+    cost = rng.integers(0, 100, size=(n, m)).astype(float)
+
+    assignment = solve_assignment(cost)
+    assert len(set(assignment.tolist())) == n
+    best = min(sum(cost[i, j] for i, j in enumerate(columns)) for columns in permutations(range(m), n))
+    assert cost[np.arange(n), assignment].sum() == best
+
+
+def test_solve_assignment_rejects_more_rows_than_columns():
+    with pytest.raises(ValueError):
+        solve_assignment(np.zeros((3, 2)))
+
+
+def add_alert(db, user, priority: int, latitude: float = 56.86) -> SOSAlert:
+    alert = SOSAlert(user_id=user.id, type="fire", priority=priority, latitude=latitude, longitude=35.9)
+    db.add(alert)
+    db.commit()
+    return alert
+
+
+def add_team(db, name: str, latitude: float) -> RescueTeam:
+    team = RescueTeam(name=name, type="fire", status="available", base_latitude=latitude, base_longitude=35.9)
+    db.add(team)
+    db.commit()
+    return team
+
+
+def test_alerts_outnumbering_teams_stay_pending(db, operator):
+    urgent = add_alert(db, operator, priority=1)
+    low = [add_alert(db, operator, priority=5), add_alert(db, operator, priority=4)]
+    near = add_team(db, "Near", 56.85)
+    add_team(db, "Too far", 58.0)  # Beyond DISPATCH_MAX_DISTANCE_KM
+
+    plan = plan_dispatch(db)
+
+    recommended = {item["alert_id"]: item["recommended"] for item in plan["assignments"]}
+    assert recommended[urgent.id]["team_id"] == near.id
+    assert sorted(plan["unassigned"]) == sorted(alert.id for alert in low)
+    assert all(recommended[alert.id] is None for alert in low)
+
+
+def test_auto_assign_skips_alerts_taken_while_planning(client, db, operator, auth_headers, monkeypatch):
+    taken, free = add_alert(db, operator, priority=1), add_alert(db, operator, priority=1, latitude=56.87)
+    add_team(db, "A", 56.85)
+    add_team(db, "B", 56.88)
+    other = add_team(db, "Other", 56.90)
+    other.status = "busy"
+    db.commit()
+
+    def plan_then_assign_elsewhere(session, alert_ids=None, limit=3):
+        plan = plan_dispatch(session, alert_ids, limit)
+        # Assigned manually between planning and the conditional update
+        db.query(SOSAlert).filter(SOSAlert.id == taken.id).update(
+            {SOSAlert.status: "assigned", SOSAlert.team_id: other.id}
+        )
+        db.commit()
+        return plan
+
+    monkeypatch.setattr(dispatch_api, "plan_dispatch", plan_then_assign_elsewhere)
+    response = client.post("/api/v1/dispatch/auto-assign", json={}, headers=auth_headers)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert all(item["recommended"] for item in body["assignments"])
+    assert body["applied"] == [free.id]
+    db.expire_all()
+    assert db.get(SOSAlert, taken.id).team_id == other.id
+    assert db.get(SOSAlert, free.id).status == "assigned"
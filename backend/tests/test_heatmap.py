@@ -0,0 +1,28 @@
+"""
+Heatmap counters freshness across workers
+"""
+from app.core.cache import resource_versions
+from app.models.sos_alert import SOSAlert
+from app.services.heatmap import heatmap_index
+
+
+def test_alert_by_another_worker_is_counted_under_its_etag(client, db, operator, auth_headers, monkeypatch):
+    # A shared store, as with several workers on Redis
+    monkeypatch.setattr(resource_versions, "shared", True)
+    monkeypatch.setattr(heatmap_index, "loaded_at", None)
+
+    first = client.get("/api/v1/analytics/heatmap/0/0/0", headers=auth_headers)
+    assert first.status_code == 200
+    assert first.json()["total"] == 0
+
+    # Another worker creates an alert: the row is committed, then the version bumped
+    db.add(SOSAlert(user_id=operator.id, type="fire", latitude=56.85, longitude=35.9))
+    db.commit()
+    client.portal.call(resource_versions.bump, "alerts")
+
+    second = client.get(
+        "/api/v1/analytics/heatmap/0/0/0",
+        headers={**auth_headers, "If-None-Match": first.headers["ETag"]}
+    )
+    assert second.status_code == 200
+    assert second.json()["total"] == 1
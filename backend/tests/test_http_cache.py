@@ -0,0 +1,24 @@
+"""
+Conditional GET handling of @cached endpoints
+"""
+from datetime import datetime, timedelta
+
+from app.middleware import http_cache
+
+
+class Tomorrow(datetime):
+    @classmethod
+    def utcnow(cls):
+        return datetime.utcnow() + timedelta(days=1)
+
+
+def test_per_day_etag_changes_at_midnight(client, auth_headers, monkeypatch):
+    first = client.get("/api/v1/analytics/dashboard", headers=auth_headers)
+    assert first.status_code == 200
+
+    headers = {**auth_headers, "If-None-Match": first.headers["ETag"]}
+    assert client.get("/api/v1/analytics/dashboard", headers=headers).status_code == 304
+
+    # No write, but "today_alerts" now counts another day
+    monkeypatch.setattr(http_cache, "datetime", Tomorrow)
+    assert client.get("/api/v1/analytics/dashboard", headers=headers).status_code == 200
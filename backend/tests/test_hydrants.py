@@ -0,0 +1,31 @@
+"""
+Hydrant index freshness across workers
+"""
+from app.core.cache import resource_versions
+from app.models.hydrant import Hydrant
+from app.services.hydrants import hydrant_index
+
+PARAMS = {"latitude": 56.86, "longitude": 35.9, "radius_km": 5}
+
+
+def test_import_by_another_worker_is_served_under_its_etag(client, db, auth_headers, monkeypatch):
+    # A shared store, as with several workers on Redis
+    monkeypatch.setattr(resource_versions, "shared", True)
+    monkeypatch.setattr(hydrant_index, "checked_at", None)
+
+    first = client.get("/api/v1/geolocation/hydrants", params=PARAMS, headers=auth_headers)
+    assert first.status_code == 200
+    assert first.json() == []
+
+    # Another worker imports a hydrant: the row is committed, then the version bumped
+    db.add(Hydrant(external_id="h-1", latitude=56.861, longitude=35.901))
+    db.commit()
+    client.portal.call(resource_versions.bump, "hydrants")
+
+    second = client.get(
+        "/api/v1/geolocation/hydrants", params=PARAMS,
+        headers={**auth_headers, "If-None-Match": first.headers["ETag"]}
+    )
+    assert second.status_code == 200
+    assert second.headers["ETag"] != first.headers["ETag"]
+    assert [hydrant["external_id"] for hydrant in second.json()] == ["h-1"]
@@ -0,0 +1,49 @@
+"""
+Live team position fan-out
+"""
+import asyncio
+import json
+
+from app.core.config import settings
+from app.services.position_stream import TOPIC, position_stream
+from app.services.positions import position_store
+from app.services.websocket_service import manager
+
+
+class FakeWebSocket:
+    def __init__(self, stalled: bool = False):
+        self.stalled = stalled
+        self.sent = []
+        self.closed_with = None
+
+    async def send_text(self, message: str):
+        if self.stalled:
+            await asyncio.Event().wait()
+        self.sent.append(json.loads(message))
+
+    async def close(self, code: int = 1000):
+        self.closed_with = code
+
+
+def test_stalled_subscriber_is_dropped_without_delaying_others(monkeypatch):
+    monkeypatch.setattr(settings, "POSITION_STREAM_SEND_TIMEOUT_SECONDS", 0.05)
+    fast, stalled = FakeWebSocket(), FakeWebSocket(stalled=True)
+
+    async def run():
+        manager.subscribe(fast, TOPIC)
+        manager.subscribe(stalled, TOPIC)
+        try:
+            position_store.record("team-1", 56.86, 35.9, persisted=True)
+            sent = await asyncio.wait_for(position_stream.tick(), 1.0)
+            subscribed = set(manager.subscribers(TOPIC))
+        finally:
+            manager.unsubscribe(fast, TOPIC)
+            manager.unsubscribe(stalled, TOPIC)
+            position_store.forget("team-1")
+        return sent, subscribed
+
+    sent, subscribed = asyncio.run(run())
+    assert sent == 1
+    assert fast.sent[0]["data"][0][0] == "team-1"
+    assert stalled.closed_with == 1013
+    assert subscribed == {fast}
@@ -0,0 +1,73 @@
+"""
+Query budgets of the list endpoints
+
+Each endpoint has to issue the same number of statements for one row as for
+many, so a reintroduced per-row lookup (N+1) fails here.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.sos_alert import SOSAlert, SOSAlertTombstone
+from app.models.team import RescueTeam
+from app.models.user import User
+
+ROWS = 10
+
+
+@pytest.fixture
+def teams_and_alerts(db, operator):
+    """ROWS teams with leaders, ROWS alerts assigned to them, one tombstone"""
+    now = datetime.utcnow()
+    for i in range(ROWS):
+        leader = User(
+            email=f"rescuer{i}@example.com", hashed_password="-", role="rescuer", full_name=f"Rescuer {i}"
+        )
+        db.add(leader)
+        db.flush()
+        team = RescueTeam(name=f"Team {i}", type="fire", leader_id=leader.id, members=[{"user_id": leader.id}])
+        db.add(team)
+        db.flush()
+        leader.team_id = team.id
+        db.add(SOSAlert(
+            user_id=operator.id, type="fire", latitude=56.85 + i * 0.01, longitude=35.9,
+            assigned_to=leader.id, team_id=team.id, status="assigned",
+            created_at=now - timedelta(minutes=ROWS - i), updated_at=now - timedelta(minutes=ROWS - i)
+        ))
+    db.add(SOSAlertTombstone(alert_id="deleted-alert", deleted_at=now))
+    db.commit()
+
+
+def test_get_teams(client, auth_headers, query_budget, teams_and_alerts):
+    # current user + teams joined with their leaders
+    with query_budget(2):
+        response = client.get("/api/v1/teams/", headers=auth_headers)
+    assert response.status_code == 200
+    assert len(response.json()) == ROWS
+    assert all(team["leader_name"] for team in response.json())
+
+
+def test_get_alerts(client, auth_headers, query_budget, teams_and_alerts):
+    # current user + alerts + rescuer names + team names
+    with query_budget(4):
+        response = client.get("/api/v1/sos/", headers=auth_headers)
+    assert response.status_code == 200
+    assert len(response.json()) == ROWS
+    assert all(alert["assigned_to_name"] and alert["team_name"] for alert in response.json())
+
+
+def test_get_alert_changes(client, auth_headers, query_budget, teams_and_alerts):
+    # current user + change counter + alerts + tombstones + rescuer names + team names
+    with query_budget(6):
+        response = client.get("/api/v1/sos/changes", headers=auth_headers)
+    assert response.status_code == 200
+    body = response.json()
+    assert len(body["alerts"]) == ROWS
+    assert body["deleted"] == ["deleted-alert"]
+
+    # Unchanged since the ETag: only the user and the change counter are read
+    with query_budget(2):
+        response = client.get(
+            "/api/v1/sos/changes", headers={**auth_headers, "If-None-Match": response.headers["ETag"]}
+        )
+    assert response.status_code == 304
@@ -0,0 +1,33 @@
+"""
+Priority lanes of the rate limiter and load shedder
+"""
+import asyncio
+
+from app.api.v1 import auth
+from app.core.config import settings
+from app.core.rate_limit import AUTH, BULK, CRITICAL, INTERACTIVE, AdaptiveShedder
+from app.middleware import route
+
+
+def test_auth_routes_use_auth_lane():
+    for endpoint in (auth.register, auth.login, auth.login_form, auth.refresh_token_endpoint):
+        assert endpoint.__lane__ == AUTH
+
+
+def test_overloaded_shedder_still_admits_auth_and_critical():
+    async def admitted():
+        shedder = AdaptiveShedder(target_delay=0.05, min_limit=1, max_limit=1)
+        assert shedder.try_acquire(INTERACTIVE)
+        return {name: shedder.try_acquire(name) for name in (CRITICAL, AUTH, INTERACTIVE, BULK)}
+
+    assert asyncio.run(admitted()) == {CRITICAL: True, AUTH: True, INTERACTIVE: False, BULK: False}
+
+
+def test_route_is_resolved_once_per_request(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    calls = []
+    match_route = route.match_route
+    monkeypatch.setattr(route, "match_route", lambda request: calls.append(request.url.path) or match_route(request))
+
+    assert client.get("/api/v1/analytics/dashboard", headers=auth_headers).status_code == 200
+    assert calls == ["/api/v1/analytics/dashboard"]
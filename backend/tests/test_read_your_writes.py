@@ -0,0 +1,37 @@
+"""
+Read-your-writes pinning of replica reads
+"""
+from app.core.config import settings
+from app.core.database import read_router, recent_writers
+
+TILE = "/api/v1/analytics/heatmap/0/0/0"
+
+
+def test_reads_after_a_write_use_the_primary(client, operator, auth_headers, monkeypatch):
+    monkeypatch.setattr(settings, "DATABASE_REPLICA_URLS", ["replica"])
+    choices = []
+    choose = read_router.choose
+    monkeypatch.setattr(read_router, "choose", lambda primary=False: choices.append(primary) or choose(True))
+
+    assert client.get(TILE, headers=auth_headers).status_code == 200
+
+    response = client.patch(
+        f"/api/v1/users/{operator.id}", json={"full_name": "Renamed"}, headers=auth_headers
+    )
+    assert response.status_code == 200
+    assert client.get(TILE, headers=auth_headers).status_code == 200
+
+    assert choices == [False, True]
+
+
+def test_pin_is_read_from_the_shared_store(client, operator, auth_headers, monkeypatch):
+    monkeypatch.setattr(settings, "DATABASE_REPLICA_URLS", ["replica"])
+    choices = []
+    choose = read_router.choose
+    monkeypatch.setattr(read_router, "choose", lambda primary=False: choices.append(primary) or choose(True))
+
+    # The write was handled by another worker sharing the store
+    client.portal.call(recent_writers.mark, operator.id)
+    assert client.get(TILE, headers=auth_headers).status_code == 200
+
+    assert choices == [True]
@@ -0,0 +1,99 @@
+"""
+Road routing: contraction hierarchy queries and OSM tag parsing
+"""
+import heapq
+import math
+import random
+
+import numpy as np
+import pytest
+
+from app.services.routing import RoadGraph, build_graph, way_directions, way_speed
+
+
+def dijkstra(n: int, edges: dict, source: int) -> list:
+    adjacency = [[] for _ in range(n)]
+    for (u, v), w in edges.items():
+        adjacency[u].append((v, w))
+    dist = [math.inf] * n
+    dist[source] = 0.0
+    heap = [(0.0, source)]
+    while heap:
+        d, node = heapq.heappop(heap)
+        if d > dist[node]:
+            continue
+        for nxt, w in adjacency[node]:
+            if d + w < dist[nxt]:
+                dist[nxt] = d + w
+                heapq.heappush(heap, (d + w, nxt))
+    return dist
+
+
+def random_graph(seed: int, n: int = 60, extra_edges: int = 150):
+    """Nodes 1 km apart on a grid; a random cycle through all of them keeps it strongly connected"""
+    rng = random.Random(seed)
+    side = math.ceil(math.sqrt(n))
+    coords = np.array([(56.8 + (i // side) * 0.009, 35.9 + (i % side) * 0.0165) for i in range(n)])
+    order = list(range(n))
+    rng.shuffle(order)
+    edges = {(order[i], order[(i + 1) % n]): rng.uniform(10, 300) for i in range(n)}
+    while len(edges) < n + extra_edges:
+        u, v = rng.randrange(n), rng.randrange(n)
+        if u != v:
+            edges[(u, v)] = rng.uniform(10, 300)
+    return coords, edges
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_travel_times_match_dijkstra(tmp_path, seed):
+    coords, edges = random_graph(seed)
+    meta = build_graph(coords, edges, str(tmp_path))
+    assert meta["nodes"] == len(coords)
+    graph = RoadGraph(str(tmp_path))
+
+    points = [tuple(point) for point in graph.coords]
+    times = graph.travel_times(points, points)
+    expected = np.array([dijkstra(len(coords), edges, source) for source in range(len(coords))])
+    np.testing.assert_allclose(times, expected, rtol=1e-6)
+
+
+def test_travel_times_cutoff_and_snapping(tmp_path):
+    coords, edges = random_graph(0)
+    build_graph(coords, edges, str(tmp_path))
+    graph = RoadGraph(str(tmp_path))
+    expected = dijkstra(len(coords), edges, 0)
+
+    far_away = (57.5, 37.0)
+    times = graph.travel_times([tuple(graph.coords[0])], [tuple(graph.coords[1]), far_away],
+                               cutoff_seconds=expected[1] - 1)
+    assert math.isinf(times[0, 0])
+    assert math.isnan(times[0, 1])
+
+
+def test_build_graph_keeps_largest_component(tmp_path):
+    coords, edges = random_graph(1, n=20, extra_edges=20)
+    # Node 20 can be reached but not left: not part of the strongly connected network
+    coords = np.vstack([coords, [[56.7, 35.8]]])
+    edges[(0, 20)] = 50.0
+    assert build_graph(coords, edges, str(tmp_path))["nodes"] == 20
+
+
+def test_way_speed():
+    assert way_speed({"highway": "residential"}) == 25
+    assert way_speed({"highway": "primary", "maxspeed": "80"}) == 80
+    assert way_speed({"highway": "primary", "maxspeed": "RU:urban"}) == 60
+    assert way_speed({"highway": "primary", "maxspeed": "30 mph"}) == pytest.approx(48.27)
+    assert way_speed({"highway": "service", "maxspeed": "signals"}) == 15
+    assert way_speed({"highway": "pedestrian", "area": "yes"}) is None
+    assert way_speed({"highway": "residential", "area": "yes"}) is None
+    assert way_speed({"highway": "footway"}) is None
+    assert way_speed({}) is None
+
+
+def test_way_directions():
+    assert way_directions({"highway": "residential"}) == (True, True)
+    assert way_directions({"highway": "residential", "oneway": "yes"}) == (True, False)
+    assert way_directions({"highway": "residential", "oneway": "-1"}) == (False, True)
+    assert way_directions({"highway": "primary", "junction": "roundabout"}) == (True, False)
+    assert way_directions({"highway": "motorway"}) == (True, False)
+    assert way_directions({"highway": "motorway", "oneway": "no"}) == (True, True)
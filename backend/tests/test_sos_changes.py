@@ -0,0 +1,125 @@
+"""
+Delta sync (GET /api/v1/sos/changes)
+"""
+from datetime import datetime, timedelta
+
+from app.core.security import create_access_token
+from app.models.sos_alert import SOSAlert
+from app.models.team import RescueTeam
+from app.models.user import User
+
+
+def make_user(db, email: str, role: str) -> User:
+    user = User(email=email, hashed_password="-", role=role, full_name=email)
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return user
+
+
+def headers_of(user: User) -> dict:
+    return {"Authorization": f"Bearer {create_access_token({'sub': user.id, 'role': user.role})}"}
+
+
+def create_and_delete_alert(client, db, owner: User, admin: User) -> str:
+    alert = SOSAlert(user_id=owner.id, type="fire", latitude=56.85, longitude=35.9)
+    db.add(alert)
+    db.commit()
+    response = client.delete(f"/api/v1/sos/{alert.id}", headers=headers_of(admin))
+    assert response.status_code == 200
+    return alert.id
+
+
+def test_tombstones_are_visibility_filtered(client, db):
+    admin = make_user(db, "admin@example.com", "admin")
+    alice = make_user(db, "alice@example.com", "citizen")
+    bob = make_user(db, "bob@example.com", "citizen")
+    alice_alert = create_and_delete_alert(client, db, alice, admin)
+    bob_alert = create_and_delete_alert(client, db, bob, admin)
+
+    deleted = client.get("/api/v1/sos/changes", headers=headers_of(alice)).json()["deleted"]
+    assert deleted == [alice_alert]
+    deleted = client.get("/api/v1/sos/changes", headers=headers_of(admin)).json()["deleted"]
+    assert sorted(deleted) == sorted([alice_alert, bob_alert])
+
+
+def test_newest_tombstone_is_not_resent(client, db):
+    admin = make_user(db, "admin@example.com", "admin")
+    owner = make_user(db, "owner@example.com", "citizen")
+    alert_id = create_and_delete_alert(client, db, owner, admin)
+
+    first = client.get("/api/v1/sos/changes", headers=headers_of(owner)).json()
+    assert first["deleted"] == [alert_id]
+    second = client.get(
+        "/api/v1/sos/changes", params={"since": first["cursor"]}, headers=headers_of(owner)
+    ).json()
+    assert second["deleted"] == []
+    assert second["cursor"] == first["cursor"]
+
+    # A plain timestamp (older clients) includes changes at or after it
+    since = (datetime.utcnow() - timedelta(minutes=1)).isoformat()
+    third = client.get("/api/v1/sos/changes", params={"since": since}, headers=headers_of(owner)).json()
+    assert third["deleted"] == [alert_id]
+
+
+def test_updates_in_the_same_second_are_not_skipped(client, db):
+    owner = make_user(db, "owner@example.com", "citizen")
+    second = datetime.utcnow().replace(microsecond=0)
+    # IDs chosen so that the later update has the smaller id
+    first_alert = SOSAlert(id="b" * 36, user_id=owner.id, type="fire", latitude=56.85, longitude=35.9)
+    db.add(first_alert)
+    db.commit()
+    first_alert.updated_at = second
+    db.commit()
+
+    synced = client.get("/api/v1/sos/changes", headers=headers_of(owner)).json()
+    assert [alert["id"] for alert in synced["alerts"]] == [first_alert.id]
+
+    other = SOSAlert(id="a" * 36, user_id=owner.id, type="fire", latitude=56.86, longitude=35.9)
+    db.add(other)
+    db.commit()
+    other.updated_at = second  # Same (whole) second as the cursor row, smaller id
+    db.commit()
+
+    changes = client.get(
+        "/api/v1/sos/changes", params={"since": synced["cursor"]}, headers=headers_of(owner)
+    ).json()
+    assert [alert["id"] for alert in changes["alerts"]] == [other.id]
+
+
+def test_reassigned_alert_is_revoked_for_the_previous_team(client, db):
+    rescuer = make_user(db, "rescuer@example.com", "rescuer")
+    owner = make_user(db, "owner@example.com", "citizen")
+    old_team, new_team = RescueTeam(name="Old", type="fire"), RescueTeam(name="New", type="fire")
+    db.add_all([old_team, new_team])
+    db.commit()
+    rescuer.team_id = old_team.id
+    alert = SOSAlert(user_id=owner.id, type="fire", latitude=56.85, longitude=35.9,
+                     status="assigned", team_id=old_team.id)
+    db.add(alert)
+    db.commit()
+
+    synced = client.get("/api/v1/sos/changes", headers=headers_of(rescuer)).json()
+    assert [item["id"] for item in synced["alerts"]] == [alert.id]
+
+    alert.team_id = new_team.id
+    db.commit()
+    changes = client.get(
+        "/api/v1/sos/changes", params={"since": synced["cursor"]}, headers=headers_of(rescuer)
+    ).json()
+    assert changes["alerts"] == []
+    assert changes["revoked"] == [alert.id]
+
+    # The owner still sees it, nothing is revoked for them
+    owner_changes = client.get("/api/v1/sos/changes", headers=headers_of(owner)).json()
+    assert owner_changes["revoked"] == []
+    assert [item["id"] for item in owner_changes["alerts"]] == [alert.id]
+
+    # Given back to the old team: sent again, not revoked
+    alert.team_id = old_team.id
+    db.commit()
+    again = client.get(
+        "/api/v1/sos/changes", params={"since": changes["cursor"]}, headers=headers_of(rescuer)
+    ).json()
+    assert [item["id"] for item in again["alerts"]] == [alert.id]
+    assert again["revoked"] == []
@@ -0,0 +1,35 @@
+"""
+Idempotent SOS creation when the idempotency store has no record
+(expired, or the retry reached another worker)
+"""
+import pytest
+
+from app.api.v1 import sos
+from app.core.idempotency import IDEMPOTENCY_HEADER, REPLAYED_HEADER
+
+ALERT = {"type": "fire", "latitude": 56.86, "longitude": 35.9, "description": "Smoke on the 3rd floor"}
+
+
+@pytest.fixture
+def empty_idempotency_store(monkeypatch):
+    async def nothing(key):
+        return None
+    monkeypatch.setattr(sos.idempotency_store, "get", nothing)
+
+
+def test_retry_is_replayed_from_the_database(client, auth_headers, empty_idempotency_store):
+    headers = {**auth_headers, IDEMPOTENCY_HEADER: "retry-1"}
+    first = client.post("/api/v1/sos/", json=ALERT, headers=headers)
+    retry = client.post("/api/v1/sos/", json=ALERT, headers=headers)
+
+    assert first.status_code == retry.status_code == 201
+    assert retry.headers[REPLAYED_HEADER] == "true"
+    assert retry.json()["id"] == first.json()["id"]
+
+
+def test_key_reused_for_another_payload_is_rejected(client, auth_headers, empty_idempotency_store):
+    headers = {**auth_headers, IDEMPOTENCY_HEADER: "retry-2"}
+    assert client.post("/api/v1/sos/", json=ALERT, headers=headers).status_code == 201
+
+    response = client.post("/api/v1/sos/", json={**ALERT, "type": "medical"}, headers=headers)
+    assert response.status_code == 422
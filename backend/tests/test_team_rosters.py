@@ -0,0 +1,69 @@
+"""
+Roster import moving rescuers between teams
+"""
+from app.core.security import create_access_token
+from app.models.team import RescueTeam
+from app.models.user import User
+
+
+def test_moved_rescuer_leaves_previous_team(client, db, operator):
+    operator.role = "admin"
+    rescuer = User(email="rescuer@example.com", hashed_password="-", role="rescuer", full_name="Rescuer")
+    stays = User(email="stays@example.com", hashed_password="-", role="rescuer", full_name="Stays")
+    db.add_all([rescuer, stays])
+    db.flush()
+    old = RescueTeam(
+        name="Old", type="fire", leader_id=rescuer.id,
+        members=[{"user_id": rescuer.id, "name": "Rescuer"}, {"user_id": stays.id, "name": "Stays"}]
+    )
+    new = RescueTeam(name="New", type="fire", members=[])
+    db.add_all([old, new])
+    db.flush()
+    rescuer.team_id, rescuer.is_team_leader = old.id, True
+    stays.team_id = old.id
+    db.commit()
+
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': operator.id})}"}
+    response = client.post(
+        "/api/v1/teams/roster/import",
+        json={"teams": [{"team_id": new.id, "member_ids": [rescuer.id]}]},
+        headers=headers
+    )
+
+    assert response.status_code == 200
+    db.expire_all()
+    old, new = db.get(RescueTeam, old.id), db.get(RescueTeam, new.id)
+    assert [member["user_id"] for member in old.members] == [stays.id]
+    assert old.leader_id is None
+    assert [member["user_id"] for member in new.members] == [rescuer.id]
+    assert db.get(User, rescuer.id).team_id == new.id
+    assert db.get(User, stays.id).team_id == old.id
+
+
+def test_deleted_team_releases_its_members(client, db, operator):
+    operator.role = "admin"
+    rescuer = User(email="rescuer@example.com", hashed_password="-", role="rescuer", full_name="Rescuer")
+    db.add(rescuer)
+    db.flush()
+    team = RescueTeam(name="Gone", type="fire", leader_id=rescuer.id,
+                      members=[{"user_id": rescuer.id, "name": "Rescuer"}])
+    db.add(team)
+    db.flush()
+    rescuer.team_id, rescuer.is_team_leader = team.id, True
+    db.commit()
+
+    rescuer_headers = {"Authorization": f"Bearer {create_access_token({'sub': rescuer.id})}"}
+    before = client.get("/api/v1/auth/me", headers=rescuer_headers)
+    assert before.status_code == 200
+
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': operator.id})}"}
+    assert client.delete(f"/api/v1/teams/{team.id}", headers=headers).status_code == 200
+
+    after = client.get(
+        "/api/v1/auth/me", headers={**rescuer_headers, "If-None-Match": before.headers["ETag"]}
+    )
+    assert after.status_code == 200
+    db.expire_all()
+    rescuer = db.get(User, rescuer.id)
+    assert rescuer.team_id is None
+    assert not rescuer.is_team_leader
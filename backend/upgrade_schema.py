@@ -0,0 +1,103 @@
+"""
+Upgrade an existing database schema in place
+Creates missing tables, columns and indexes declared by the models without touching data.
+Safe to run repeatedly.
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from sqlalchemy import inspect, text
+
+from app.core.database import sync_engine, Base
+import app.models  # noqa: F401 - register all models on Base.metadata
+
+
+# (table, column) - nullable columns added to models after their tables were created
+COLUMNS = [
+    ("sos_alerts", "idempotency_key"),
+    ("sos_alerts", "idempotency_fingerprint"),
+    ("sos_alerts", "change_seq"),
+    ("sos_alert_tombstones", "change_seq"),
+    ("sos_alert_tombstones", "user_id"),
+    ("sos_alert_tombstones", "status"),
+    ("sos_alert_tombstones", "assigned_to"),
+    ("sos_alert_tombstones", "team_id"),
+]
+
+# (table, column or tuple of columns) - indexes added to models after their tables were created
+INDEXES = [
+    ("sos_alerts", "updated_at"),
+    ("sos_alerts", ("user_id", "idempotency_key")),
+    ("sos_alerts", ("change_seq", "id")),
+    ("sos_alert_tombstones", "change_seq"),
+]
+
+
+def create_missing_tables():
+    """Create tables that do not exist yet"""
+    existing = set(inspect(sync_engine).get_table_names())
+    missing = [table for name, table in Base.metadata.tables.items() if name not in existing]
+    for table in missing:
+        table.create(bind=sync_engine)
+        print(f"✓ Table '{table.name}' created")
+    if not missing:
+        print("✓ All tables exist")
+
+
+def create_missing_columns():
+    """Add nullable columns to existing tables"""
+    inspector = inspect(sync_engine)
+    for table_name, column in COLUMNS:
+        if any(col["name"] == column for col in inspector.get_columns(table_name)):
+            print(f"✓ Column {table_name}.{column} exists")
+            continue
+        column_type = Base.metadata.tables[table_name].columns[column].type.compile(dialect=sync_engine.dialect)
+        with sync_engine.begin() as connection:
+            connection.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {column} {column_type}"))
+        print(f"✓ Column {table_name}.{column} added")
+
+
+def create_missing_indexes():
+    """Create indexes on existing tables"""
+    inspector = inspect(sync_engine)
+    for table_name, columns in INDEXES:
+        columns = [columns] if isinstance(columns, str) else list(columns)
+        indexed = any(
+            idx["column_names"] == columns for idx in inspector.get_indexes(table_name)
+        )
+        if indexed:
+            print(f"✓ Index on {table_name}({', '.join(columns)}) exists")
+            continue
+        index = next(
+            idx for idx in Base.metadata.tables[table_name].indexes
+            if [col.name for col in idx.columns] == columns
+        )
+        index.create(bind=sync_engine)
+        print(f"✓ Index {index.name} created")
+
+
+def backfill_change_sequences():
+    """Rows written before change_seq existed sort first in delta sync"""
+    with sync_engine.begin() as connection:
+        for table_name in ("sos_alerts", "sos_alert_tombstones"):
+            result = connection.execute(text(f"UPDATE {table_name} SET change_seq = 0 WHERE change_seq IS NULL"))
+            if result.rowcount:
+                print(f"✓ {result.rowcount} rows of {table_name} got change_seq 0")
+
+
+def main():
+    """Main execution"""
+    print("=" * 60)
+    print("Schema upgrade")
+    print("=" * 60)
+    create_missing_tables()
+    create_missing_columns()
+    create_missing_indexes()
+    backfill_change_sequences()
+    print("\n✅ Schema is up to date")
+
+
+if __name__ == "__main__":
+    main()